@@ -1,24 +1,15 @@
-from flask import Flask, jsonify, request, abort
-from dotenv import load_dotenv
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, make_response
 import logging
 import os
-from signalwire_swaig.swaig import SWAIG, SWAIGArgument
 import secrets
-import base64
+import threading
 import json
 import io
-import inspect
-
-from reservation_system import (
-    create_reservation_response,
-    get_reservation_response,
-    update_reservation_response,
-    cancel_reservation_response,
-    move_reservation_response,
-    reservations
-)
-import random
-from swaig_handler import transform_swaig_request
+
+from swaig_logging import configure_logging, debug_enabled, log_event
+
+# Everything else is imported where it is used: importing this module or building the app loads
+# Flask and signalwire_swaig only, and reservation_system (which opens the store) loads on the first call
 
 def validate_environment():
     required_vars = ['HTTP_USERNAME', 'HTTP_PASSWORD']
@@ -32,45 +23,34 @@ def validate_environment():
     if port and not port.isdigit():
         raise ValueError("PORT environment variable must be a number")
 
-logging.getLogger('werkzeug').setLevel(logging.WARNING)
-
-if os.environ.get('DEBUG'):
-    print("Debug mode is enabled")
-    # Use secrets module for cryptographically secure random numbers
-    debug_pin = f"{secrets.randbelow(900) + 100}-{secrets.randbelow(900) + 100}-{secrets.randbelow(900) + 100}"
-    os.environ['WERKZEUG_DEBUG_PIN'] = debug_pin
-    logging.getLogger('werkzeug').setLevel(logging.DEBUG)
-    print(f"Debugger PIN: {debug_pin}")
-
-load_dotenv()
-validate_environment()
-
-app = Flask(__name__)
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
-app.static_folder = os.path.abspath('static')
-swaig = SWAIG(
-    app,
-    auth=(os.getenv('HTTP_USERNAME'), os.getenv('HTTP_PASSWORD'))
-)
+# SWAIG functions and their argument schemas, declared on each app's SWAIG instance by create_app
+_swaig_declarations = []
 
-auth_str = "admin:secret"
-b64_auth = base64.b64encode(auth_str.encode()).decode()
-print(b64_auth)  # Use this in the header
+def swaig_argument(**schema):
+    """SWAIGArgument's arguments; create_app builds the SWAIGArgument when it declares the function."""
+    return schema
 
-headers={"Authorization": "Basic YWRtaW46c2VjcmV0"}
+def swaig_function(**declaration):
+    """Record a SWAIG function with SWAIG.endpoint's arguments, taking swaig_argument() schemas."""
+    def record(func):
+        _swaig_declarations.append((func, declaration))
+        return func
+    return record
 
-@swaig.endpoint(
+@swaig_function(
     description="Create a new reservation for a customer",
-    name=SWAIGArgument(type="string", description="The name of the person making the reservation", required=True),
-    party_size=SWAIGArgument(type="integer", description="Number of people in the party", required=True),
-    date=SWAIGArgument(type="string", description="Date of reservation in YYYY-MM-DD format", required=True),
-    time=SWAIGArgument(type="string", description="Time of reservation in HH:MM format (24-hour)", required=True),
-    phone_number=SWAIGArgument(type="string", description="Contact phone number in E.164 format (e.g., +19185551234)", required=True)
+    name=swaig_argument(type="string", description="The name of the person making the reservation", required=True),
+    party_size=swaig_argument(type="integer", description="Number of people in the party", required=True),
+    date=swaig_argument(type="string", description="Date of reservation in YYYY-MM-DD format", required=True),
+    time=swaig_argument(type="string", description="Time of reservation in HH:MM format (24-hour)", required=True),
+    phone_number=swaig_argument(type="string", description="Contact phone number in E.164 format (e.g., +19185551234)", required=True)
 )
 def create_reservation(name, party_size, date, time, phone_number, **kwargs):
-    with open('swaig_debug_payload.json', 'a') as f:
-        f.write(f'CREATE_RESERVATION_ARGS: name={name}, party_size={party_size}, date={date}, time={time}, phone_number={phone_number}, kwargs={kwargs}\n')
-    return create_reservation_response({
+    import reservation_system
+    if debug_enabled():
+        log_event(logging.DEBUG, "create_reservation_args", name=name, party_size=party_size, date=date,
+                  time=time, phone_number=phone_number, kwargs=kwargs)
+    return reservation_system.create_reservation_response({
         "name": name,
         "party_size": party_size,
         "date": date,
@@ -78,177 +58,366 @@ def create_reservation(name, party_size, date, time, phone_number, **kwargs):
         "phone_number": phone_number
     })
 
-@swaig.endpoint(
+@swaig_function(
     description="Retrieve an existing reservation",
-    phone_number=SWAIGArgument(type="string", description="Phone number used for the reservation in E.164 format", required=True)
+    phone_number=swaig_argument(type="string", description="Phone number used for the reservation in E.164 format", required=True)
 )
 def get_reservation(phone_number, **kwargs):
-    return get_reservation_response({"phone_number": phone_number})
+    import reservation_system
+    return reservation_system.get_reservation_response({"phone_number": phone_number})
 
-@swaig.endpoint(
+@swaig_function(
     description="Update an existing reservation",
-    phone_number=SWAIGArgument(type="string", description="Phone number of the existing reservation", required=True),
-    name=SWAIGArgument(type="string", description="Updated name (optional)", required=False),
-    party_size=SWAIGArgument(type="integer", description="Updated party size (optional)", required=False),
-    date=SWAIGArgument(type="string", description="Updated date in YYYY-MM-DD format (optional)", required=False),
-    time=SWAIGArgument(type="string", description="Updated time in HH:MM format (optional)", required=False)
+    phone_number=swaig_argument(type="string", description="Phone number of the existing reservation", required=True),
+    name=swaig_argument(type="string", description="Updated name (optional)", required=False),
+    party_size=swaig_argument(type="integer", description="Updated party size (optional)", required=False),
+    date=swaig_argument(type="string", description="Updated date in YYYY-MM-DD format (optional)", required=False),
+    time=swaig_argument(type="string", description="Updated time in HH:MM format (optional)", required=False)
 )
 def update_reservation(phone_number, name=None, party_size=None, date=None, time=None, **kwargs):
-    current_reservation = reservations.get(phone_number, {})
-    updated_reservation = {
-        "name": name if name else current_reservation.get("name"),
-        "party_size": int(party_size) if party_size else current_reservation.get("party_size"),
-        "date": date if date else current_reservation.get("date"),
-        "time": time if time else current_reservation.get("time")
-    }
-    return update_reservation_response(updated_reservation)
-
-@swaig.endpoint(
+    import reservation_system
+    return reservation_system.update_reservation_response(reservation_system.fill_update({
+        "phone_number": phone_number,
+        "name": name,
+        "party_size": party_size,
+        "date": date,
+        "time": time
+    }))
+
+@swaig_function(
     description="Cancel an existing reservation",
-    phone_number=SWAIGArgument(type="string", description="Phone number of the reservation to cancel", required=True)
+    phone_number=swaig_argument(type="string", description="Phone number of the reservation to cancel", required=True)
 )
 def cancel_reservation(phone_number, **kwargs):
-    return cancel_reservation_response({"phone_number": phone_number})
+    import reservation_system
+    return reservation_system.cancel_reservation_response({"phone_number": phone_number})
 
-@swaig.endpoint(
+@swaig_function(
     description="Move an existing reservation to a new date and time",
-    phone_number=SWAIGArgument(type="string", description="Phone number of the existing reservation", required=True),
-    new_date=SWAIGArgument(type="string", description="New date in YYYY-MM-DD format", required=True),
-    new_time=SWAIGArgument(type="string", description="New time in HH:MM format", required=True)
+    phone_number=swaig_argument(type="string", description="Phone number of the existing reservation", required=True),
+    new_date=swaig_argument(type="string", description="New date in YYYY-MM-DD format", required=True),
+    new_time=swaig_argument(type="string", description="New time in HH:MM format", required=True)
 )
 def move_reservation(phone_number, new_date, new_time, **kwargs):
-    return move_reservation_response({
+    import reservation_system
+    return reservation_system.move_reservation_response({
         "phone_number": phone_number,
         "new_date": new_date,
         "new_time": new_time
     })
 
-def scramble_phone_number(phone):
-    if not phone or len(phone) < 6:
-        return phone
-    return phone[:-6] + ''.join(random.choices('0123456789', k=6))
+@swaig_function(
+    description="List reservations, optionally for one date or a date range and a party size",
+    date=swaig_argument(type="string", description="Only this date, in YYYY-MM-DD format (optional)", required=False),
+    from_date=swaig_argument(type="string", description="First date of a range, in YYYY-MM-DD format (optional)", required=False),
+    to_date=swaig_argument(type="string", description="Last date of a range, in YYYY-MM-DD format (optional)", required=False),
+    party_size=swaig_argument(type="integer", description="Only parties of this size (optional)", required=False),
+    cursor=swaig_argument(type="string", description="Cursor from a previous listing, to get the next page (optional)", required=False),
+    limit=swaig_argument(type="integer", description="Maximum number of reservations to return (optional, default 10)", required=False)
+)
+def list_reservations(date=None, from_date=None, to_date=None, party_size=None, cursor=None, limit=None, **kwargs):
+    import reservation_system
+    return reservation_system.list_reservations_response({
+        "date": date,
+        "from_date": from_date,
+        "to_date": to_date,
+        "party_size": party_size,
+        "cursor": cursor,
+        "limit": limit
+    })
+
+@swaig_function(
+    description="Find the open reservation times nearest to a preferred time, for a party size on a date",
+    date=swaig_argument(type="string", description="Date to search, in YYYY-MM-DD format", required=True),
+    party_size=swaig_argument(type="integer", description="Number of people in the party", required=True),
+    preferred_time=swaig_argument(type="string", description="Preferred time in HH:MM format (optional)", required=False),
+    window_minutes=swaig_argument(type="integer", description="How far from the preferred time to search, in minutes (optional, default 120)", required=False),
+    count=swaig_argument(type="integer", description="How many times to return (optional, default 3)", required=False)
+)
+def find_available_slots(date, party_size, preferred_time=None, window_minutes=None, count=None, **kwargs):
+    import reservation_system
+    return reservation_system.find_available_slots_response({
+        "date": date,
+        "party_size": party_size,
+        "preferred_time": preferred_time,
+        "window_minutes": window_minutes,
+        "count": count
+    })
+
+@swaig_function(
+    description="Put a party on the waitlist for a fully booked time; they are booked automatically when a table frees up",
+    name=swaig_argument(type="string", description="The name of the person waiting", required=True),
+    party_size=swaig_argument(type="integer", description="Number of people in the party", required=True),
+    date=swaig_argument(type="string", description="Wanted date in YYYY-MM-DD format", required=True),
+    time=swaig_argument(type="string", description="Wanted time in HH:MM format (24-hour)", required=True),
+    phone_number=swaig_argument(type="string", description="Contact phone number in E.164 format (e.g., +19185551234)", required=True)
+)
+def join_waitlist(name, party_size, date, time, phone_number, **kwargs):
+    import reservation_system
+    return reservation_system.join_waitlist_response({
+        "name": name,
+        "party_size": party_size,
+        "date": date,
+        "time": time,
+        "phone_number": phone_number
+    })
+
+@swaig_function(
+    description="Take a party off the waitlist",
+    phone_number=swaig_argument(type="string", description="Phone number the party is waiting under", required=True)
+)
+def leave_waitlist(phone_number, **kwargs):
+    import reservation_system
+    return reservation_system.leave_waitlist_response({"phone_number": phone_number})
+
+@swaig_function(
+    description="Create a standing reservation that repeats every week on the same weekday and time",
+    name=swaig_argument(type="string", description="The name of the person making the reservation", required=True),
+    party_size=swaig_argument(type="integer", description="Number of people in the party", required=True),
+    date=swaig_argument(type="string", description="First date in YYYY-MM-DD format; sets the weekday", required=True),
+    time=swaig_argument(type="string", description="Time in HH:MM format (24-hour)", required=True),
+    phone_number=swaig_argument(type="string", description="Contact phone number in E.164 format (e.g., +19185551234)", required=True)
+)
+def create_standing_reservation(name, party_size, date, time, phone_number, **kwargs):
+    import reservation_system
+    return reservation_system.create_standing_reservation_response({
+        "name": name,
+        "party_size": party_size,
+        "date": date,
+        "time": time,
+        "phone_number": phone_number
+    })
+
+@swaig_function(
+    description="Cancel a standing reservation, or only its occurrence on one date",
+    phone_number=swaig_argument(type="string", description="Phone number of the standing reservation", required=True),
+    date=swaig_argument(type="string", description="Only cancel this date's occurrence, in YYYY-MM-DD format (optional)", required=False)
+)
+def cancel_standing_reservation(phone_number, date=None, **kwargs):
+    import reservation_system
+    return reservation_system.cancel_standing_reservation_response({"phone_number": phone_number, "date": date})
+
+routes = Blueprint('reservations', __name__)
 
 def get_reservations_table_html():
-    if not reservations:
-        return "<p>No reservations yet.</p>"
-    
-    table_html = """
-    <table border="1">
-        <tr>
-            <th>Name</th>
-            <th>Phone</th>
-            <th>Date</th>
-            <th>Time</th>
-            <th>Party Size</th>
-        </tr>
-    """
-    
-    for phone, details in reservations.items():
-        scrambled = scramble_phone_number(phone)
-        table_html += f"""
-        <tr>
-            <td>{details['name']}</td>
-            <td>{scrambled}</td>
-            <td>{details['date']}</td>
-            <td>{details['time']}</td>
-            <td>{details['party_size']}</td>
-        </tr>
-        """
-    
-    table_html += "</table>"
-    return table_html
+    import reservation_system
+    return current_app.extensions['dashboard'].table(reservation_system.reservations)
 
-@app.route('/swaig', methods=['GET'])
-@app.route('/', methods=['GET'])
+@routes.route('/swaig', methods=['GET'])
+@routes.route('/', methods=['GET'])
 def serve_reservation_html():
+    import reservation_system
     try:
-        static_file_path = os.path.join(app.static_folder, 'reservation.html')
-        if not os.path.exists(static_file_path):
+        page = current_app.extensions['dashboard'].page(reservation_system.reservations, os.getenv("GOOGLE_TAG"))
+        if page is None:
             return jsonify({
                 "error": "Reservation page template not found",
                 "details": "The reservation.html file is missing from the static folder"
             }), 500
-            
-        with open(static_file_path, 'r') as file:
-            html_content = file.read()
-        
-        reservations_table = get_reservations_table_html()
-        
-        # Replace placeholders with actual data
-        html_content = html_content.replace("{{reservations_table}}", reservations_table)
-        
-        # Insert Google Tag Manager script if the tag is available
-        GOOGLE_TAG = os.getenv("GOOGLE_TAG")
-        if GOOGLE_TAG:
-            gtm_script = f"""
-            <script async src="https://www.googletagmanager.com/gtag/js?id={GOOGLE_TAG}"></script>
-            <script>
-              window.dataLayer = window.dataLayer || [];
-              function gtag(){{dataLayer.push(arguments);}}
-              gtag('js', new Date());
-              gtag('config', '{GOOGLE_TAG}');
-            </script>
-            """
-            html_content = html_content.replace("</head>", f"{gtm_script}</head>")
-        
-        return html_content
+
+        html_content, etag = page
+        response = make_response(html_content)
+        response.set_etag(etag)
+        # Let browsers keep the page but revalidate it on every poll
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({
             "error": "Failed to serve HTML",
             "details": str(e)
         }), 500
 
-@app.route('/swaig', methods=['POST'])
+def _authorized() -> bool:
+    return current_app.extensions['basic_auth'].check(request.headers.get('Authorization'))
+
+def _unauthorized():
+    return jsonify({"error": "Authentication required"}), 401, {'WWW-Authenticate': 'Basic realm="reservations"'}
+
+def _int_arg(name):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    if not value.isdigit():
+        raise ValueError(f"Invalid {name.replace('_', ' ')}. Use a whole number.")
+    return int(value)
+
+@routes.route('/reservations', methods=['GET'])
+def list_reservations_json():
+    """
+    JSON listing of reservations in date and time order.
+
+    Query parameters: date, or from_date/to_date; party_size, or min_party_size/
+    max_party_size; limit and cursor for pages. With stream=1 every match is
+    sent as newline-delimited JSON instead of one page.
+    """
+    if not _authorized():
+        return _unauthorized()
+    import reservation_system
+    args = request.args
+    try:
+        party_size = _int_arg('party_size')
+        filters = {
+            "from_date": args.get('date') or args.get('from_date'),
+            "to_date": args.get('date') or args.get('to_date'),
+            "min_party_size": party_size if party_size is not None else _int_arg('min_party_size'),
+            "max_party_size": party_size if party_size is not None else _int_arg('max_party_size'),
+            "cursor": args.get('cursor')
+        }
+        if args.get('stream') in ('1', 'true'):
+            rows = reservation_system.iter_reservations(**filters)
+            return Response((json.dumps(row) + "\n" for row in rows), mimetype='application/x-ndjson')
+        limit = _int_arg('limit')
+        page, next_cursor = reservation_system.list_reservations(
+            **filters, limit=limit if limit is not None else reservation_system.DEFAULT_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"reservations": page, "next_cursor": next_cursor})
+
+def _bulk_format(default='csv'):
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt
+    mimetype = request.mimetype or ''
+    if mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json'):
+        return 'jsonl'
+    return default
+
+@routes.route('/reservations/export', methods=['GET'])
+def export_reservations():
+    """Every reservation (or a from_date/to_date range) streamed as CSV or, with format=jsonl, JSON Lines."""
+    if not _authorized():
+        return _unauthorized()
+    fmt = request.args.get('format', 'csv')
+    # Imported on first use: most workers never import or export
+    import bulk
+    try:
+        lines = bulk.export_lines(fmt, from_date=request.args.get('from_date'), to_date=request.args.get('to_date'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(lines, mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson')
+
+@routes.route('/reservations/import', methods=['POST'])
+def import_reservations():
+    """Book every valid row of a CSV or JSON Lines body and report the rejected ones by line."""
+    if not _authorized():
+        return _unauthorized()
+    import bulk
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    try:
+        report = bulk.import_reservations(stream, _bulk_format())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(report.to_dict())
+
+@routes.route('/changes', methods=['GET'])
+def change_stream():
+    """Server-Sent Events for each create, update, move and cancel, resumed after Last-Event-ID if given."""
+    if not _authorized():
+        return _unauthorized()
+    import reservation_system
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(reservation_system.changes.stream(last_event_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@routes.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape target: SWAIG call counts, error categories and latency histograms."""
+    if not _authorized():
+        return _unauthorized()
+    import metrics
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@routes.route('/swaig', methods=['POST'])
 def swaig_dispatch():
+    if not _authorized():
+        return _unauthorized()
     if not request.is_json:
         return jsonify({"error": "Request must be JSON"}), 400
-    data = request.get_json()
-    function_name = data.get('function')
-    arguments = data.get('arguments', None)
-    argument_parsed = None
-    if 'argument' in data and 'parsed' in data['argument']:
-        argument_parsed = data['argument']['parsed'][0]
-    if not function_name:
-        return jsonify({"error": "Missing 'function' in request"}), 400
-    # Debug: print all available endpoints and arguments
-    with open('swaig_debug_payload.json', 'a') as f:
-        f.write(f"DISPATCH: Looking for function '{function_name}'\n")
-        f.write(f"DISPATCH: Available endpoints: {list(app.view_functions.keys())}\n")
-        f.write(f"DISPATCH: Arguments: {arguments}\n")
-        f.write(f"DISPATCH: Argument parsed: {argument_parsed}\n")
-    func = globals().get(function_name)
-    if not func:
-        func = app.view_functions.get(function_name)
-    if func:
-        func = inspect.unwrap(func)
-    with open('swaig_debug_payload.json', 'a') as f:
-        f.write(f"DISPATCH: func object: {func}\n")
-        if func:
-            f.write(f"DISPATCH: func signature: {inspect.signature(func)}\n")
-    if not func:
-        with open('swaig_debug_payload.json', 'a') as f:
-            f.write(f"DISPATCH: Function '{function_name}' not found!\n")
-        return jsonify({"error": f"Function '{function_name}' not found"}), 404
+    from swaig_dispatcher import handle_payload
+    from swaig_handler import decode_json
     try:
-        if arguments is not None:
-            result = func(**arguments)
-        elif argument_parsed is not None:
-            result = func(**argument_parsed)
-        else:
-            result = func()
-        with open('swaig_debug_payload.json', 'a') as f:
-            f.write(f"DISPATCH: Result: {result}\n")
-        if isinstance(result, dict):
-            return jsonify(result)
-        else:
-            return jsonify({"response": result})
-    except Exception as e:
-        with open('swaig_debug_payload.json', 'a') as f:
-            f.write(f"DISPATCH: Exception: {str(e)}\n")
-        return jsonify({"response": f"Invalid arguments for function '{function_name}': {e}"})
+        # Decoded once here; dispatch works on views of this object
+        data = decode_json(request.get_data(cache=False))
+    except ValueError:
+        return jsonify({"error": "Invalid JSON"}), 400
+    if isinstance(data, dict) and data.get('action') == 'get_signature':
+        return current_app.extensions['swaig']._handle_signature_request(data)
+    body, status = handle_payload(current_app.extensions['swaig_functions'], data,
+                                  request.headers.get('Idempotency-Key'))
+    return jsonify(body), status
+
+def create_app() -> Flask:
+    """
+    Build the Flask app: load .env, check the environment, set up logging, then declare the
+    SWAIG functions and routes.
+
+    Importing this module does none of this; `app` and friends below are built on first use.
+    Neither step imports reservation_system: the store is opened by the first call that needs it.
+    """
+    # Only needed here, so a process that never builds an app never imports them
+    from dotenv import load_dotenv
+    from signalwire_swaig.swaig import SWAIG, SWAIGArgument
+
+    from basic_auth import BasicAuth
+    from dashboard import DashboardRenderer
+    from swaig_registry import build_registry
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if os.environ.get('DEBUG'):
+        print("Debug mode is enabled")
+        # Use secrets module for cryptographically secure random numbers
+        debug_pin = f"{secrets.randbelow(900) + 100}-{secrets.randbelow(900) + 100}-{secrets.randbelow(900) + 100}"
+        os.environ['WERKZEUG_DEBUG_PIN'] = debug_pin
+        logging.getLogger('werkzeug').setLevel(logging.DEBUG)
+        print(f"Debugger PIN: {debug_pin}")
+
+    load_dotenv()
+    validate_environment()
+    configure_logging()
+    if os.getenv('RESERVATION_ARCHIVE'):
+        # Once per process; the archiver needs reservation_system, so this opens the store here, which under
+        # gunicorn --preload means before the fork
+        import archive
+        archive.start_from_env()
+
+    app = Flask(__name__)
+    app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
+    app.static_folder = os.path.abspath('static')
+    username, password = os.getenv('HTTP_USERNAME'), os.getenv('HTTP_PASSWORD')
+    swaig = SWAIG(app, auth=(username, password))
+    for func, declaration in _swaig_declarations:
+        swaig.endpoint(**{name: SWAIGArgument(**value) if isinstance(value, dict) else value
+                          for name, value in declaration.items()})(func)
+    app.register_blueprint(routes)
+
+    # SWAIG(app) registered its own POST /swaig rule first and Werkzeug matches the first rule,
+    # so point every POST /swaig endpoint at our dispatcher
+    for rule in list(app.url_map.iter_rules()):
+        if rule.rule == '/swaig' and 'POST' in rule.methods:
+            app.view_functions[rule.endpoint] = swaig_dispatch
+
+    app.extensions['swaig'] = swaig
+    # Dispatch table for POST /swaig, built once from the declared functions
+    app.extensions['swaig_functions'] = build_registry(swaig)
+    # Rendered dashboard, rebuilt only when reservations or the template change
+    app.extensions['dashboard'] = DashboardRenderer(os.path.join(app.static_folder, 'reservation.html'))
+    # Credentials are read and encoded once; each request costs one constant-time comparison
+    app.extensions['basic_auth'] = BasicAuth(username, password)
+    return app
+
+# The app built on first access to app, swaig, swaig_functions or dashboard (e.g. gunicorn's app_new:app)
+_app = None
+_app_lock = threading.Lock()
 
-# Register our custom /swaig POST route last, forcibly overwriting any previous handler
-app.add_url_rule('/swaig', view_func=swaig_dispatch, methods=['POST'], endpoint='swaig_dispatch')
+def __getattr__(name):
+    if name not in ('app', 'swaig', 'swaig_functions', 'dashboard'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    global _app
+    with _app_lock:
+        if _app is None:
+            _app = create_app()
+    return _app if name == 'app' else _app.extensions[name]
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=os.getenv("PORT", 5001), debug=os.getenv("DEBUG")) 
\ No newline at end of file
+    app = create_app()
+    app.run(host="0.0.0.0", port=os.getenv("PORT", 5001), debug=os.getenv("DEBUG"))
@@ -0,0 +1,194 @@
+"""
+Archiving of past reservations.
+
+Bookings that started more than a grace period ago are moved out of the live
+store into gzip-compressed JSON Lines files, one per month
+(<directory>/2026-10.jsonl.gz), so the store, the dashboard and the table
+inventory only hold bookings that can still happen.
+
+The work is incremental. Each step takes the oldest batch_size bookings from
+the store's date-ordered scan, appends them to the archive and deletes them,
+holding only their phone numbers' and dates' locks (see
+reservation_system.remove_past). Steps repeat until nothing is past the
+cutoff, so a backlog is worked off in short pauses rather than one long one.
+Each batch is one gzip member written with a single append and fsynced before
+the bookings are deleted. A crash in between can archive a booking twice but
+never loses one.
+
+Set RESERVATION_ARCHIVE to a directory to run an Archiver in the background of
+each server process, or archive and read by hand:
+
+    python archive.py run archive/ --after-hours 0
+    python archive.py read archive/ --from-date 2026-01-01
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional
+
+import metrics
+import reservation_system
+import validation
+from swaig_logging import log_event
+
+# Seconds between background runs
+DEFAULT_INTERVAL = 300.0
+# How long after its start a booking stays in the store
+DEFAULT_AFTER_HOURS = 24.0
+# Bookings archived per step, i.e. the most any one pause covers
+DEFAULT_BATCH_SIZE = 500
+
+_SUFFIX = ".jsonl.gz"
+
+def archive_path(directory: str, month: str) -> str:
+    """The archive file of one month ('YYYY-MM')."""
+    return os.path.join(directory, month + _SUFFIX)
+
+def append_rows(directory: str, rows: List[dict]) -> None:
+    """Append rows to their months' archive files and fsync them."""
+    months: Dict[str, List[bytes]] = defaultdict(list)
+    for row in rows:
+        months[row["date"][:7]].append(json.dumps(row, separators=(",", ":")).encode() + b"\n")
+    for month, lines in months.items():
+        # One complete gzip member per write, so workers appending to the same file never interleave
+        data = gzip.compress(b"".join(lines))
+        fd = os.open(archive_path(directory, month), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def read_archive(directory: str, from_date: Optional[str] = None, to_date: Optional[str] = None) -> Iterator[dict]:
+    """Archived rows with from_date <= date <= to_date, month by month in the order they were archived."""
+    if not os.path.isdir(directory):
+        return
+    months = sorted(name[:-len(_SUFFIX)] for name in os.listdir(directory) if name.endswith(_SUFFIX))
+    for month in months:
+        if (from_date is not None and month < from_date[:7]) or (to_date is not None and month > to_date[:7]):
+            continue
+        with gzip.open(archive_path(directory, month), "rt", encoding="utf-8") as lines:
+            for line in lines:
+                row = json.loads(line)
+                if (from_date is None or row["date"] >= from_date) and (to_date is None or row["date"] <= to_date):
+                    yield row
+
+class Archiver:
+    """Moves past reservations into an archive directory, on demand or from a background thread."""
+
+    def __init__(self, directory: str, after: timedelta = timedelta(hours=DEFAULT_AFTER_HOURS),
+                 interval: float = DEFAULT_INTERVAL, batch_size: int = DEFAULT_BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.directory = directory
+        self.after = after
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _archive(self, rows: List[dict]) -> None:
+        append_rows(self.directory, rows)
+        metrics.archived.inc(amount=len(rows))
+
+    def run_once(self) -> int:
+        """Archive everything that started before now - after, one batch at a time; returns how many."""
+        cutoff = validation.now() - self.after
+        before = (cutoff.strftime("%Y-%m-%d"), cutoff.strftime("%H:%M"))
+        total = 0
+        while not self._stop.is_set():
+            removed = reservation_system.remove_past(before, self.batch_size, self._archive)
+            total += removed
+            if removed < self.batch_size:
+                break
+        # Waiting parties and standing reservations keep per-date state too
+        reservation_system.waitlist.drop_before(before[0])
+        reservation_system.standing.drop_before(before[0])
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                removed = self.run_once()
+                if removed:
+                    log_event(logging.INFO, "reservations_archived", count=removed, directory=self.directory)
+            except Exception as e:
+                log_event(logging.ERROR, "archive_failed", error=str(e))
+            self._stop.wait(self.interval)
+
+    def start(self) -> "Archiver":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reservation-archive", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread after its current batch."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+_background: Optional[Archiver] = None
+_background_lock = threading.Lock()
+
+def _forget_background() -> None:
+    global _background, _background_lock
+    _background = None
+    _background_lock = threading.Lock()
+
+# The thread does not survive a fork, so a forked child (e.g. a shard worker) starts its own
+os.register_at_fork(after_in_child=_forget_background)
+
+def start_from_env() -> Optional[Archiver]:
+    """
+    Start this process's background Archiver if RESERVATION_ARCHIVE names a directory.
+
+    RESERVATION_ARCHIVE_AFTER_HOURS, RESERVATION_ARCHIVE_INTERVAL (seconds) and
+    RESERVATION_ARCHIVE_BATCH override the defaults. Later calls return the same Archiver.
+    """
+    global _background
+    directory = os.getenv("RESERVATION_ARCHIVE")
+    if not directory:
+        return None
+    with _background_lock:
+        if _background is None:
+            _background = Archiver(
+                directory,
+                after=timedelta(hours=float(os.getenv("RESERVATION_ARCHIVE_AFTER_HOURS", DEFAULT_AFTER_HOURS))),
+                interval=float(os.getenv("RESERVATION_ARCHIVE_INTERVAL", DEFAULT_INTERVAL)),
+                batch_size=int(os.getenv("RESERVATION_ARCHIVE_BATCH", DEFAULT_BATCH_SIZE))).start()
+        return _background
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Archive past reservations or read the archive")
+    commands = parser.add_subparsers(dest="command", required=True)
+    runner = commands.add_parser("run", help="archive every booking past the cutoff now")
+    runner.add_argument("directory")
+    runner.add_argument("--after-hours", type=float, default=DEFAULT_AFTER_HOURS)
+    runner.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    reader = commands.add_parser("read", help="write archived bookings to stdout as JSON Lines")
+    reader.add_argument("directory")
+    reader.add_argument("--from-date")
+    reader.add_argument("--to-date")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        archiver = Archiver(args.directory, after=timedelta(hours=args.after_hours), batch_size=args.batch_size)
+        print(f"Archived {archiver.run_once()} reservations.")
+        return 0
+    for row in read_archive(args.directory, args.from_date, args.to_date):
+        sys.stdout.write(json.dumps(row) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Asyncio server for the SWAIG endpoint.
+
+Serves POST /swaig for function calls, batches and get_signature; GET / and
+/swaig for the dashboard; GET /metrics; and GET /changes for the change feed,
+with app_new's Basic auth on POST /swaig, /metrics and /changes. The admin
+routes (GET /reservations, GET /reservations/export and POST
+/reservations/import) are left to app_new.
+
+Everything runs on a single event loop instead of one thread per connection,
+so idle keep-alive connections and change-feed streams cost a coroutine rather
+than a thread. Function calls, which take store locks and may write to SQLite
+or the journal, run on a fixed thread pool. A semaphore bounds how many run at
+once, so a burst queues in the loop rather than piling onto the store. With
+--shards, function calls are routed to worker processes that each own some
+locations' dates (see sharding.py).
+
+Only the standard library is used: the HTTP/1.1 handling covers what SWAIG
+clients and browsers send (Content-Length bodies, keep-alive) and nothing more.
+
+Run with:  python async_server.py --port 5001
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, Mapping, Optional, Set, Tuple
+
+import app_new
+import metrics
+import reservation_system
+from basic_auth import BasicAuth
+from changefeed import DEFAULT_HEARTBEAT, HEARTBEAT, RETRY, Follower
+from sharding import ShardedReservations, parse_locations
+from swaig_dispatcher import function_signatures, handle_payload
+from swaig_handler import decode_json
+from swaig_logging import log_event
+
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_CONCURRENCY = 64
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+
+Headers = Dict[str, str]
+
+class HTTPError(Exception):
+    """A request that cannot be served; the connection is closed after the error response."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _json_body(body: Any) -> bytes:
+    return json.dumps(body, separators=(",", ":")).encode()
+
+def _response(status: int, body: bytes, content_type: str, keep_alive: bool,
+              extra: Optional[Mapping[str, str]] = None) -> bytes:
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}",
+             "Connection: keep-alive" if keep_alive else "Connection: close"]
+    if extra:
+        lines.extend(f"{name}: {value}" for name, value in extra.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+def _base_url(headers: Headers) -> str:
+    """Webhook base URL for signatures, with the credentials in the netloc like SWAIG builds it."""
+    host = headers.get("host", "localhost")
+    username, password = os.getenv("HTTP_USERNAME", ""), os.getenv("HTTP_PASSWORD", "")
+    return f"https://{username}:{password}@{host}" if username else f"https://{host}"
+
+def _is_json(headers: Headers) -> bool:
+    mimetype = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    return mimetype == "application/json" or mimetype.endswith("+json")
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Headers, bytes]]:
+    """(method, path, version, headers, body) of the next request, or None once the client is done."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "Request headers too large")
+    request_line, *header_lines = head[:-4].decode("latin-1").split("\r\n")
+    parts = request_line.split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+        raise HTTPError(400, "Malformed request line")
+    method, target, version = parts
+    headers: Headers = {}
+    for line in header_lines:
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise HTTPError(400, "Malformed header")
+        headers[name.strip().lower()] = value.strip()
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(411, "Chunked request bodies are not supported; send Content-Length")
+    length = headers.get("content-length", "0")
+    if not length.isdigit():
+        raise HTTPError(400, "Invalid Content-Length")
+    if int(length) > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    try:
+        body = await reader.readexactly(int(length)) if int(length) else b""
+    except asyncio.IncompleteReadError:
+        return None
+    return method, target.split("?", 1)[0], version, headers, body
+
+class SWAIGServer:
+    """Serves POST /swaig and the dashboard on an asyncio event loop."""
+
+    def __init__(self, registry: Optional[Mapping] = None, signatures: Optional[Mapping] = None,
+                 workers: int = DEFAULT_WORKERS, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 auth: Optional[BasicAuth] = None):
+        self.registry = registry if registry is not None else app_new.swaig_functions
+        self.signatures = signatures if signatures is not None else app_new.swaig.functions
+        self.auth = auth if auth is not None else BasicAuth.from_env()
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        """Start listening and return the bound (host, port); port 0 picks a free one."""
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="swaig")
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._serve_connection, host, port,
+                                                  limit=MAX_HEADER_BYTES, backlog=1024)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Idle keep-alive connections would otherwise wait out KEEPALIVE_TIMEOUT
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def _run(self, func, *args):
+        """Run blocking store work on the pool, at most max_concurrency calls at a time."""
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as e:
+                    writer.write(_response(e.status, _json_body({"error": e.message}), "application/json", False))
+                    await writer.drain()
+                    return
+                if request is None:
+                    return
+                method, path, version, headers, body = request
+                if (method, path) == ("GET", "/changes") and self.auth.check(headers.get("authorization")):
+                    # The stream holds the connection until the client goes away
+                    await self._stream_changes(writer, headers.get("last-event-id"))
+                    return
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                status, payload, content_type, extra = await self._handle(method, path, headers, body)
+                writer.write(_response(status, payload, content_type, keep_alive, extra))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _handle(self, method: str, path: str, headers: Headers,
+                      body: bytes) -> Tuple[int, bytes, str, Optional[Dict[str, str]]]:
+        protected = (method, path) in (("POST", "/swaig"), ("GET", "/metrics"), ("GET", "/changes"))
+        if protected and not self.auth.check(headers.get("authorization")):
+            return 401, _json_body({"error": "Authentication required"}), "application/json", \
+                {"WWW-Authenticate": 'Basic realm="reservations"'}
+        if path == "/swaig" and method == "POST":
+            status, response = await self._swaig(headers, body)
+            return status, _json_body(response), "application/json", None
+        if path in ("/", "/swaig") and method == "GET":
+            return await self._dashboard(headers)
+        if path == "/metrics" and method == "GET":
+            return 200, metrics.render().encode(), metrics.CONTENT_TYPE, None
+        if path in ("/", "/swaig"):
+            return 405, _json_body({"error": "Method not allowed"}), "application/json", None
+        return 404, _json_body({"error": "Not found"}), "application/json", None
+
+    async def _swaig(self, headers: Headers, body: bytes) -> Tuple[int, Any]:
+        if not _is_json(headers):
+            return 400, {"error": "Request must be JSON"}
+        try:
+            data = decode_json(body)
+        except ValueError:
+            return 400, {"error": "Invalid JSON"}
+        if isinstance(data, dict) and data.get("action") == "get_signature":
+            return 200, function_signatures(self.signatures, data.get("functions"), _base_url(headers))
+        response, status = await self._run(handle_payload, self.registry, data, headers.get("idempotency-key"))
+        return status, response
+
+    async def _stream_changes(self, writer: asyncio.StreamWriter, last_event_id: Optional[str]) -> None:
+        """Send change-feed events as they are published; the body ends when the connection closes."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        follower = Follower(reservation_system.changes, last_event_id,
+                            wakeup=lambda: loop.call_soon_threadsafe(ready.set))
+        try:
+            writer.write(("HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                          "Connection: close\r\n\r\n" + RETRY).encode())
+            while True:
+                await writer.drain()
+                try:
+                    await asyncio.wait_for(ready.wait(), DEFAULT_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    writer.write(HEARTBEAT.encode())
+                    continue
+                ready.clear()
+                writer.write(follower.take().encode())
+        finally:
+            follower.close()
+
+    async def _dashboard(self, headers: Headers) -> Tuple[int, bytes, str, Optional[Dict[str, str]]]:
+        try:
+            page = await self._run(app_new.dashboard.page, reservation_system.reservations,
+                                   os.getenv("GOOGLE_TAG"))
+        except Exception as e:
+            return 500, _json_body({"error": "Failed to serve HTML", "details": str(e)}), "application/json", None
+        if page is None:
+            return 500, _json_body({
+                "error": "Reservation page template not found",
+                "details": "The reservation.html file is missing from the static folder"
+            }), "application/json", None
+        html_content, etag = page
+        extra = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+        if f'"{etag}"' in headers.get("if-none-match", ""):
+            return 304, b"", "text/html; charset=utf-8", extra
+        return 200, html_content.encode(), "text/html; charset=utf-8", extra
+
+async def _main(args: argparse.Namespace) -> None:
+    pool = None
+    registry = None
+    if args.shards:
+        pool = ShardedReservations(args.shards, parse_locations(args.locations) if args.locations else None,
+                                   args.shard_dir).start()
+        registry = pool.registry(app_new.swaig_functions)
+    server = SWAIGServer(registry, workers=args.workers, max_concurrency=args.max_concurrency)
+    host, port = await server.start(args.host, args.port)
+    log_event(logging.INFO, "async_server_started", host=host, port=port, workers=args.workers,
+              max_concurrency=args.max_concurrency, shards=args.shards)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+        if pool is not None:
+            pool.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the SWAIG endpoint on an asyncio event loop")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 5001)))
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="threads running reservation functions")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="function calls allowed in flight at once")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="run reservations in this many worker processes per location (0: in this process); "
+                             "sharded mode has no change feed, dashboard data, waitlist or standing reservations, "
+                             "and a move across workers is not atomic (see README)")
+    parser.add_argument("--locations", help="with --shards: 'name=seats:count,...;name...' (default: one location)")
+    parser.add_argument("--shard-dir", help="with --shards: directory for each worker's SQLite store")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
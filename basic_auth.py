@@ -0,0 +1,47 @@
+"""
+HTTP Basic authentication against the configured username and password.
+
+The Authorization value a correct client sends is encoded once, when the
+checker is built. A request is then verified with a single constant-time
+comparison of its token against that value, with no base64 decoding and
+no per-request environment reads. Tokens that carry the same credentials
+in a different encoding, such as missing padding, are decoded and compared
+field by field, also in constant time.
+"""
+import base64
+import binascii
+import hmac
+import os
+from typing import Optional
+
+class BasicAuth:
+    """Checks Authorization headers against one username and password."""
+
+    def __init__(self, username: str, password: str):
+        self.username = username.encode()
+        self.password = password.encode()
+        self._token = base64.b64encode(self.username + b":" + self.password)
+
+    @classmethod
+    def from_env(cls) -> "BasicAuth":
+        """Credentials from HTTP_USERNAME and HTTP_PASSWORD."""
+        return cls(os.getenv("HTTP_USERNAME", ""), os.getenv("HTTP_PASSWORD", ""))
+
+    def check(self, header: Optional[str]) -> bool:
+        """True if header is 'Basic <token>' with the configured credentials."""
+        if not header:
+            return False
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != "basic":
+            return False
+        token_bytes = token.strip().encode("latin-1", "replace")
+        if hmac.compare_digest(token_bytes, self._token):
+            return True
+        try:
+            decoded = base64.b64decode(token_bytes + b"=" * (-len(token_bytes) % 4), validate=True)
+        except (binascii.Error, ValueError):
+            return False
+        username, sep, password = decoded.partition(b":")
+        # Both fields are always compared, so the time taken does not say which one was wrong
+        return bool(sep) & hmac.compare_digest(username, self.username) & \
+            hmac.compare_digest(password, self.password)
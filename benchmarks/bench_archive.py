@@ -0,0 +1,100 @@
+"""
+Benchmark archiving a backlog of past reservations while calls keep arriving.
+
+The store is filled with --past bookings spread over the previous year, then an
+Archiver works them off while a client thread books and reads future slots.
+Each row is one batch size: archiving throughput, and the client's median and
+worst call latency while archiving ran. A batch as large as the backlog is the
+stop-the-world case; smaller batches bound how long any call waits.
+
+Usage: python benchmarks/bench_archive.py [--past N] [--batches 100,1000,N] [--store memory|sqlite]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive  # noqa: E402
+import reservation_system  # noqa: E402
+from inventory import tables_from_spec  # noqa: E402
+from storage import MemoryStore, SQLiteStore  # noqa: E402
+
+STORES = {
+    "memory": lambda directory: MemoryStore(),
+    "sqlite": lambda directory: SQLiteStore(os.path.join(directory, "reservations.db"))
+}
+
+def fill(past: int) -> None:
+    today = datetime.now()
+    rows = []
+    for i in range(past):
+        date = (today - timedelta(days=1 + i % 365)).strftime("%Y-%m-%d")
+        minute = (i // 365) % (8 * 60)
+        rows.append((f"+2{i:010d}", {"name": "Past", "party_size": 2, "date": date,
+                                      "time": f"{14 + minute // 60:02d}:{minute % 60:02d}", "table": None}))
+    reservation_system.reservations.update(rows)
+
+def client(stop: threading.Event, latencies: list) -> None:
+    """Create and read back bookings on future dates until stopped."""
+    first_day = datetime.now() + timedelta(days=1)
+    n = 0
+    while not stop.is_set():
+        date = (first_day + timedelta(days=n % 60)).strftime("%Y-%m-%d")
+        minute = (n // 60) % (8 * 60)
+        phone_number = f"+1{n:010d}"
+        start = time.perf_counter()
+        reservation_system.create_reservation_response({
+            "name": "Live", "party_size": 2, "date": date, "phone_number": phone_number,
+            "time": f"{14 + minute // 60:02d}:{minute % 60:02d}"})
+        reservation_system.get_reservation_response({"phone_number": phone_number})
+        latencies.append(time.perf_counter() - start)
+        n += 1
+
+def run(batch_size: int, past: int, make_store) -> None:
+    directory = tempfile.mkdtemp(prefix="bench-archive-")
+    store = make_store(directory)
+    reservation_system.configure_store(store)
+    reservation_system.configure_inventory(tables_from_spec("2:1000,4:1000"))
+    try:
+        fill(past)
+        archiver = archive.Archiver(os.path.join(directory, "archive"), after=timedelta(0), batch_size=batch_size)
+        stop = threading.Event()
+        latencies: list = []
+        worker = threading.Thread(target=client, args=(stop, latencies))
+        worker.start()
+        start = time.perf_counter()
+        archived = archiver.run_once()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        worker.join()
+        if archived != past:
+            raise RuntimeError(f"archived {archived} of {past}")
+        size = sum(os.path.getsize(os.path.join(archiver.directory, name)) for name in os.listdir(archiver.directory))
+        print(f"{batch_size:>10}  {archived / elapsed:>10.0f}  {len(latencies):>8}  "
+              f"{statistics.median(latencies) * 1000:>8.2f}  {max(latencies) * 1000:>8.1f}  {size / past:>8.1f}")
+    finally:
+        store.close()
+        shutil.rmtree(directory)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--past", type=int, default=100000)
+    parser.add_argument("--batches", default="100,1000,N", help="batch sizes; N is the whole backlog")
+    parser.add_argument("--store", choices=sorted(STORES), default="memory")
+    args = parser.parse_args()
+    make_store = STORES[args.store]
+
+    print(f"{args.past} past bookings, {args.store} store")
+    print(f"{'batch':>10}  {'rows/s':>10}  {'calls':>8}  {'p50 ms':>8}  {'max ms':>8}  {'B/row':>8}")
+    for batch in args.batches.split(","):
+        run(args.past if batch == "N" else int(batch), args.past, make_store)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Load-test POST /swaig on the Flask app and on the asyncio server.
+
+Each server runs in its own process with the same seeded bookings. A local
+asyncio client then opens --clients concurrent connections and sends get and
+create calls (--create-share of them creates) until --requests have been
+answered. It reports requests per second and p50/p99 latency. The Flask app is
+served the way `python app_new.py` serves it (Werkzeug, one thread per
+connection, HTTP/1.0), so its clients reconnect for every request.
+
+Usage: python benchmarks/bench_async_server.py [--clients 500] [--requests 20000] [--create-share 0.2]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEEDED = 2000
+PHONE_BASE = 19185550000
+# The credentials the server processes default to
+AUTHORIZATION = b"Basic " + base64.b64encode(
+    f"{os.getenv('HTTP_USERNAME', 'admin')}:{os.getenv('HTTP_PASSWORD', 'secret')}".encode())
+
+def _future_date(offset: int) -> str:
+    return (datetime.now() + timedelta(days=1 + offset % 60)).strftime("%Y-%m-%d")
+
+def serve(kind: str, port: int, seeded: int) -> None:
+    """Child process: seed the store and serve one of the two servers on port."""
+    os.environ.setdefault("HTTP_USERNAME", "admin")
+    os.environ.setdefault("HTTP_PASSWORD", "secret")
+    import logging
+    logging.disable(logging.INFO)
+    import reservation_system
+    for i in range(seeded):
+        reservation_system.create_reservation_response({
+            "name": f"Guest {i}", "party_size": 2, "date": _future_date(i),
+            "time": f"{14 + i % 8}:{(i // 60) % 4 * 15:02d}", "phone_number": f"+{PHONE_BASE + i}"})
+    if kind == "flask":
+        from werkzeug.serving import make_server
+        import app_new
+        make_server("127.0.0.1", port, app_new.app, threaded=True).serve_forever()
+    else:
+        import async_server
+
+        async def run():
+            server = async_server.SWAIGServer()
+            await server.start("127.0.0.1", port)
+            await server.serve_forever()
+        asyncio.run(run())
+
+def _payload(rng: random.Random, create_share: float, counter: List[int]) -> bytes:
+    if rng.random() < create_share:
+        counter[0] += 1
+        n = counter[0]
+        body = {"function": "create_reservation", "arguments": {
+            "name": f"Load {n}", "party_size": 2, "date": _future_date(n), "time": f"{14 + n % 8}:00",
+            "phone_number": f"+{PHONE_BASE + 100000 + n}"}}
+    else:
+        body = {"function": "get_reservation",
+                "arguments": {"phone_number": f"+{PHONE_BASE + rng.randrange(SEEDED)}"}}
+    data = json.dumps(body).encode()
+    return (b"POST /swaig HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+            b"Authorization: %s\r\nContent-Length: %d\r\n\r\n" % (AUTHORIZATION, len(data))) + data
+
+async def _client(port: int, remaining: List[int], latencies: List[float], errors: List[int],
+                  rng: random.Random, create_share: float, counter: List[int]) -> None:
+    reader: Optional[asyncio.StreamReader] = None
+    writer: Optional[asyncio.StreamWriter] = None
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        request = _payload(rng, create_share, counter)
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            head = (await reader.readuntil(b"\r\n\r\n")).lower()
+            length = int(head.split(b"content-length:", 1)[1].split(b"\r\n", 1)[0])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if b"connection: close" in head or head.startswith(b"http/1.0"):
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError):
+            errors[0] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+async def load(port: int, clients: int, requests: int, create_share: float) -> dict:
+    latencies: List[float] = []
+    errors, remaining, counter = [0], [requests], [0]
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(port, remaining, latencies, errors, random.Random(i), create_share, counter)
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000  # noqa: E731
+    return {"rps": len(latencies) / elapsed, "p50": pick(0.50), "p99": pick(0.99), "errors": errors[0]}
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_for(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--create-share", type=float, default=0.2)
+    parser.add_argument("--serve", choices=("flask", "async"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.port, SEEDED)
+        return
+
+    print(f"{args.clients} concurrent clients, {args.requests} requests, {args.create_share:.0%} creates")
+    print(f"{'server':<8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for kind in ("flask", "async"):
+        port = _free_port()
+        child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", kind, "--port", str(port)],
+                                 cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_for(port)
+            result = asyncio.run(load(port, args.clients, args.requests, args.create_share))
+        finally:
+            child.terminate()
+            child.wait()
+        print(f"{kind:<8} {result['rps']:>9.0f} {result['p50']:>9.1f} {result['p99']:>9.1f} {result['errors']:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark bulk CSV import against booking the same rows one create_reservation call at a time.
+
+Rows are spread one per minute of opening hours over as many days as needed,
+written to a temporary CSV file and imported into a fresh store of each kind.
+The per-row baseline books the first --baseline-rows rows and is scaled up.
+
+Usage: python benchmarks/bench_bulk.py [--rows 500000] [--stores memory,sqlite] [--chunk-size N]
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk  # noqa: E402
+import reservation_system  # noqa: E402
+from inventory import tables_from_spec  # noqa: E402
+from storage import MemoryStore, SQLiteStore  # noqa: E402
+
+SLOTS_PER_DAY = 8 * 60  # one booking per minute between 14:00 and 22:00
+# Enough two-tops for a new party every minute with 75-minute turns
+BENCH_TABLES = "2:80"
+
+def write_rows(path: str, rows: int, first_day: datetime) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(("phone_number", "name", "party_size", "date", "time"))
+        for i in range(rows):
+            day, minute = divmod(i, SLOTS_PER_DAY)
+            date = (first_day + timedelta(days=day)).strftime("%Y-%m-%d")
+            writer.writerow((f"+1{i:010d}", f"Guest {i}", 2, date, f"{14 + minute // 60:02d}:{minute % 60:02d}"))
+
+def fresh_store(kind: str, directory: str):
+    if kind == "memory":
+        store = MemoryStore()
+    else:
+        path = os.path.join(directory, "bench.db")
+        if os.path.exists(path):
+            os.remove(path)
+        store = SQLiteStore(path)
+    reservation_system.configure_store(store)
+    return store
+
+def time_import(kind: str, path: str, directory: str, chunk_size: int) -> float:
+    """Rows per second for bulk.import_reservations of the whole file."""
+    store = fresh_store(kind, directory)
+    start = time.perf_counter()
+    with open(path, newline="", encoding="utf-8") as f:
+        report = bulk.import_reservations(f, "csv", chunk_size)
+    elapsed = time.perf_counter() - start
+    store.close()
+    if report.failed:
+        raise RuntimeError(f"Unexpected import errors: {report.errors[:5]}")
+    return report.imported / elapsed
+
+def time_per_row(kind: str, path: str, directory: str, rows: int) -> float:
+    """Rows per second booking the first `rows` rows with create_reservation_response."""
+    store = fresh_store(kind, directory)
+    with open(path, newline="", encoding="utf-8") as f:
+        batch = [row for _, row in zip(range(rows), csv.DictReader(f))]
+    start = time.perf_counter()
+    for row in batch:
+        result = reservation_system.create_reservation_response(row)
+        if result != "Reservation successfully created.":
+            raise RuntimeError(f"Unexpected create result: {result}")
+    elapsed = time.perf_counter() - start
+    store.close()
+    return len(batch) / elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--baseline-rows", type=int, default=20000)
+    parser.add_argument("--stores", default="memory,sqlite")
+    parser.add_argument("--chunk-size", type=int, default=bulk.DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    reservation_system.configure_inventory(tables_from_spec(BENCH_TABLES))
+    saved = reservation_system.reservations
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bookings.csv")
+        write_rows(path, args.rows, datetime.now() + timedelta(days=1))
+        print(f"{'store':>8}  {'rows':>8}  {'import rows/s':>14}  {'per-row rows/s':>15}  {'speedup':>8}")
+        for kind in args.stores.split(","):
+            baseline = time_per_row(kind, path, directory, min(args.baseline_rows, args.rows))
+            rate = time_import(kind, path, directory, args.chunk_size)
+            print(f"{kind:>8}  {args.rows:>8}  {rate:>14.0f}  {baseline:>15.0f}  {rate / baseline:>7.1f}x")
+    reservation_system.configure_store(saved)
+
+if __name__ == "__main__":
+    main()
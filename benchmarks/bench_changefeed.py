@@ -0,0 +1,74 @@
+"""
+Benchmark what the change feed costs bookings as subscribers are added.
+
+Each row books --bookings reservations while --subscribers followers drain the
+feed on their own threads, one of them stalled (never reading). It reports the
+median and p99 create_reservation latency, how many changes the slowest live
+follower received, and how many the stalled one holds: at most the per-
+subscriber buffer, however many bookings were made.
+
+Usage: python benchmarks/bench_changefeed.py [--subscribers 0,10,50] [--bookings 20000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reservation_system  # noqa: E402
+from changefeed import ChangeFeed, Follower  # noqa: E402
+from inventory import tables_from_spec  # noqa: E402
+from storage import MemoryStore  # noqa: E402
+
+def follow(follower: Follower, stop: threading.Event, counts: list, slot: int) -> None:
+    while not stop.is_set():
+        counts[slot] += follower.wait(0.1).count("\nevent: ")
+    follower.close()
+
+def run(subscribers: int, bookings: int) -> None:
+    reservation_system.configure_store(MemoryStore())
+    reservation_system.configure_inventory(tables_from_spec("2:1000"))
+    feed = reservation_system.changes = ChangeFeed()
+    stop = threading.Event()
+    counts = [0] * subscribers
+    threads = [threading.Thread(target=follow, args=(Follower(feed), stop, counts, i)) for i in range(subscribers)]
+    stalled = feed.subscribe() if subscribers else None
+    for thread in threads:
+        thread.start()
+
+    first_day = datetime.now() + timedelta(days=1)
+    latencies = []
+    for n in range(bookings):
+        minute = (n // 30) % (8 * 60)
+        data = {"name": "Guest", "party_size": 2, "phone_number": f"+1{n:010d}",
+                "date": (first_day + timedelta(days=n % 30)).strftime("%Y-%m-%d"),
+                "time": f"{14 + minute // 60:02d}:{minute % 60:02d}"}
+        start = time.perf_counter()
+        reservation_system.create_reservation_response(data)
+        latencies.append(time.perf_counter() - start)
+    # Let the followers drain what is left
+    time.sleep(0.5)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    print(f"{subscribers:>12}  {statistics.median(latencies) * 1e6:>8.1f}  "
+          f"{latencies[int(len(latencies) * 0.99)] * 1e6:>8.1f}  {min(counts, default=0):>10}  "
+          f"{len(stalled.take()) if stalled else 0:>8}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", default="0,10,50")
+    parser.add_argument("--bookings", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'subscribers':>12}  {'p50 us':>8}  {'p99 us':>8}  {'delivered':>10}  {'stalled':>8}")
+    for subscribers in args.subscribers.split(","):
+        run(int(subscribers), args.bookings)
+
+if __name__ == "__main__":
+    main()
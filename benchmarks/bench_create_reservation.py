@@ -0,0 +1,73 @@
+"""
+Benchmark create_reservation_response latency against the size of the booking book.
+
+Usage: python benchmarks/bench_create_reservation.py [--sizes 100,1000,...] [--creates N]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reservation_system  # noqa: E402
+from inventory import tables_from_spec  # noqa: E402
+from storage import MemoryStore  # noqa: E402
+
+SLOTS_PER_DAY = 8 * 60  # one booking per minute between 14:00 and 22:00
+# Enough two-tops for a new party every minute with 75-minute turns
+BENCH_TABLES = "2:80"
+
+def slot_for(index: int, first_day: datetime):
+    day, minute = divmod(index, SLOTS_PER_DAY)
+    date = (first_day + timedelta(days=day)).strftime("%Y-%m-%d")
+    return date, f"{14 + minute // 60:02d}:{minute % 60:02d}"
+
+def populate(size: int, first_day: datetime) -> None:
+    """Fill the store with `size` reservations on distinct slots, bypassing validation."""
+    reservation_system.configure_store(MemoryStore())
+    for i in range(size):
+        date, time_str = slot_for(i, first_day)
+        reservation_system.reservations[f"+1{i:010d}"] = {
+            "name": f"Guest {i}",
+            "party_size": 2,
+            "date": date,
+            "time": time_str
+        }
+    reservation_system.rebuild_inventory()
+
+def time_creates(size: int, creates: int, first_day: datetime) -> float:
+    """Return mean microseconds per successful create with `size` bookings already stored."""
+    elapsed = 0.0
+    for i in range(creates):
+        date, time_str = slot_for(size + i, first_day)
+        data = {
+            "name": "Bench Guest",
+            "party_size": 2,
+            "date": date,
+            "time": time_str,
+            "phone_number": f"+2{size + i:010d}"
+        }
+        start = time.perf_counter()
+        result = reservation_system.create_reservation_response(data)
+        elapsed += time.perf_counter() - start
+        if result != "Reservation successfully created.":
+            raise RuntimeError(f"Unexpected create result: {result}")
+    return elapsed / creates * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="100,1000,10000,100000,1000000")
+    parser.add_argument("--creates", type=int, default=2000)
+    args = parser.parse_args()
+
+    first_day = datetime.now() + timedelta(days=1)
+    reservation_system.configure_inventory(tables_from_spec(BENCH_TABLES))
+    print(f"{'stored':>10}  {'us/create':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        populate(size, first_day)
+        print(f"{size:>10}  {time_creates(size, args.creates, first_day):>10.2f}")
+
+if __name__ == "__main__":
+    main()
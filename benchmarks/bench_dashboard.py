@@ -0,0 +1,95 @@
+"""
+Benchmark dashboard rendering: the old string-concatenation build against the cached renderer.
+
+Usage: python benchmarks/bench_dashboard.py [--rows N] [--polls N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboard import DashboardRenderer, scramble_phone_number  # noqa: E402
+from storage import MemoryStore  # noqa: E402
+
+TEMPLATE = "<html><head></head><body>{{reservations_table}}</body></html>"
+
+def legacy_table_html(reservations) -> str:
+    table_html = """
+    <table border="1">
+        <tr>
+            <th>Name</th>
+            <th>Phone</th>
+            <th>Date</th>
+            <th>Time</th>
+            <th>Party Size</th>
+        </tr>
+    """
+    for phone, details in reservations.items():
+        scrambled = scramble_phone_number(phone)
+        table_html += f"""
+        <tr>
+            <td>{details['name']}</td>
+            <td>{scrambled}</td>
+            <td>{details['date']}</td>
+            <td>{details['time']}</td>
+            <td>{details['party_size']}</td>
+        </tr>
+        """
+    table_html += "</table>"
+    return table_html
+
+def legacy_page(path: str, reservations) -> str:
+    with open(path, 'r') as file:
+        html_content = file.read()
+    return html_content.replace("{{reservations_table}}", legacy_table_html(reservations))
+
+def reservation(i: int) -> dict:
+    return {"name": f"Guest {i}", "party_size": 2 + i % 6, "date": f"2030-01-{1 + i % 28:02d}",
+            "time": f"{14 + i % 8}:{(i % 4) * 15:02d}"}
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--polls", type=int, default=50)
+    args = parser.parse_args()
+
+    store = MemoryStore()
+    for i in range(args.rows):
+        store[f"+1918{i:07d}"] = reservation(i)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reservation.html")
+        with open(path, "w") as file:
+            file.write(TEMPLATE)
+        renderer = DashboardRenderer(path)
+
+        legacy_ms = timed(lambda: legacy_page(path, store), args.polls)
+        cold_ms = timed(lambda: renderer.page(store), 1)
+        warm_ms = timed(lambda: renderer.page(store), args.polls)
+
+        rng = random.Random(1)
+
+        def one_change():
+            i = rng.randrange(args.rows)
+            store[f"+1918{i:07d}"] = dict(reservation(i), name=f"Changed {rng.random()}")
+            renderer.page(store)
+        change_ms = timed(one_change, args.polls)
+
+    print(f"{args.rows} rows, ms per request")
+    print(f"  legacy (read template, += rows)   {legacy_ms:9.2f}")
+    print(f"  cached, first render              {cold_ms:9.2f}")
+    print(f"  cached, unchanged poll            {warm_ms:9.3f}")
+    print(f"  cached, after one changed row     {change_ms:9.2f}")
+
+if __name__ == "__main__":
+    main()
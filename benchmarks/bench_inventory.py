@@ -0,0 +1,69 @@
+"""
+Benchmark table allocation with a large floor plan and a full booking horizon.
+
+Usage: python benchmarks/bench_inventory.py [--tables SPEC] [--days N] [--lookups N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory import TableInventory, tables_from_spec  # noqa: E402
+
+OPEN_MINUTE = 14 * 60
+CLOSE_MINUTE = 22 * 60
+
+def random_request(rng: random.Random, days):
+    return (rng.choice(days),
+            rng.randrange(OPEN_MINUTE, CLOSE_MINUTE, 15),
+            rng.choice((1, 2, 2, 2, 3, 4, 4, 5, 6, 8, 10)))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tables", default="2:120,4:120,6:40,8:15,12:4,20:1")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--fill", type=int, default=60000, help="bookings to place before timing")
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    inventory = TableInventory(tables_from_spec(args.tables))
+    today = date.today()
+    days = [(today + timedelta(days=d)).isoformat() for d in range(args.days)]
+
+    start = time.perf_counter()
+    placed = sum(inventory.allocate(*random_request(rng, days)) is not None for _ in range(args.fill))
+    fill_elapsed = time.perf_counter() - start
+    print(f"tables={len(inventory.tables)} days={args.days} placed={placed}/{args.fill} "
+          f"({fill_elapsed / args.fill * 1e6:.1f} us/allocate while filling)")
+
+    requests = [random_request(rng, days) for _ in range(args.lookups)]
+    samples = []
+    for request in requests:
+        t0 = time.perf_counter()
+        inventory.find_table(*request)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    mean = sum(samples) / len(samples)
+    p99 = samples[int(len(samples) * 0.99)]
+    print(f"find_table: mean {mean * 1e6:.1f} us, p99 {p99 * 1e6:.1f} us, max {samples[-1] * 1e6:.1f} us")
+
+    # Availability search: one free-start bitmap per day and party turn versus probing every 15-minute start
+    starts = range(OPEN_MINUTE, CLOSE_MINUTE, 15)
+    t0 = time.perf_counter()
+    for day, _, party_size in requests:
+        [m for m in starts if inventory.find_table(day, m, party_size) is not None]
+    probe = (time.perf_counter() - t0) / len(requests)
+    t0 = time.perf_counter()
+    for day, _, party_size in requests:
+        free = inventory.free_starts(day, party_size)
+        [m for m in starts if free >> m & 1]
+    bitmap = (time.perf_counter() - t0) / len(requests)
+    print(f"open starts for a day: probing {probe * 1e6:.1f} us, free_starts {bitmap * 1e6:.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark the journaled store: startup from a snapshot, journal replay, and group-commit throughput.
+
+Startup is the time to open a store over the snapshot; index entries are
+built per date on first use, so the time to touch every date is shown
+separately. Replay times only reading and applying the journal's entries,
+not opening the store around them.
+
+Usage: python benchmarks/bench_journal.py [--reservations N] [--replay N] [--writers N] [--writes N]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import SNAPSHOT_FILE, JournaledStore, read_journal, write_snapshot  # noqa: E402
+from records import Reservation, start_minute  # noqa: E402
+
+def reservations(count: int):
+    rng = random.Random(11)
+    today = date.today()
+    days = [(today + timedelta(days=d)).isoformat() for d in range(365)]
+    times = [f"{h}:{m:02d}" for h in range(14, 22) for m in (0, 15, 30, 45)]
+    for i in range(count):
+        yield f"+1918{i:07d}", Reservation(f"Guest {rng.randrange(20000)}", rng.randint(1, 8),
+                                           start_minute(rng.choice(days), rng.choice(times)), f"T{rng.randint(1, 40)}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reservations", type=int, default=1000000)
+    parser.add_argument("--replay", type=int, default=100000, help="journal entries to replay on startup")
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=200, help="transactions per writer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_dir = os.path.join(tmp, "snapshot")
+        os.makedirs(snapshot_dir)
+        items = list(reservations(args.reservations))
+        start = time.perf_counter()
+        write_snapshot(os.path.join(snapshot_dir, SNAPSHOT_FILE), items, generation=1)
+        del items
+        written = time.perf_counter() - start
+        size = os.path.getsize(os.path.join(snapshot_dir, SNAPSHOT_FILE))
+        start = time.perf_counter()
+        store = JournaledStore(snapshot_dir)
+        loaded = time.perf_counter() - start
+        start = time.perf_counter()
+        for day in list(store._date_order):
+            store.on_date(day)
+        indexed = time.perf_counter() - start
+        print(f"snapshot: {len(store)} reservations, {size / 2**20:.1f} MiB, written in {written:.2f}s, "
+              f"startup load {loaded:.2f}s, indexing every date on first use {indexed:.2f}s")
+        store.close()
+        # Free the million records before the next run, so collections there do not walk them
+        del store
+        gc.collect()
+
+        replay_dir = os.path.join(tmp, "replay")
+        store = JournaledStore(replay_dir, sync="batch")
+        for phone, reservation in reservations(args.replay):
+            store[phone] = reservation
+        path = store.journal.path
+        store.close()
+        target = JournaledStore(os.path.join(tmp, "replay-target"))
+        start = time.perf_counter()
+        entries, _ = read_journal(path)
+        for entry in entries:
+            target._replay(entry)
+        replayed = time.perf_counter() - start
+        print(f"journal: replayed {len(entries)} entries in {replayed:.2f}s "
+              f"(~{replayed / len(entries) * args.reservations:.1f}s for {args.reservations})")
+        target.close()
+
+        for sync in ("always", "batch"):
+            store = JournaledStore(os.path.join(tmp, f"commit-{sync}"), sync=sync)
+            fsyncs = []
+            real_fsync = os.fsync
+
+            def counting_fsync(fd):
+                fsyncs.append(fd)
+                real_fsync(fd)
+            os.fsync = counting_fsync
+
+            def writer(w: int) -> None:
+                for i in range(args.writes):
+                    with store.transaction():
+                        store[f"+1{w:03d}{i:07d}"] = {"name": "Guest", "party_size": 2, "date": "2030-01-01",
+                                                      "time": "19:00"}
+
+            threads = [threading.Thread(target=writer, args=(w,)) for w in range(args.writers)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            store.close()
+            os.fsync = real_fsync
+            total = args.writers * args.writes
+            print(f"commit ({sync}): {total / elapsed:,.0f} transactions/s with {args.writers} writers, "
+                  f"{total / max(1, len(fsyncs)):.1f} transactions per fsync")
+
+if __name__ == "__main__":
+    main()
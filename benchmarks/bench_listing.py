@@ -0,0 +1,65 @@
+"""
+Benchmark one-day listings against a full scan of the store.
+
+Usage: python benchmarks/bench_listing.py [--reservations N] [--days N] [--queries N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reservation_system  # noqa: E402
+from storage import MemoryStore, SQLiteStore  # noqa: E402
+
+def fill(store, count: int, days) -> None:
+    rng = random.Random(7)
+    with store.transaction():
+        for i in range(count):
+            store[f"+1918{i:07d}"] = {"name": f"Guest {i}", "party_size": rng.randint(1, 8),
+                                      "date": rng.choice(days), "time": f"{rng.randint(14, 21)}:{rng.choice(('00', '30'))}"}
+
+def full_scan(store, day: str):
+    return sorted((r["time"], phone) for phone, r in store.items() if r["date"] == day)
+
+def timed_ms(fn, queries: int, days) -> float:
+    rng = random.Random(3)
+    start = time.perf_counter()
+    for _ in range(queries):
+        fn(rng.choice(days))
+    return (time.perf_counter() - start) / queries * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reservations", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    today = date.today()
+    days = [(today + timedelta(days=d)).isoformat() for d in range(args.days)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, store in (("memory", MemoryStore()), ("sqlite", SQLiteStore(os.path.join(tmp, "bench.db")))):
+            fill(store, args.reservations, days)
+            reservation_system.configure_store(store)
+
+            def one_day(day):
+                return reservation_system.list_reservations(from_date=day, to_date=day,
+                                                            limit=reservation_system.MAX_PAGE_SIZE)
+
+            def stream_day(day):
+                return sum(1 for _ in reservation_system.iter_reservations(from_date=day, to_date=day))
+
+            scan_ms = timed_ms(lambda day: full_scan(store, day), max(1, args.queries // 10), days)
+            page_ms = timed_ms(one_day, args.queries, days)
+            stream_ms = timed_ms(stream_day, args.queries, days)
+            print(f"{name:<7} full scan {scan_ms:9.2f} ms   indexed page {page_ms:7.3f} ms   "
+                  f"streamed day {stream_ms:7.3f} ms")
+            store.close()
+
+if __name__ == "__main__":
+    main()
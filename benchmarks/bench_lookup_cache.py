@@ -0,0 +1,62 @@
+"""
+Benchmark get_reservation with and without the reply cache, for the memory and SQLite stores.
+
+Each round asks for the same few hundred numbers again and again, as callers do
+during a conversation, with an occasional update in between.
+
+Usage: python benchmarks/bench_lookup_cache.py [--bookings N] [--gets N] [--write-every N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reservation_system  # noqa: E402
+from inventory import tables_from_spec  # noqa: E402
+from storage import MemoryStore, SQLiteStore  # noqa: E402
+
+def run(store, bookings: int, gets: int, write_every: int, capacity: int) -> float:
+    """Microseconds per get_reservation_response call."""
+    reservation_system.configure_store(store)
+    reservation_system.lookups.capacity = capacity
+    reservation_system.lookups.invalidate(None)
+    first_day = datetime.now() + timedelta(days=1)
+    for i in range(bookings):
+        store[f"+1{i:010d}"] = {"name": f"Guest {i}", "party_size": 2,
+                                "date": (first_day + timedelta(days=i % 30)).strftime("%Y-%m-%d"),
+                                "time": f"{14 + i % 8}:00", "table": None}
+    rng = random.Random(1)
+    phones = [f"+1{rng.randrange(bookings):010d}" for _ in range(gets)]
+    start = time.perf_counter()
+    for n, phone in enumerate(phones):
+        if write_every and n % write_every == 0:
+            reservation_system.update_reservation_response({"phone_number": phone, "name": f"Renamed {n}"})
+        reservation_system.get_reservation_response({"phone_number": phone})
+    return (time.perf_counter() - start) / gets * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=300)
+    parser.add_argument("--gets", type=int, default=50000)
+    parser.add_argument("--write-every", type=int, default=200, help="update one booking every N gets (0 = never)")
+    args = parser.parse_args()
+    reservation_system.configure_inventory(tables_from_spec("2:50,4:50"))
+
+    print(f"{'store':<8} {'uncached us':>12} {'cached us':>10} {'hit rate':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, factory in (("memory", MemoryStore), ("sqlite", lambda: SQLiteStore(os.path.join(tmp, "r.db")))):
+            uncached = run(factory(), args.bookings, args.gets, args.write_every, 0)
+            lookups = reservation_system.lookups
+            hits, misses = lookups.hits, lookups.misses
+            cached = run(factory(), args.bookings, args.gets, args.write_every, 10000)
+            rate = (lookups.hits - hits) / max(1, lookups.hits - hits + lookups.misses - misses)
+            print(f"{name:<8} {uncached:>12.2f} {cached:>10.2f} {rate:>8.0%}")
+            reservation_system.reservations.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Measure what metrics recording adds to a SWAIG call.
+
+Runs get_reservation and create_reservation through swaig_dispatcher.call_function
+with metrics on and off and reports the per-call difference, plus the raw cost
+of one counter increment, one histogram observation and one stage timer. The
+on and off runs alternate, swapping which goes first every round, and each
+figure is the median of --rounds rounds.
+
+Usage: python benchmarks/bench_metrics.py [--calls N] [--rounds N]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("HTTP_USERNAME", "admin")
+os.environ.setdefault("HTTP_PASSWORD", "secret")
+
+import app_new  # noqa: E402
+import metrics  # noqa: E402
+import reservation_system  # noqa: E402
+from swaig_dispatcher import call_function  # noqa: E402
+
+# Building the app logs every endpoint it registers at DEBUG
+logging.disable(logging.DEBUG)
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+def run_calls(calls: int, first_day: datetime) -> dict:
+    reservation_system.reservations.clear()
+    reservation_system.rebuild_inventory()
+
+    def create(i: int) -> None:
+        day, minute = divmod(i, 32)
+        call_function(app_new.swaig_functions, "create_reservation", {
+            "name": "Bench", "party_size": 2, "date": (first_day + timedelta(days=day % 300)).strftime("%Y-%m-%d"),
+            "time": f"{14 + minute // 4:02d}:{minute % 4 * 15:02d}", "phone_number": f"+1{i:010d}"})
+
+    def get(i: int) -> None:
+        call_function(app_new.swaig_functions, "get_reservation", {"phone_number": f"+1{i:010d}"})
+    return {"create": per_call_us(create, calls), "get": per_call_us(get, calls)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    first_day = datetime.now() + timedelta(days=1)
+
+    samples = {True: [], False: []}
+    for round_number in range(args.rounds):
+        # Swapping the order each round keeps warm-up and drift from favouring either setting
+        for enabled in ((True, False) if round_number % 2 == 0 else (False, True)):
+            metrics.enabled = enabled
+            samples[enabled].append(run_calls(args.calls, first_day))
+    metrics.enabled = True
+    on, off = ({name: statistics.median(run[name] for run in samples[enabled]) for name in ("get", "create")}
+               for enabled in (True, False))
+
+    print(f"{'call':<8} {'off us':>9} {'on us':>9} {'added us':>9}")
+    for name in ("get", "create"):
+        print(f"{name:<8} {off[name]:>9.2f} {on[name]:>9.2f} {on[name] - off[name]:>9.2f}")
+
+    registry = metrics.Registry()
+    counter = registry.counter("bench_total", "Bench.", ["function"])
+    histogram = registry.histogram("bench_seconds", "Bench.", ["function"])
+    n = 200000
+    print(f"counter inc       {per_call_us(lambda i: counter.inc('get_reservation'), n):.3f} us")
+    print(f"histogram observe {per_call_us(lambda i: histogram.observe(0.0004, 'get_reservation'), n):.3f} us")
+
+    def timed(i: int) -> None:
+        with metrics.stage("bench"):
+            pass
+    print(f"stage timer       {per_call_us(timed, n):.3f} us")
+
+if __name__ == "__main__":
+    main()
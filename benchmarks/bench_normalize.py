@@ -0,0 +1,88 @@
+"""
+Benchmark SWAIG request normalization with large meta_data payloads.
+
+Compares the old path (Flask get_json, transform_swaig_request re-serialising
+the call into a new wsgi.input, then get_json again for dispatch) with the
+parse-once path (decode_json plus normalize_call), using both the standard
+library decoder and orjson when it is installed.
+
+Usage: python benchmarks/bench_normalize.py [--sizes 1,64,512] [--repeat N]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("HTTP_USERNAME", "admin")
+os.environ.setdefault("HTTP_PASSWORD", "secret")
+
+import app_new  # noqa: E402
+import swaig_handler  # noqa: E402
+from swaig_handler import decode_json, normalize_call  # noqa: E402
+
+def legacy_transform(request) -> None:
+    """transform_swaig_request as it was: parse, rebuild, re-serialise into wsgi.input."""
+    data = request.get_json(silent=True)
+    if data and 'function' in data:
+        if 'arguments' in data:
+            args = dict(data['arguments'])
+        else:
+            args = {k: v for k, v in data.items() if k not in ('function', 'argument', 'meta_data', 'meta_data_token')}
+        new_data = {'function': data['function'], 'arguments': args}
+        request._cached_json = {True: None, False: None}
+        json_data = json.dumps(new_data)
+        request.environ['wsgi.input'] = io.BytesIO(json_data.encode('utf-8'))
+        request.environ['CONTENT_LENGTH'] = str(len(json_data))
+        request.environ['CONTENT_TYPE'] = 'application/json'
+
+def payload(kilobytes: int) -> bytes:
+    turns = [{"role": "user" if i % 2 else "assistant", "content": f"turn {i} " + "x" * 80,
+              "ts": 1700000000 + i, "tokens": [i, i + 1, i + 2]} for i in range(kilobytes * 8)]
+    return json.dumps({
+        "function": "get_reservation",
+        "argument": {"parsed": [{"phone_number": "+19185551234"}], "raw": "{\"phone_number\": \"+19185551234\"}"},
+        "meta_data_token": "abc123",
+        "meta_data": {"conversation": turns, "caller": {"id": "c-1", "region": "us"}},
+    }).encode()
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,64,512", help="meta_data sizes in KiB")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    fast = swaig_handler._fast_loads
+
+    print(f"{'body':>10} {'old us':>10} {'json us':>10} {'orjson us':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        body = payload(size)
+        repeat = max(5, args.repeat // max(1, size // 16))
+
+        def old() -> None:
+            with app_new.app.test_request_context('/swaig', method='POST', data=body,
+                                                  content_type='application/json') as ctx:
+                legacy_transform(ctx.request)
+                ctx.request.get_json()
+
+        def new() -> None:
+            with app_new.app.test_request_context('/swaig', method='POST', data=body,
+                                                  content_type='application/json') as ctx:
+                normalize_call(decode_json(ctx.request.get_data(cache=False)))
+
+        old_us = timed(old, repeat)
+        swaig_handler._fast_loads = None
+        json_us = timed(new, repeat)
+        swaig_handler._fast_loads = fast
+        orjson_us = timed(new, repeat) if fast is not None else float("nan")
+        print(f"{len(body) // 1024:>7} KiB {old_us:>10.0f} {json_us:>10.0f} {orjson_us:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Memory and comparison cost of reservation dicts against records.Reservation.
+
+Usage: python benchmarks/bench_records.py [--count N] [--names N]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Reservation, start_minute  # noqa: E402
+
+def bookings(count: int, names: int):
+    """Yield (phone, fields) with fresh string objects, as if each came from a parsed request."""
+    rng = random.Random(5)
+    first = ["Ann", "Bo", "Carol", "Dan", "Eve", "Finn", "Gus", "Hana", "Ivy", "Jon"]
+    today = date.today()
+    days = [(today + timedelta(days=d)).isoformat() for d in range(365)]
+    times = [f"{h}:{m:02d}" for h in range(14, 22) for m in (0, 15, 30, 45)]
+    for i in range(count):
+        n = rng.randrange(names)
+        yield (f"+1918{i:07d}", "".join([first[n % 10], " Guest", str(n)]), rng.randint(1, 8),
+               "".join(rng.choice(days)), "".join(rng.choice(times)), "T" + str(rng.randint(1, 40)))
+
+def measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, size, elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--names", type=int, default=20000, help="distinct guest names")
+    args = parser.parse_args()
+
+    def build_dicts():
+        return {phone: {"name": name, "party_size": size, "date": d, "time": t, "table": table}
+                for phone, name, size, d, t, table in bookings(args.count, args.names)}
+
+    def build_records():
+        return {phone: Reservation(name, size, start_minute(d, t), table)
+                for phone, name, size, d, t, table in bookings(args.count, args.names)}
+
+    dicts, dict_bytes, dict_s = measure(build_dicts)
+    records, record_bytes, record_s = measure(build_records)
+
+    # Phone keys are common to both layouts; report them separately
+    key_bytes = sum(sys.getsizeof(phone) for phone in dicts)
+    print(f"{args.count} reservations, {args.names} distinct names")
+    print(f"  dict layout    {dict_bytes / 2**20:8.1f} MiB  {(dict_bytes - key_bytes) / args.count:6.0f} B/booking "
+          f"(excl. phone keys)  built in {dict_s:.1f}s")
+    print(f"  Reservation    {record_bytes / 2**20:8.1f} MiB  {(record_bytes - key_bytes) / args.count:6.0f} B/booking "
+          f"(excl. phone keys)  built in {record_s:.1f}s")
+
+    # Ordering bookings by start: string pairs against one integer
+    dict_values, record_values = list(dicts.values()), list(records.values())
+    start = time.perf_counter()
+    dict_values.sort(key=lambda r: (r["date"], r["time"]))
+    dict_sort = time.perf_counter() - start
+    start = time.perf_counter()
+    record_values.sort(key=lambda r: r.start)
+    record_sort = time.perf_counter() - start
+    print(f"  sort by start  dict {dict_sort:.2f}s, Reservation {record_sort:.2f}s")
+
+if __name__ == "__main__":
+    main()
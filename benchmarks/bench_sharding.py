@@ -0,0 +1,93 @@
+"""
+Benchmark booking throughput of ShardedReservations from 1 to N worker processes.
+
+Client threads create a booking and read it back, on dates spread over a
+booking horizon and across --locations locations, so every shard gets
+traffic. Each row of output is one shard count; the in-process row runs the
+same calls straight against reservation_system for comparison. Scaling
+needs free cores: the router and every worker are separate processes, so on
+a machine with fewer cores than shards the extra workers only add IPC.
+
+Usage: python benchmarks/bench_sharding.py [--max-shards N] [--threads N] [--calls N] [--locations N]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reservation_system  # noqa: E402
+from inventory import tables_from_spec  # noqa: E402
+from sharding import ShardedReservations  # noqa: E402
+from storage import MemoryStore  # noqa: E402
+
+DAYS = 60
+BENCH_TABLES = "2:40,4:40"
+
+def workload(thread: int, calls: int, locations: int):
+    """(function, arguments) pairs for one client thread: creates, each followed by a get."""
+    first_day = datetime.now() + timedelta(days=1)
+    for i in range(calls // 2):
+        n = thread * calls + i
+        date = (first_day + timedelta(days=n % DAYS)).strftime("%Y-%m-%d")
+        minute = (n // DAYS) % (8 * 60)
+        phone_number = f"+1{n:010d}"
+        location = f"site{n % locations}"
+        yield "create_reservation", {"name": "Bench", "party_size": 2, "date": date, "location": location,
+                                     "time": f"{14 + minute // 60:02d}:{minute % 60:02d}",
+                                     "phone_number": phone_number}
+        yield "get_reservation", {"phone_number": phone_number, "location": location}
+
+def run(call, threads: int, calls: int, locations: int) -> float:
+    """Calls per second with `threads` clients each making `calls` calls."""
+    errors = []
+
+    def client(thread: int) -> None:
+        for function, arguments in workload(thread, calls, locations):
+            reply = call(function, arguments)
+            if reservation_system.response_category(reply) != "ok":
+                errors.append(reply)
+
+    workers = [threading.Thread(target=client, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f"{len(errors)} calls failed, e.g. {errors[0]}")
+    return threads * (calls // 2 * 2) / elapsed
+
+def in_process(function: str, arguments: dict) -> str:
+    handler = getattr(reservation_system, f"{function}_response")
+    return handler({key: value for key, value in arguments.items() if key != "location"})
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=1000, help="calls per client thread")
+    parser.add_argument("--locations", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}  threads: {args.threads}  calls: {args.threads * args.calls}")
+    print(f"{'shards':>10}  {'calls/s':>10}  {'vs 1 shard':>10}")
+    # In process there is one floor for every site; the workload never reuses a number or overfills a slot
+    reservation_system.configure_store(MemoryStore())
+    reservation_system.configure_inventory(tables_from_spec(BENCH_TABLES))
+    print(f"{'in-process':>10}  {run(in_process, args.threads, args.calls, args.locations):>10.0f}  {'':>10}")
+
+    locations = {f"site{i}": BENCH_TABLES for i in range(args.locations)}
+    single = None
+    for shards in range(1, args.max_shards + 1):
+        with ShardedReservations(shards, locations) as pool:
+            rate = run(pool.call, args.threads, args.calls, args.locations)
+        single = single or rate
+        print(f"{shards:>10}  {rate:>10.0f}  {rate / single:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
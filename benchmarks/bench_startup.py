@@ -0,0 +1,189 @@
+"""
+Benchmark app_new start-up and the per-request Basic-auth check.
+
+Start-up is timed in fresh interpreters, the way each gunicorn worker started
+without --preload pays it: the bare interpreter, the frameworks alone (Flask,
+signalwire_swaig, dotenv), `import app_new`, import plus building the app
+(what gunicorn's app_new:app does), and all that plus the first SWAIG call,
+which loads reservation_system and opens the store. Each figure is the median
+of --runs runs after one run that only warms the bytecode cache. "App beyond
+frameworks" is timed inside the process, after the frameworks are imported,
+so it does not carry the noise of starting an interpreter.
+
+The two "preloaded fork" stages are what a worker costs under gunicorn
+--preload, where the master builds the app once and forks: from the fork to
+the worker exiting, idle or after serving the first SWAIG call (which, since
+the store is opened on first use, happens in the worker).
+
+With --compare REV the same stages are also timed in a git worktree of REV
+(e.g. the commit before a change), side by side. The run fails if the app
+beyond the frameworks costs more than --budget-ms, so start-up regressions in
+this repository's own modules show up in CI.
+
+The auth check compares the previous per-request check (Werkzeug's parsed
+request.authorization, both credentials read from the environment, two
+comparisons) with BasicAuth.check, inside a Flask request context.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--budget-ms MS] [--compare REV] [--checks N]
+"""
+import argparse
+import hmac
+import logging
+import os
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("HTTP_USERNAME", "admin")
+os.environ.setdefault("HTTP_PASSWORD", "secret")
+
+FIRST_CALL = ("import app_new; app_new.app.test_client().post('/swaig', json={'function': 'get_reservation', "
+              "'arguments': {'phone_number': '+19185550100'}}, headers={'Authorization': 'Basic YWRtaW46c2VjcmV0'})")
+
+# Writes its own timing last on stderr, as older trees print to stdout on import
+APP_BUILD = ("import sys, time, flask, dotenv, signalwire_swaig.swaig\n"
+             "start = time.perf_counter()\n"
+             "import app_new; app_new.app\n"
+             "sys.stderr.write(f'\\n{time.perf_counter() - start}\\n')")
+
+# A gunicorn --preload worker: the app is built once, then each worker is a fork that starts serving at once.
+# Timed from the fork until the worker has run {child} and exited.
+PRELOADED_FORK = ("import os, sys, time, app_new\n"
+                  "app_new.app\n"
+                  "start = time.perf_counter()\n"
+                  "pid = os.fork()\n"
+                  "if pid == 0:\n"
+                  "    {child}\n"
+                  "    os._exit(0)\n"
+                  "os.waitpid(pid, 0)\n"
+                  "sys.stderr.write(f'\\n{{time.perf_counter() - start}}\\n')")
+
+# (label, code, whether the code reports its own time)
+STAGES = (
+    ("interpreter", "pass", False),
+    ("frameworks", "import flask, dotenv, signalwire_swaig.swaig", False),
+    ("import app_new", "import app_new", False),
+    ("import + create app", "import app_new; app_new.app", False),
+    ("+ first call", FIRST_CALL, False),
+    ("app beyond frameworks", APP_BUILD, True),
+    ("preloaded fork", PRELOADED_FORK.format(child="pass"), True),
+    ("preloaded fork + call", PRELOADED_FORK.format(child=FIRST_CALL.replace("import app_new; ", "")), True),
+)
+
+# Default --budget-ms: what building the app may cost beyond importing the frameworks
+DEFAULT_BUDGET_MS = 25.0
+
+def _run(code: str, cwd: str, env: dict, reported: bool) -> float:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if reported:
+        return float(result.stderr.splitlines()[-1])
+    return time.perf_counter() - start
+
+def time_stages(trees: Dict[str, str], runs: int) -> Dict[str, Dict[str, float]]:
+    """
+    Median milliseconds of each stage in fresh interpreters, per source tree.
+
+    Runs are interleaved across stages and trees, so load on the machine
+    shifts every figure alike instead of favouring whichever ran first.
+    """
+    env = dict(os.environ)
+    # Compiled modules must be cached, as they are in a deployment
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    # Runs in memory, whatever RESERVATION_DB says
+    env.pop("RESERVATION_DB", None)
+    samples: Dict[str, Dict[str, List[float]]] = {tree: {label: [] for label, _, _ in STAGES} for tree in trees}
+    for cwd in trees.values():
+        for _, code, reported in STAGES:
+            _run(code, cwd, env, reported)
+    for _ in range(runs):
+        for tree, cwd in trees.items():
+            for label, code, reported in STAGES:
+                samples[tree][label].append(_run(code, cwd, env, reported))
+    return {tree: {label: statistics.median(values) * 1000 for label, values in stages.items()}
+            for tree, stages in samples.items()}
+
+@contextmanager
+def worktree(revision: str) -> Iterator[str]:
+    """A temporary git worktree of revision."""
+    directory = tempfile.mkdtemp(prefix="bench-startup-")
+    path = os.path.join(directory, "tree")
+    subprocess.run(["git", "worktree", "add", "--detach", path, revision], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        yield path
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", path], cwd=ROOT, check=False,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(directory, ignore_errors=True)
+
+def legacy_authorized(request) -> bool:
+    """The check app_new made on every request before BasicAuth."""
+    auth = request.authorization
+    return auth is not None and \
+        hmac.compare_digest((auth.username or '').encode(), os.getenv('HTTP_USERNAME', '').encode()) and \
+        hmac.compare_digest((auth.password or '').encode(), os.getenv('HTTP_PASSWORD', '').encode())
+
+def time_checks(checks: int) -> None:
+    import app_new
+    from basic_auth import BasicAuth
+
+    # Building the app logs every endpoint it registers
+    logging.disable(logging.DEBUG)
+
+    auth = BasicAuth.from_env()
+    headers = {"Authorization": "Basic YWRtaW46c2VjcmV0"}
+    print(f"\n{'auth check':<22}{'us/request':>12}")
+    for label, check in (("request.authorization", legacy_authorized),
+                         ("BasicAuth.check", lambda request: auth.check(request.headers.get("Authorization")))):
+        elapsed = 0.0
+        for _ in range(checks):
+            # A fresh context per check, as each request parses its own headers
+            with app_new.app.test_request_context('/swaig', method='POST', headers=headers) as ctx:
+                start = time.perf_counter()
+                if not check(ctx.request):
+                    raise RuntimeError(f"{label} rejected valid credentials")
+                elapsed += time.perf_counter() - start
+        print(f"{label:<22}{elapsed / checks * 1e6:>12.2f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="fail if importing and building the app takes longer than this once the frameworks are imported")
+    parser.add_argument("--compare", metavar="REV", help="also time this git revision, e.g. HEAD~1")
+    parser.add_argument("--checks", type=int, default=20000)
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        trees = {"this tree": ROOT}
+        if args.compare:
+            trees[args.compare] = stack.enter_context(worktree(args.compare))
+        results = time_stages(trees, args.runs)
+    times = results["this tree"]
+    before = results.get(args.compare)
+    header = f"{'start-up (ms)':<22}{'this tree':>12}"
+    if before is not None:
+        header += f"{args.compare:>12}{'change':>12}"
+    print(header)
+    for label, _, _ in STAGES:
+        line = f"{label:<22}{times[label]:>12.1f}"
+        if before is not None:
+            line += f"{before[label]:>12.1f}{times[label] - before[label]:>+12.1f}"
+        print(line)
+    app_ms = times["app beyond frameworks"]
+    time_checks(args.checks)
+    if app_ms > args.budget_ms:
+        sys.exit(f"Building the app took {app_ms:.1f} ms beyond the frameworks, over the {args.budget_ms:.1f} ms budget")
+    print(f"\nWithin the {args.budget_ms:.1f} ms start-up budget")
+
+if __name__ == "__main__":
+    main()
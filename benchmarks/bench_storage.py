@@ -0,0 +1,70 @@
+"""
+Compare create throughput of the memory and SQLite stores under concurrent writers.
+
+Usage: python benchmarks/bench_storage.py [--threads 1,4,16] [--creates N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reservation_system  # noqa: E402
+from inventory import tables_from_spec  # noqa: E402
+from storage import MemoryStore, SQLiteStore  # noqa: E402
+
+SLOTS_PER_DAY = 8 * 60
+
+def writer(first: int, count: int, first_day: datetime, failures: list) -> None:
+    for i in range(first, first + count):
+        day, minute = divmod(i, SLOTS_PER_DAY)
+        result = reservation_system.create_reservation_response({
+            "name": "Bench Guest",
+            "party_size": 2,
+            "date": (first_day + timedelta(days=day)).strftime("%Y-%m-%d"),
+            "time": f"{14 + minute // 60:02d}:{minute % 60:02d}",
+            "phone_number": f"+1{i:010d}"
+        })
+        if result != "Reservation successfully created.":
+            failures.append(result)
+
+def run(store, threads: int, creates: int):
+    """Return (creates per second, failed creates) with `threads` writers sharing `creates` bookings."""
+    reservation_system.configure_store(store)
+    # Writers fill days out of order, so a booking can overlap turns on both sides
+    reservation_system.configure_inventory(tables_from_spec("2:160"))
+    first_day = datetime.now() + timedelta(days=1)
+    per_thread = creates // threads
+    failures = []
+    workers = [threading.Thread(target=writer, args=(t * per_thread, per_thread, first_day, failures))
+               for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed, len(failures)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", default="1,4,16")
+    parser.add_argument("--creates", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'backend':>8}  {'threads':>7}  {'creates/s':>10}  {'failed':>6}")
+    for threads in (int(t) for t in args.threads.split(",")):
+        rate, failed = run(MemoryStore(), threads, args.creates)
+        print(f"{'memory':>8}  {threads:>7}  {rate:>10.0f}  {failed:>6}")
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteStore(os.path.join(tmp, "bench.db"))
+            rate, failed = run(store, threads, args.creates)
+            print(f"{'sqlite':>8}  {threads:>7}  {rate:>10.0f}  {failed:>6}")
+            store.close()
+
+if __name__ == "__main__":
+    main()
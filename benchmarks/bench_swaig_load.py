@@ -0,0 +1,216 @@
+"""
+Replay a SWAIG traffic mix against app_new.app and report throughput and latency percentiles.
+
+Calls go through Flask's test client, so every request runs the full POST /swaig
+path (JSON parsing, swaig_dispatch, the registry and reservation_system) without
+network noise. A mix gives the share of each function; get, update, move and
+cancel target bookings the same worker created earlier. Payloads alternate
+between the 'arguments' and 'argument.parsed' shapes unless --shape picks one.
+
+Results go to stdout and, with --json, to a file. Given --baseline (an earlier
+--json file), the run fails if throughput drops or p99 latency rises by more
+than --tolerance, so regressions show up in CI.
+
+Usage: python benchmarks/bench_swaig_load.py [--mix booking|lookup|churn|create=3,get=5,...]
+           [--requests N] [--threads N] [--shape both|arguments|parsed] [--json PATH] [--baseline PATH]
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("HTTP_USERNAME", "admin")
+os.environ.setdefault("HTTP_PASSWORD", "secret")
+AUTH = {"Authorization": "Basic " + base64.b64encode(
+    f"{os.environ['HTTP_USERNAME']}:{os.environ['HTTP_PASSWORD']}".encode()).decode()}
+
+import app_new  # noqa: E402
+import reservation_system  # noqa: E402
+from inventory import tables_from_spec  # noqa: E402
+
+FUNCTIONS = ("create_reservation", "get_reservation", "update_reservation", "move_reservation",
+             "cancel_reservation")
+
+MIXES = {
+    # Mostly callers booking and checking, with some changes
+    "booking": {"create_reservation": 30, "get_reservation": 40, "update_reservation": 10,
+                "move_reservation": 10, "cancel_reservation": 10},
+    # Callers confirming existing bookings
+    "lookup": {"create_reservation": 10, "get_reservation": 80, "cancel_reservation": 10},
+    # Every call writes
+    "churn": {"create_reservation": 25, "update_reservation": 25, "move_reservation": 25,
+              "cancel_reservation": 25},
+}
+
+DAYS = 30
+DEFAULT_TABLES = "2:40,4:40,6:20,8:10"
+
+def parse_mix(text: str) -> Dict[str, int]:
+    if text in MIXES:
+        return MIXES[text]
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if not name.endswith("_reservation"):
+            name += "_reservation"
+        if name not in FUNCTIONS or not weight.strip().isdigit():
+            raise SystemExit(f"Invalid mix entry: '{part}'")
+        mix[name] = int(weight)
+    return mix
+
+def _slot(rng: random.Random, first_day: datetime):
+    day = (first_day + timedelta(days=rng.randrange(DAYS))).strftime("%Y-%m-%d")
+    minute = rng.randrange(0, 8 * 60, 15)
+    return day, f"{14 + minute // 60:02d}:{minute % 60:02d}"
+
+def _payload(function: str, arguments: dict, parsed: bool) -> dict:
+    if parsed:
+        return {"function": function, "argument": {"parsed": [arguments]}}
+    return {"function": function, "arguments": arguments}
+
+def worker(index: int, count: int, mix: Dict[str, int], shape: str, seed: int, first_day: datetime,
+           latencies: Dict[str, List[float]], categories: Dict[str, Dict[str, int]], lock: threading.Lock) -> None:
+    rng = random.Random(seed * 1000 + index)
+    names, weights = list(mix), list(mix.values())
+    booked: List[str] = []
+    mine: Dict[str, List[float]] = {name: [] for name in FUNCTIONS}
+    outcomes: Dict[str, Dict[str, int]] = {name: {} for name in FUNCTIONS}
+    next_phone = 0
+    with app_new.app.test_client() as client:
+        for _ in range(count):
+            function = rng.choices(names, weights)[0]
+            if function != "create_reservation" and not booked:
+                function = "create_reservation"
+            if function == "create_reservation":
+                date, time_str = _slot(rng, first_day)
+                phone = f"+1{index:04d}{next_phone:06d}"
+                next_phone += 1
+                arguments = {"name": f"Guest {next_phone}", "party_size": rng.randint(1, 8), "date": date,
+                             "time": time_str, "phone_number": phone}
+            else:
+                phone = rng.choice(booked)
+                arguments = {"phone_number": phone}
+                if function == "update_reservation":
+                    arguments["party_size"] = rng.randint(1, 8)
+                elif function == "move_reservation":
+                    arguments["new_date"], arguments["new_time"] = _slot(rng, first_day)
+            parsed = rng.random() < 0.5 if shape == "both" else shape == "parsed"
+            payload = _payload(function, arguments, parsed)
+
+            start = time.perf_counter()
+            response = client.post('/swaig', json=payload, headers=AUTH)
+            mine[function].append(time.perf_counter() - start)
+
+            body = response.get_json(silent=True) or {}
+            category = reservation_system.response_category(body["response"]) \
+                if response.status_code == 200 and "response" in body else f"http_{response.status_code}"
+            outcomes[function][category] = outcomes[function].get(category, 0) + 1
+            if category == "ok":
+                if function == "create_reservation":
+                    booked.append(phone)
+                elif function == "cancel_reservation":
+                    booked.remove(phone)
+    with lock:
+        for name in FUNCTIONS:
+            latencies[name].extend(mine[name])
+            for category, n in outcomes[name].items():
+                categories[name][category] = categories[name].get(category, 0) + n
+
+def percentiles(samples: List[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)  # noqa: E731
+    return {"count": len(ordered), "p50_ms": pick(0.50), "p90_ms": pick(0.90), "p99_ms": pick(0.99),
+            "max_ms": round(ordered[-1] * 1000, 3), "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3)}
+
+def run(mix: Dict[str, int], requests: int, threads: int, shape: str, seed: int) -> dict:
+    reservation_system.reservations.clear()
+    reservation_system.rebuild_inventory()
+    first_day = datetime.now() + timedelta(days=1)
+    latencies: Dict[str, List[float]] = {name: [] for name in FUNCTIONS}
+    categories: Dict[str, Dict[str, int]] = {name: {} for name in FUNCTIONS}
+    lock = threading.Lock()
+    per_thread = requests // threads
+    workers = [threading.Thread(target=worker, args=(t, per_thread, mix, shape, seed, first_day, latencies,
+                                                     categories, lock))
+               for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    overall = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "mix": mix,
+        "requests": len(overall),
+        "threads": threads,
+        "shape": shape,
+        "seed": seed,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(overall) / elapsed, 1),
+        "overall": percentiles(overall),
+        "functions": {name: {**percentiles(latencies[name]), "outcomes": categories[name]}
+                      for name in FUNCTIONS if latencies[name]},
+        "store": type(reservation_system.reservations).__name__,
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Descriptions of every metric that is worse than the baseline by more than tolerance."""
+    problems = []
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        problems.append(f"throughput {result['throughput_rps']} req/s < baseline {baseline['throughput_rps']}")
+    for name, stats in [("overall", result["overall"]), *result["functions"].items()]:
+        before: Optional[dict] = baseline["overall"] if name == "overall" else baseline["functions"].get(name)
+        if before and before.get("p99_ms") and stats["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            problems.append(f"{name} p99 {stats['p99_ms']} ms > baseline {before['p99_ms']} ms")
+    return problems
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mix", default="booking", help="named mix or function=weight list")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--shape", choices=("both", "arguments", "parsed"), default="both")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tables", default=DEFAULT_TABLES, help="table spec for the run, as in RESTAURANT_TABLES")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="earlier --json results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    reservation_system.configure_inventory(tables_from_spec(args.tables))
+    result = run(parse_mix(args.mix), args.requests, args.threads, args.shape, args.seed)
+
+    print(f"{result['requests']} requests, {args.threads} thread(s), {result['store']}: "
+          f"{result['throughput_rps']:.0f} req/s")
+    print(f"{'function':<20} {'count':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}  outcomes")
+    for name, stats in [*result["functions"].items(), ("overall", result["overall"])]:
+        outcomes = ", ".join(f"{k}={v}" for k, v in sorted(stats.get("outcomes", {}).items()))
+        print(f"{name:<20} {stats['count']:>7} {stats['p50_ms']:>8.3f} {stats['p90_ms']:>8.3f} "
+              f"{stats['p99_ms']:>8.3f} {stats['max_ms']:>8.3f}  {outcomes}")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(result, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            problems = regressions(result, json.load(file), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Micro-benchmarks of the validators against the strptime/re.match versions they replaced.
+
+Usage: python benchmarks/bench_validation.py [--iterations N]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import validation  # noqa: E402
+
+def legacy_validate_phone_number(phone: str) -> bool:
+    pattern = r'^\+[1-9]\d{1,14}$'
+    return bool(re.match(pattern, phone))
+
+def legacy_validate_date_time(date_str: str, time_str: str) -> bool:
+    try:
+        dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+        if dt < datetime.now():
+            return False
+        hour = dt.hour
+        if hour < 14 or hour >= 22:
+            return False
+        return True
+    except ValueError:
+        return False
+
+def report(label: str, legacy, current, iterations: int) -> None:
+    legacy_ns = min(timeit.repeat(legacy, number=iterations, repeat=5)) / iterations * 1e9
+    current_ns = min(timeit.repeat(current, number=iterations, repeat=5)) / iterations * 1e9
+    print(f"{label:<28} {legacy_ns:>9.0f} ns {current_ns:>9.0f} ns {legacy_ns / current_ns:>7.1f}x")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    date = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+    days = [(datetime.now() + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(90)]
+    times = [f"{h:02d}:{m:02d}" for h in range(14, 22) for m in (0, 15, 30, 45)]
+    slots = [(d, t) for d in days for t in times]
+
+    def legacy_mixed():
+        for d, t in slots[:50]:
+            legacy_validate_date_time(d, t)
+
+    def current_mixed():
+        for d, t in slots[:50]:
+            validation.is_bookable_slot(d, t)
+
+    def current_pinned():
+        with validation.request_clock():
+            validation.is_bookable_slot(date, "19:00")
+
+    print(f"{'':<28} {'legacy':>12} {'current':>12} {'speedup':>8}")
+    report("phone (valid)", lambda: legacy_validate_phone_number("+19185551234"),
+           lambda: validation.is_valid_phone("+19185551234"), args.iterations)
+    report("phone (invalid)", lambda: legacy_validate_phone_number("19185551234"),
+           lambda: validation.is_valid_phone("19185551234"), args.iterations)
+    report("date/time (cached slot)", lambda: legacy_validate_date_time(date, "19:00"),
+           lambda: validation.is_bookable_slot(date, "19:00"), args.iterations)
+    report("date/time (pinned clock)", lambda: legacy_validate_date_time(date, "19:00"),
+           current_pinned, args.iterations)
+    report("date/time (50 slots)", legacy_mixed, current_mixed, args.iterations // 50)
+
+    # Uncached parse, as on the first request for a slot
+    report("date/time (cold parse)", lambda: legacy_validate_date_time(date, "19:00"),
+           lambda: validation.parse_slot.__wrapped__(date, "19:00") >= validation.now(), args.iterations)
+
+if __name__ == "__main__":
+    main()
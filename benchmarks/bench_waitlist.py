@@ -0,0 +1,59 @@
+"""
+Benchmark promoting waitlisted parties as tables are freed.
+
+One slot with a single two-top is booked, and --sizes parties join its
+waitlist, every fourth of them too large for the table. Each cancellation then
+frees the table and the next party that fits is booked in its place. Each row
+is one waitlist length: the median and worst cost of a cancellation, including
+the promotion it triggers. The cost should stay flat as the list grows.
+
+Usage: python benchmarks/bench_waitlist.py [--sizes 100,10000,100000] [--cancels 2000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reservation_system  # noqa: E402
+from inventory import tables_from_spec  # noqa: E402
+from standing import StandingBook  # noqa: E402
+from storage import MemoryStore  # noqa: E402
+from waitlist import Waitlist  # noqa: E402
+
+def run(waiting: int, cancels: int) -> None:
+    reservation_system.configure_store(MemoryStore())
+    reservation_system.configure_inventory(tables_from_spec("2:1"))
+    reservation_system.waitlist = Waitlist()
+    reservation_system.standing = StandingBook()
+    date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    booking = {"name": "Guest", "party_size": 2, "date": date, "time": "18:00", "phone_number": "+10000000000"}
+    reservation_system.create_reservation_response(booking)
+    for i in range(waiting):
+        reservation_system.waitlist.join(f"+2{i:010d}", "Waiting", 6 if i % 4 == 3 else 2, date, "18:00")
+
+    phone_number = booking["phone_number"]
+    latencies = []
+    for _ in range(min(cancels, waiting * 3 // 4)):
+        start = time.perf_counter()
+        reservation_system.cancel_reservation_response({"phone_number": phone_number})
+        latencies.append(time.perf_counter() - start)
+        phone_number = reservation_system.reservations.on_date(date)[0][0]
+    print(f"{waiting:>10}  {len(latencies):>8}  {statistics.median(latencies) * 1e6:>8.1f}  "
+          f"{max(latencies) * 1e6:>8.1f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,10000,100000")
+    parser.add_argument("--cancels", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'waiting':>10}  {'cancels':>8}  {'p50 us':>8}  {'max us':>8}")
+    for size in args.sizes.split(","):
+        run(int(size), args.cancels)
+
+if __name__ == "__main__":
+    main()
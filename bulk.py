@@ -0,0 +1,175 @@
+"""
+Bulk import and export of reservations as CSV or JSON Lines.
+
+Both directions stream: exports read the store a chunk at a time through
+iter_reservations, and imports parse, check and book chunk_size rows at a
+time through reservation_system.create_reservations. Memory stays flat
+whatever the file size. Import rows pass the same checks as
+create_reservation, and every rejected row is reported with its line number
+and reason.
+
+    python bulk.py import bookings.csv
+    python bulk.py export - --format jsonl --from-date 2030-01-01
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+import reservation_system
+
+FORMATS = ("csv", "jsonl")
+FIELDS = ("phone_number", "name", "party_size", "date", "time", "table")
+DEFAULT_CHUNK_SIZE = 10000
+# Rejected rows beyond this are counted but not listed
+MAX_REPORTED_ERRORS = 1000
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    failed: int = 0
+    # (line number, reason) of the first MAX_REPORTED_ERRORS rejected rows
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    def reject(self, line: int, reason: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, reason))
+
+    def to_dict(self) -> dict:
+        return {"imported": self.imported, "failed": self.failed,
+                "errors": [{"line": line, "error": reason} for line, reason in self.errors]}
+
+def format_for(path: str, default: str = "csv") -> str:
+    """The format implied by a file name's extension."""
+    lowered = path.lower()
+    if lowered.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    if lowered.endswith(".csv"):
+        return "csv"
+    return default
+
+def _rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """(line number, row) for each record; a row that cannot be parsed comes back as an error string."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        yield line_number, row if isinstance(row, dict) else "Each line must be a JSON object."
+
+def _chunks(rows: Iterable[Tuple[int, object]], size: int) -> Iterator[List[Tuple[int, object]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def import_reservations(stream: IO[str], fmt: str = "csv", chunk_size: int = DEFAULT_CHUNK_SIZE) -> ImportReport:
+    """Book every valid row of a CSV or JSONL stream; rows that fail any check are reported and skipped."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Use csv or jsonl.")
+    report = ImportReport()
+    for chunk in _chunks(_rows(stream, fmt), chunk_size):
+        lines, rows = [], []
+        for line, row in chunk:
+            if isinstance(row, str):
+                report.reject(line, row)
+            else:
+                lines.append(line)
+                rows.append(row)
+        for line, error in zip(lines, reservation_system.create_reservations(rows)):
+            if error is None:
+                report.imported += 1
+            else:
+                report.reject(line, error)
+    return report
+
+def export_lines(fmt: str = "csv", **filters) -> Iterator[str]:
+    """
+    The matching reservations as CSV or JSONL text, one record per string.
+
+    filters are iter_reservations' keyword arguments; a ValueError for a bad
+    filter is raised here rather than from the first next().
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Use csv or jsonl.")
+    rows = reservation_system.iter_reservations(**filters)
+    if fmt == "jsonl":
+        return (json.dumps(row) + "\n" for row in rows)
+
+    def generate() -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, FIELDS, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(row)
+        yield buffer.getvalue()
+    return generate()
+
+def export_reservations(out: IO[str], fmt: str = "csv", **filters) -> int:
+    """Write the matching reservations to out and return how many were written."""
+    # A CSV export starts with its header line
+    count = -1 if fmt == "csv" else 0
+    for line in export_lines(fmt, **filters):
+        out.write(line)
+        count += 1
+    return count
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import or export reservations as CSV or JSON Lines")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="book every valid row of a file ('-' for stdin)")
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=FORMATS)
+    importer.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    exporter = commands.add_parser("export", help="write reservations to a file ('-' for stdout)")
+    exporter.add_argument("path")
+    exporter.add_argument("--format", choices=FORMATS)
+    exporter.add_argument("--from-date")
+    exporter.add_argument("--to-date")
+    args = parser.parse_args(argv)
+    fmt = args.format or format_for(args.path)
+
+    if args.command == "import":
+        stream = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+        try:
+            report = import_reservations(stream, fmt, args.chunk_size)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        for line, reason in report.errors:
+            print(f"line {line}: {reason}", file=sys.stderr)
+        if report.failed > len(report.errors):
+            print(f"... and {report.failed - len(report.errors)} more", file=sys.stderr)
+        print(f"Imported {report.imported} reservations, rejected {report.failed}.")
+        return 1 if report.failed else 0
+
+    out = sys.stdout if args.path == "-" else open(args.path, "w", newline="", encoding="utf-8")
+    try:
+        count = export_reservations(out, fmt, from_date=args.from_date, to_date=args.to_date)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Exported {count} reservations.", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
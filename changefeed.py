@@ -0,0 +1,214 @@
+"""
+Publish/subscribe feed of reservation changes, served as Server-Sent Events.
+
+reservation_system publishes one change per create, update, move and cancel
+once the store has committed it. Each change gets the next sequence number
+and is rendered to its SSE text once, however many subscribers receive it.
+The last `history` changes are kept so a client that reconnects with the id
+of the last event it saw (Last-Event-ID) is sent what it missed.
+
+Every subscriber has its own buffer of at most `buffer_size` changes, so a
+slow or stalled client costs bounded memory and never holds up a booking.
+When a buffer is full the subscription stops receiving and is marked as
+overflowed; its reader then catches up from the history, or is told to
+reload everything with a `reset` event if the history has moved past it.
+
+Event ids are "<epoch>-<sequence>", where the epoch is chosen when the process
+starts: an id from before a restart cannot be resumed and gets a reset.
+"""
+import json
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Callable, Deque, Iterator, List, Mapping, NamedTuple, Optional, Set
+
+import metrics
+
+DEFAULT_HISTORY = 1000
+DEFAULT_BUFFER_SIZE = 256
+# Seconds between keep-alive comments on an idle stream, which also reveal clients that went away
+DEFAULT_HEARTBEAT = 15.0
+
+# Kinds of change
+CREATED, UPDATED, MOVED, CANCELED = "created", "updated", "moved", "canceled"
+
+# Sent first: how long a disconnected EventSource waits before reconnecting, in ms
+RETRY = "retry: 2000\n\n"
+HEARTBEAT = ": keep-alive\n\n"
+
+class Change(NamedTuple):
+    sequence: int
+    kind: str
+    phone_number: Optional[str]
+    # The booking after the change, or as it was before a cancel
+    reservation: Optional[dict]
+    # The SSE frame sent to subscribers
+    text: str
+
+class Subscription:
+    """One subscriber's bounded buffer of changes."""
+
+    def __init__(self, feed: "ChangeFeed", buffer_size: int, wakeup: Optional[Callable[[], None]] = None):
+        self.feed = feed
+        self.buffer_size = buffer_size
+        # Called by the publishing thread whenever changes arrive, e.g. to wake an event loop
+        self.wakeup = wakeup
+        # Set when the buffer filled up; no more changes arrive after it
+        self.overflowed = False
+        self._changes: Deque[Change] = deque()
+        self._ready = threading.Event()
+
+    def _push(self, change: Change) -> bool:
+        """Buffer a change; False if the buffer is full. Called with the feed's lock held."""
+        if len(self._changes) >= self.buffer_size:
+            self.overflowed = True
+        else:
+            self._changes.append(change)
+        # Only the first change since the last take() needs to wake the reader
+        if not self._ready.is_set():
+            self._ready.set()
+            if self.wakeup is not None:
+                self.wakeup()
+        return not self.overflowed
+
+    def take(self) -> List[Change]:
+        """The buffered changes, without waiting."""
+        with self.feed._lock:
+            changes = list(self._changes)
+            self._changes.clear()
+            self._ready.clear()
+        return changes
+
+    def wait(self, timeout: Optional[float] = None) -> List[Change]:
+        """The buffered changes, waiting up to timeout seconds for one if there are none."""
+        self._ready.wait(timeout)
+        return self.take()
+
+    def close(self) -> None:
+        self.feed._unsubscribe(self)
+
+class ChangeFeed:
+    """Numbered reservation changes, fanned out to subscribers and kept for resuming."""
+
+    def __init__(self, history: int = DEFAULT_HISTORY, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._history: Deque[Change] = deque(maxlen=history)
+        self._subscribers: Set[Subscription] = set()
+
+    @property
+    def sequence(self) -> int:
+        """Number of the latest change; 0 before the first."""
+        return self._sequence
+
+    def last_event_id(self) -> str:
+        return f"{self.epoch}-{self._sequence}"
+
+    def __len__(self) -> int:
+        """How many subscribers are listening."""
+        return len(self._subscribers)
+
+    def publish(self, kind: str, phone_number: Optional[str], reservation: Optional[Mapping]) -> Change:
+        record = dict(reservation) if reservation is not None else None
+        with self._lock:
+            self._sequence += 1
+            data = json.dumps({"sequence": self._sequence, "type": kind, "phone_number": phone_number,
+                               "reservation": record}, separators=(",", ":"))
+            change = Change(self._sequence, kind, phone_number, record,
+                            f"id: {self.epoch}-{self._sequence}\nevent: {kind}\ndata: {data}\n\n")
+            self._history.append(change)
+            overflowed = [subscription for subscription in self._subscribers if not subscription._push(change)]
+            for subscription in overflowed:
+                self._subscribers.discard(subscription)
+        for _ in overflowed:
+            metrics.change_feed_overflows.inc()
+        return change
+
+    def subscribe(self, last_event_id: Optional[str] = None,
+                  wakeup: Optional[Callable[[], None]] = None) -> Subscription:
+        """
+        Start receiving changes.
+
+        With last_event_id, changes after it still in the history are buffered
+        first. If it cannot be resumed, the subscription starts with a reset
+        change, carrying the latest sequence, that tells the client to reload.
+        """
+        subscription = Subscription(self, self.buffer_size, wakeup)
+        with self._lock:
+            if last_event_id:
+                missed = self._missed(last_event_id)
+                if missed is None:
+                    missed = [self._reset()]
+                for change in missed:
+                    if not subscription._push(change):
+                        break
+            if not subscription.overflowed:
+                self._subscribers.add(subscription)
+        return subscription
+
+    def _missed(self, last_event_id: str) -> Optional[List[Change]]:
+        """Changes after last_event_id, or None if some are no longer in the history."""
+        epoch, _, sequence = last_event_id.partition("-")
+        if epoch != self.epoch or not sequence.isdigit() or int(sequence) > self._sequence:
+            return None
+        first = self._history[0].sequence if self._history else self._sequence + 1
+        if int(sequence) + 1 < first:
+            return None
+        return list(islice(self._history, int(sequence) + 1 - first, None))
+
+    def _reset(self) -> Change:
+        data = json.dumps({"sequence": self._sequence, "type": "reset"})
+        return Change(self._sequence, "reset", None, None,
+                      f"id: {self.epoch}-{self._sequence}\nevent: reset\ndata: {data}\n\n")
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stream(self, last_event_id: Optional[str] = None, heartbeat: float = DEFAULT_HEARTBEAT,
+               stop: Optional[threading.Event] = None) -> Iterator[str]:
+        """SSE text for one client, blocking between changes; for threaded servers."""
+        follower = Follower(self, last_event_id)
+        try:
+            yield RETRY
+            while stop is None or not stop.is_set():
+                yield follower.wait(heartbeat) or HEARTBEAT
+        finally:
+            follower.close()
+
+class Follower:
+    """
+    One client's place in the feed.
+
+    An overflowed subscription is replaced by one resumed from the last change
+    handed out, so the client only sees a reset if it fell behind the whole history.
+    """
+
+    def __init__(self, feed: ChangeFeed, last_event_id: Optional[str] = None,
+                 wakeup: Optional[Callable[[], None]] = None):
+        self.feed = feed
+        self.last_event_id = last_event_id
+        self.wakeup = wakeup
+        self.subscription = feed.subscribe(last_event_id, wakeup)
+
+    def _text(self, changes: List[Change]) -> str:
+        if changes:
+            self.last_event_id = f"{self.feed.epoch}-{changes[-1].sequence}"
+        # Nothing arrives after an overflow, so everything it buffered has been taken
+        if self.subscription.overflowed:
+            self.subscription = self.feed.subscribe(self.last_event_id, self.wakeup)
+        return "".join(change.text for change in changes)
+
+    def take(self) -> str:
+        """SSE text of the changes buffered so far, without waiting."""
+        return self._text(self.subscription.take())
+
+    def wait(self, timeout: Optional[float] = None) -> str:
+        """SSE text of the buffered changes, waiting up to timeout seconds for one if there are none."""
+        return self._text(self.subscription.wait(timeout))
+
+    def close(self) -> None:
+        self.subscription.close()
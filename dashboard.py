@@ -0,0 +1,146 @@
+"""
+Cached rendering of the reservations dashboard.
+
+The page is rebuilt only when the store's revision, the template file or the
+Google tag changes, so polling clients are served from memory. Table rows are
+kept as HTML fragments keyed by phone number: a rebuild after one booking
+renders that one row and joins the rest.
+"""
+import hashlib
+import html
+import os
+import random
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Annotations only: the app builds its renderer before the store is opened
+    from storage import ReservationStore
+
+EMPTY_TABLE = "<p>No reservations yet.</p>"
+
+_TABLE_HEADER = """
+    <table border="1">
+        <tr>
+            <th>Name</th>
+            <th>Phone</th>
+            <th>Date</th>
+            <th>Time</th>
+            <th>Party Size</th>
+        </tr>
+    """
+
+_GTM_SCRIPT = """
+            <script async src="https://www.googletagmanager.com/gtag/js?id={tag}"></script>
+            <script>
+              window.dataLayer = window.dataLayer || [];
+              function gtag(){{dataLayer.push(arguments);}}
+              gtag('js', new Date());
+              gtag('config', '{tag}');
+            </script>
+            """
+
+def scramble_phone_number(phone):
+    if not phone or len(phone) < 6:
+        return phone
+    return phone[:-6] + ''.join(random.choices('0123456789', k=6))
+
+def _row_key(details: dict) -> Tuple:
+    return details["name"], details["date"], details["time"], details["party_size"]
+
+_UNSAFE = re.compile(r'[&<>"\']')
+
+def _escape(value) -> str:
+    text = str(value)
+    # Most values need no escaping; skip html.escape's five replace passes for them
+    return html.escape(text) if _UNSAFE.search(text) else text
+
+def _render_row(phone_number: str, details: dict) -> str:
+    return f"""
+        <tr>
+            <td>{_escape(details["name"])}</td>
+            <td>{_escape(scramble_phone_number(phone_number))}</td>
+            <td>{_escape(details["date"])}</td>
+            <td>{_escape(details["time"])}</td>
+            <td>{_escape(details["party_size"])}</td>
+        </tr>
+        """
+
+class DashboardRenderer:
+    """Renders the dashboard page and keeps the last result until something it depends on changes."""
+
+    def __init__(self, template_path: str):
+        self.template_path = template_path
+        self.renders = 0
+        self._lock = threading.Lock()
+        # (mtime, text) of the template as last read from disk
+        self._template: Optional[Tuple[float, str]] = None
+        # phone number -> (displayed fields, row HTML)
+        self._rows: Dict[str, Tuple[Tuple, str]] = {}
+        # (revision, table HTML)
+        self._table: Optional[Tuple[str, str]] = None
+        # (cache key, page HTML, ETag)
+        self._page: Optional[Tuple[Tuple, str, str]] = None
+
+    def template(self) -> Optional[Tuple[float, str]]:
+        """The template's (mtime, text), re-read only when the file changes; None if it is missing."""
+        try:
+            mtime = os.stat(self.template_path).st_mtime
+        except FileNotFoundError:
+            self._template = None
+            return None
+        cached = self._template
+        if cached is None or cached[0] != mtime:
+            with open(self.template_path, 'r') as file:
+                cached = (mtime, file.read())
+            self._template = cached
+        return cached
+
+    def table(self, reservations: "ReservationStore") -> str:
+        """The reservations table, rebuilt from row fragments when the store's revision moves."""
+        # Read the revision before the rows so a concurrent write can only make the cache newer
+        revision = reservations.revision()
+        cached = self._table
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        with self._lock:
+            cached = self._table
+            if cached is not None and cached[0] == revision:
+                return cached[1]
+            table_html = self._build_table(reservations)
+            self._table = (revision, table_html)
+            return table_html
+
+    def _build_table(self, reservations: "ReservationStore") -> str:
+        self.renders += 1
+        rows: Dict[str, Tuple[Tuple, str]] = {}
+        for phone_number, details in reservations.items():
+            key = _row_key(details)
+            previous = self._rows.get(phone_number)
+            rows[phone_number] = previous if previous is not None and previous[0] == key \
+                else (key, _render_row(phone_number, details))
+        # Rows of deleted reservations are dropped along with the old dict
+        self._rows = rows
+        if not rows:
+            return EMPTY_TABLE
+        return "".join([_TABLE_HEADER, *(fragment for _, fragment in rows.values()), "</table>"])
+
+    def page(self, reservations: "ReservationStore", google_tag: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """(page HTML, ETag) for the current data, or None if the template file is missing."""
+        template = self.template()
+        if template is None:
+            return None
+        revision = reservations.revision()
+        key = (template[0], revision, google_tag)
+        cached = self._page
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+
+        html_content = template[1].replace("{{reservations_table}}", self.table(reservations))
+        # Insert Google Tag Manager script if the tag is available
+        if google_tag:
+            html_content = html_content.replace("</head>", f"{_GTM_SCRIPT.format(tag=google_tag)}</head>")
+        etag = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+        self._page = (key, html_content, etag)
+        return html_content, etag
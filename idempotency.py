@@ -0,0 +1,176 @@
+"""
+Replay of retried SWAIG calls.
+
+Voice platforms retry a webhook when it times out, and the retry carries the
+same call. Requests that change reservations are keyed on the caller's
+Idempotency-Key (header or 'idempotency_key' field), or else on a hash of
+the calls plus the SWAIG call_id. The first request with a key runs. Requests
+that arrive while it is still running wait for its result, and later ones
+get the stored response without touching reservation_system.
+
+Completed responses sit in an LRU cache whose entries expire after a TTL. A
+hash-keyed entry is also dropped as soon as a different change is made to
+the same phone number, so repeating a create after a cancel books again
+rather than replaying the first create.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAX_ENTRIES = 10000
+# How long a retry waits for the original request before giving up
+IN_FLIGHT_TIMEOUT_SECONDS = 30
+
+# Functions whose repeats would change data; read-only calls are never cached
+MUTATING_FUNCTIONS = frozenset({"create_reservation", "update_reservation", "cancel_reservation",
+                                "move_reservation", "join_waitlist", "leave_waitlist",
+                                "create_standing_reservation", "cancel_standing_reservation"})
+
+class KeyReuseError(ValueError):
+    """Raised when an idempotency key comes back with a different request."""
+
+class Identity(NamedTuple):
+    key: str
+    # Hash of the calls themselves, to spot a key reused for a different request
+    fingerprint: str
+    # Phone numbers the request changes
+    scopes: Tuple[str, ...]
+    # True when the key was derived from the request rather than given by the caller
+    derived: bool
+
+class _Entry(NamedTuple):
+    result: Any
+    fingerprint: str
+    scopes: Tuple[str, ...]
+    derived: bool
+    expires: float
+
+def _canonical(arguments: Any) -> Any:
+    return dict(arguments) if hasattr(arguments, "keys") else arguments
+
+def identify(calls: Iterable[Tuple[str, Any]], explicit_key: Optional[str] = None, call_id: Optional[str] = None,
+             transactional: bool = False) -> Optional[Identity]:
+    """
+    The identity of a request made of (function, arguments) calls.
+
+    None if no call in it changes data.
+    """
+    calls = list(calls)
+    if not any(function in MUTATING_FUNCTIONS for function, _ in calls):
+        return None
+    text = json.dumps([[function, _canonical(arguments)] for function, arguments in calls] + [transactional],
+                      sort_keys=True, separators=(",", ":"), default=str)
+    fingerprint = hashlib.sha256(text.encode()).hexdigest()
+    scopes = tuple(sorted({arguments["phone_number"] for function, arguments in calls
+                           if function in MUTATING_FUNCTIONS and hasattr(arguments, "keys")
+                           and isinstance(arguments.get("phone_number"), str)}))
+    if explicit_key:
+        return Identity(f"key:{explicit_key}", fingerprint, scopes, False)
+    return Identity(f"call:{call_id or ''}:{fingerprint}", fingerprint, scopes, True)
+
+class ResponseCache:
+    """Runs each request identity once and replays its result until it expires or is evicted."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # key -> (future result, fingerprint) of requests still running
+        self._in_flight: Dict[str, Tuple[Future, str]] = {}
+        # phone number -> key of the latest hash-keyed entry that changed it
+        self._latest: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+
+    def run(self, identity: Identity, compute: Callable[[], Any],
+            cacheable: Callable[[Any], bool] = lambda result: True) -> Tuple[Any, bool]:
+        """(result, replayed): the stored or in-flight result for identity, else compute()'s."""
+        if self.ttl <= 0:
+            return compute(), False
+        with self._lock:
+            entry = self._live(identity.key)
+            if entry is not None:
+                self._check(entry.fingerprint, identity)
+                self._entries.move_to_end(identity.key)
+                return entry.result, True
+            running = self._in_flight.get(identity.key)
+            if running is None:
+                future: Future = Future()
+                self._in_flight[identity.key] = (future, identity.fingerprint)
+        if running is not None:
+            self._check(running[1], identity)
+            try:
+                return running[0].result(IN_FLIGHT_TIMEOUT_SECONDS), True
+            except Exception:
+                # The original failed or is stuck; this retry does the work itself
+                return compute(), False
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[identity.key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[identity.key]
+            if cacheable(result):
+                self._store(identity, result)
+        future.set_result(result)
+        return result, False
+
+    @staticmethod
+    def _check(fingerprint: str, identity: Identity) -> None:
+        if fingerprint != identity.fingerprint:
+            raise KeyReuseError("Idempotency key was already used for a different request")
+
+    def _live(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= self.clock():
+            self._drop(key)
+            return None
+        return entry
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for scope in entry.scopes:
+                if self._latest.get(scope) == key:
+                    del self._latest[scope]
+
+    def _store(self, identity: Identity, result: Any) -> None:
+        now = self.clock()
+        # A new change to a phone number ends replays of older hash-keyed changes to it
+        for scope in identity.scopes:
+            previous = self._latest.pop(scope, None)
+            if previous is not None and previous != identity.key:
+                self._drop(previous)
+            if identity.derived:
+                self._latest[scope] = identity.key
+        self._entries[identity.key] = _Entry(result, identity.fingerprint, identity.scopes, identity.derived,
+                                             now + self.ttl)
+        self._entries.move_to_end(identity.key)
+        while self._entries:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and oldest.expires > now:
+                break
+            self._drop(oldest_key)
+
+# Shared by every server in the process; SWAIG_IDEMPOTENCY_TTL=0 turns replay off
+responses = ResponseCache(float(os.getenv("SWAIG_IDEMPOTENCY_TTL", DEFAULT_TTL_SECONDS)),
+                          int(os.getenv("SWAIG_IDEMPOTENCY_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
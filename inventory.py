@@ -0,0 +1,166 @@
+"""
+Table inventory and allocation for capacity-aware bookings.
+
+Each table keeps one occupancy bitmap per date, with one bit per minute of the
+day. A booking occupies its table for the turn duration that applies to its
+party size, so checking whether a party fits a table is a single mask test.
+Days are loaded lazily through an optional loader, so the inventory can be
+dropped and rebuilt from the store one day at a time.
+"""
+import os
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+@dataclass(frozen=True)
+class Table:
+    table_id: str
+    seats: int
+
+# (max party size, minutes the table is held) pairs, checked in order
+DEFAULT_TURN_TIERS: Tuple[Tuple[int, int], ...] = ((2, 75), (4, 90), (8, 120), (20, 150))
+
+DEFAULT_TABLE_SPEC = "2:6,4:8,6:4,8:2,12:1,20:1"
+
+MINUTES_PER_DAY = 24 * 60
+_DAY_MASK = (1 << MINUTES_PER_DAY) - 1
+
+def tables_from_spec(spec: str) -> List[Table]:
+    """Build a table list from a 'seats:count,...' spec, e.g. '2:6,4:8,20:1'."""
+    tables = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        seats, _, count = part.partition(":")
+        seats, count = int(seats), int(count or 1)
+        if seats < 1 or count < 1:
+            raise ValueError(f"Invalid table spec entry: '{part}'")
+        for _ in range(count):
+            tables.append(Table(f"T{len(tables) + 1}", seats))
+    return tables
+
+def default_tables() -> List[Table]:
+    return tables_from_spec(os.getenv("RESTAURANT_TABLES", DEFAULT_TABLE_SPEC))
+
+class TableInventory:
+    """Allocates tables to parties using per-table, per-day minute bitmaps."""
+
+    def __init__(self, tables: Iterable[Table], turn_tiers: Sequence[Tuple[int, int]] = DEFAULT_TURN_TIERS,
+                 loader: Optional[Callable[["TableInventory", str], None]] = None):
+        # Smallest tables first so allocation is best-fit
+        self.tables: List[Table] = sorted(tables, key=lambda t: t.seats)
+        if not self.tables:
+            raise ValueError("Inventory needs at least one table")
+        self._seats = [t.seats for t in self.tables]
+        self._table_index = {t.table_id: i for i, t in enumerate(self.tables)}
+        self.turn_tiers = tuple(sorted(turn_tiers))
+        # Called with (inventory, date) the first time a date is touched, to claim existing bookings
+        self.loader = loader
+        # date -> occupancy bitmap per table (same order as self.tables)
+        self._days: Dict[str, List[int]] = {}
+        # date -> {(first eligible table, turn minutes): free start bitmap}, dropped when the day changes
+        self._free: Dict[str, Dict[Tuple[int, int], int]] = {}
+
+    @property
+    def max_seats(self) -> int:
+        return self._seats[-1]
+
+    def turn_minutes(self, party_size: int) -> int:
+        for max_party, minutes in self.turn_tiers:
+            if party_size <= max_party:
+                return minutes
+        return self.turn_tiers[-1][1]
+
+    def _mask(self, minute: int, party_size: int) -> int:
+        return ((1 << self.turn_minutes(party_size)) - 1) << minute
+
+    def _day(self, date: str) -> List[int]:
+        day = self._days.get(date)
+        if day is None:
+            day = self._days[date] = [0] * len(self.tables)
+            if self.loader is not None:
+                self.loader(self, date)
+        return day
+
+    def free_starts(self, date: str, party_size: int) -> int:
+        """
+        Bitmap of the minutes of the day at which some table seating the party is free for a whole turn.
+
+        Computed from the day's table bitmaps and kept until that day's occupancy changes.
+        """
+        day = self._day(date)
+        first = bisect_left(self._seats, party_size)
+        turn = self.turn_minutes(party_size)
+        cached = self._free.setdefault(date, {})
+        free = cached.get((first, turn))
+        if free is None:
+            free = 0
+            for occupied in day[first:]:
+                # Smear each busy minute back over the turn length: a start is blocked if any
+                # minute of [start, start + turn) is busy. Doubling takes log2(turn) steps.
+                blocked, covered = occupied, 1
+                while covered < turn:
+                    shift = min(covered, turn - covered)
+                    blocked |= blocked >> shift
+                    covered += shift
+                free |= ~blocked & _DAY_MASK
+            cached[(first, turn)] = free
+        return free
+
+    def find_table(self, date: str, minute: int, party_size: int) -> Optional[str]:
+        """Return the smallest free table that seats the party, without claiming it."""
+        day = self._day(date)
+        mask = self._mask(minute, party_size)
+        for i in range(bisect_left(self._seats, party_size), len(self.tables)):
+            if not day[i] & mask:
+                return self.tables[i].table_id
+        return None
+
+    def allocate(self, date: str, minute: int, party_size: int) -> Optional[str]:
+        """Claim the smallest free table that seats the party; None if the slot is full."""
+        day = self._day(date)
+        mask = self._mask(minute, party_size)
+        for i in range(bisect_left(self._seats, party_size), len(self.tables)):
+            if not day[i] & mask:
+                day[i] |= mask
+                self._free.pop(date, None)
+                return self.tables[i].table_id
+        return None
+
+    def claim(self, date: str, table_id: str, minute: int, party_size: int) -> bool:
+        """Claim a specific table; returns False if it is unknown, too small or busy."""
+        i = self._table_index.get(table_id)
+        if i is None or self._seats[i] < party_size:
+            return False
+        day = self._day(date)
+        mask = self._mask(minute, party_size)
+        if day[i] & mask:
+            return False
+        day[i] |= mask
+        self._free.pop(date, None)
+        return True
+
+    def release(self, date: str, table_id: str, minute: int, party_size: int) -> None:
+        i = self._table_index.get(table_id)
+        if i is not None:
+            day = self._day(date)
+            day[i] &= ~self._mask(minute, party_size)
+            self._free.pop(date, None)
+
+    def loaded(self, date: str) -> bool:
+        """True if the day's occupancy is held in memory."""
+        return date in self._days
+
+    def loaded_dates(self) -> List[str]:
+        return list(self._days)
+
+    def forget(self, date: str) -> None:
+        """Drop one day's occupancy so it is reloaded on next use."""
+        self._days.pop(date, None)
+        self._free.pop(date, None)
+
+    def clear(self) -> None:
+        """Forget all occupancy; days are reloaded on next use."""
+        self._days.clear()
+        self._free.clear()
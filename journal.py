@@ -0,0 +1,492 @@
+"""
+Durable in-memory reservation storage: an append-only journal plus binary snapshots.
+
+JournaledStore keeps every reservation in memory like MemoryStore and appends
+each write to a journal file. A background thread writes queued entries in
+batches with one fsync per batch (group commit); in "always" sync mode a
+transaction returns only once its entries are on disk. When the journal grows
+past a size limit it is compacted into a snapshot: fixed-width columns of
+starts, party sizes and string ids, a string table, and runs of records sharing
+a start, all sorted by start. Loading maps the file, turns each column into an
+array in one call, and builds the slot indexes one run at a time. Startup loads
+the snapshot and replays only the journal written since.
+
+Directory layout: snapshot.bin plus journal.<generation>.log files. A snapshot
+of generation G holds everything from journals older than G.
+"""
+import gc
+import json
+import mmap
+import os
+import struct
+import threading
+import weakref
+import zlib
+from array import array
+from contextlib import contextmanager
+from itertools import accumulate, groupby, repeat
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from records import Reservation, split_start
+from storage import MemoryStore
+
+DEFAULT_COMPACT_BYTES = 64 * 1024 * 1024
+SYNC_MODES = ("always", "batch")
+
+SNAPSHOT_FILE = "snapshot.bin"
+_SNAPSHOT_MAGIC = b"RSVSNAP3"
+# magic, generation, record count, string count, text size in bytes, run count
+_SNAPSHOT_HEADER = struct.Struct("<8sQQQQQ")
+# Then, in order: starts (int64), name ids, table ids + 1 (uint32, 0 for no table),
+# party sizes (uint16), run starts (int64), run lengths (uint32), string lengths in
+# characters (uint32), and the UTF-8 text of every string. The first record-count
+# strings are the phone numbers.
+_COLUMNS = (("starts", "q"), ("names", "I"), ("tables", "I"), ("party_sizes", "H"))
+_RUN_COLUMNS = (("run_starts", "q"), ("run_lengths", "I"))
+
+class Snapshot(NamedTuple):
+    generation: int
+    phones: List[str]
+    records: List[Reservation]
+    # (start, number of records) for each run of records with the same start, in record order
+    runs: List[Tuple[int, int]]
+
+# Journal frames: payload length and CRC32, then the JSON payload
+_FRAME = struct.Struct("<II")
+
+def _journal_name(generation: int) -> str:
+    return f"journal.{generation:08d}.log"
+
+def _journal_generations(directory: str) -> List[int]:
+    generations = []
+    for name in os.listdir(directory):
+        if name.startswith("journal.") and name.endswith(".log"):
+            try:
+                generations.append(int(name[len("journal."):-len(".log")]))
+            except ValueError:
+                continue
+    return sorted(generations)
+
+def _fsync_directory(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_snapshot(path: str, items: Iterable[Tuple[str, Reservation]], generation: int) -> int:
+    """Write reservations to a snapshot file atomically; returns the number of records."""
+    ordered = sorted(items, key=lambda item: (item[1].start, item[0]))
+    # Phone numbers are unique, so they take the first string ids, in record order
+    strings: List[str] = [phone_number for phone_number, _ in ordered]
+    ids: Dict[str, int] = {}
+
+    def string_id(text: str) -> int:
+        index = ids.get(text)
+        if index is None:
+            index = ids[text] = len(strings)
+            strings.append(text)
+        return index
+
+    columns = {
+        "starts": array("q", (r.start for _, r in ordered)),
+        "names": array("I", (string_id(r.name) for _, r in ordered)),
+        "tables": array("I", (string_id(r.table) + 1 if r.table is not None else 0 for _, r in ordered)),
+        "party_sizes": array("H", (r.party_size for _, r in ordered)),
+        "run_starts": array("q"),
+        "run_lengths": array("I")
+    }
+    for start, run in groupby(columns["starts"]):
+        columns["run_starts"].append(start)
+        columns["run_lengths"].append(sum(1 for _ in run))
+    lengths = array("I", map(len, strings))
+    text = "".join(strings).encode()
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, generation, len(ordered), len(strings), len(text),
+                                         len(columns["run_starts"])))
+        for name, _ in _COLUMNS + _RUN_COLUMNS:
+            file.write(columns[name].tobytes())
+        file.write(lengths.tobytes())
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+    return len(ordered)
+
+def read_snapshot(path: str) -> Snapshot:
+    """Load a snapshot file; records come back sorted by start."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ValueError(f"Empty snapshot: {path}")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            magic, generation, count, string_count, text_size, run_count = _SNAPSHOT_HEADER.unpack_from(view, 0)
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError(f"Not a reservation snapshot: {path}")
+            position = _SNAPSHOT_HEADER.size
+            columns: Dict[str, array] = {}
+            for names, length in ((_COLUMNS, count), (_RUN_COLUMNS, run_count), ((("lengths", "I"),), string_count)):
+                for name, code in names:
+                    column = array(code)
+                    column.frombytes(view[position:position + length * column.itemsize])
+                    position += length * column.itemsize
+                    columns[name] = column
+            text = view[position:position + text_size].decode()
+
+    # Collection passes over a million new objects would cost more than building them
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        bounds = [0, *accumulate(columns["lengths"])]
+        strings: List[Optional[str]] = list(map(text.__getitem__, map(slice, bounds, bounds[1:])))
+        phones = strings[:count]
+        # Table ids are shifted by one so that 0 can mean no table
+        tables = [None, *strings]
+        names = list(map(strings.__getitem__, columns["names"]))
+        table_names = list(map(tables.__getitem__, columns["tables"]))
+        party_sizes = columns["party_sizes"].tolist()
+        records: List[Reservation] = []
+        runs = list(zip(columns["run_starts"], columns["run_lengths"]))
+        position = 0
+        for start, length in runs:
+            # Records in a run share one start int instead of each getting a copy from the column
+            end = position + length
+            records.extend(map(Reservation, names[position:end], party_sizes[position:end], repeat(start, length),
+                               table_names[position:end]))
+            position = end
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return Snapshot(generation, phones, records, runs)
+
+def read_journal(path: str) -> Tuple[List[dict], int]:
+    """Entries of a journal file and the length of its valid prefix; a torn or corrupt tail is ignored."""
+    entries = []
+    with open(path, "rb") as file:
+        data = file.read()
+    position = 0
+    while position + _FRAME.size <= len(data):
+        length, checksum = _FRAME.unpack_from(data, position)
+        payload = data[position + _FRAME.size:position + _FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        # Frames are always UTF-8; json.loads would otherwise sniff the encoding of every payload
+        entries.append(json.loads(payload.decode()))
+        position += _FRAME.size + length
+    return entries, position
+
+class Journal:
+    """Append-only journal file with batched writes and one fsync per batch."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = 0
+        self._file = open(path, "ab")
+        self._cond = threading.Condition()
+        self._pending: List[bytes] = []
+        self._appended = 0
+        self._durable = 0
+        self._closed = False
+        # The first failed write or fsync; from then on nothing more is written and every wait() raises it
+        self.error: Optional[OSError] = None
+        # Serialises file writes, fsyncs and rotation
+        self._io_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="reservation-journal", daemon=True)
+        self._thread.start()
+
+    def append(self, entry: dict) -> int:
+        """Queue an entry and return its sequence number for wait()."""
+        payload = json.dumps(entry, separators=(",", ":")).encode()
+        frame = _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Journal is closed")
+            self._pending.append(frame)
+            self._appended += 1
+            self._cond.notify_all()
+            return self._appended
+
+    def wait(self, sequence: int) -> None:
+        """Block until every entry up to sequence has been written and fsynced; raises error if it never will be."""
+        with self._cond:
+            while self._durable < sequence:
+                if self.error is not None:
+                    raise self.error
+                self._cond.wait()
+
+    def _write_pending(self) -> None:
+        with self._cond:
+            batch, self._pending = self._pending, []
+            upto = self._appended
+            if self.error is not None:
+                # The file may end in a torn frame that replay stops at, so later batches could not be
+                # recovered either; leaving _durable behind keeps their waiters from reporting success
+                return
+        if batch:
+            data = b"".join(batch)
+            try:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                try:
+                    # Cut the unacknowledged batch off, so a restart does not replay what callers were told failed
+                    self._file.truncate(self.size)
+                except (OSError, ValueError):
+                    pass
+                with self._cond:
+                    self.error = e
+                    self._cond.notify_all()
+                return
+            self.size += len(data)
+        with self._cond:
+            self._durable = max(self._durable, upto)
+            self._cond.notify_all()
+
+    def flush(self) -> None:
+        """Write and fsync everything appended so far, from the calling thread."""
+        with self._io_lock:
+            self._write_pending()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+            # Entries appended while this batch is being fsynced join the next batch
+            self.flush()
+
+    def rotate(self, path: str) -> None:
+        """Flush this file and continue appending to a new one."""
+        with self._io_lock:
+            self._write_pending()
+            self._file.close()
+            self.path = path
+            self.size = 0
+            self._file = open(path, "ab")
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+        with self._io_lock:
+            self._write_pending()
+            self._file.close()
+
+class JournaledStore(MemoryStore):
+    """MemoryStore that survives restarts through a journal and periodic snapshots."""
+
+    def __init__(self, directory: str, sync: str = "always", compact_bytes: int = DEFAULT_COMPACT_BYTES):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"Unknown journal sync mode '{sync}'; use one of {', '.join(SYNC_MODES)}")
+        super().__init__()
+        self.directory = directory
+        self.sync = sync
+        self.compact_bytes = compact_bytes
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # Dates loaded from the snapshot whose index entries are not built yet: (time, position, length) runs
+        # of records in _snapshot_phones
+        self._unindexed: Dict[str, List[Tuple[str, int, int]]] = {}
+        self._snapshot_phones: List[str] = []
+        self._compacting = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        generation = self._recover()
+        self.generation = max([generation, *_journal_generations(directory)]) + 1
+        self.journal = Journal(os.path.join(directory, _journal_name(self.generation)))
+        # Batch-mode writes may still be queued at interpreter exit; the finalizer holds the journal, not the store,
+        # so a store that is dropped without close() is still freed
+        self._finalizer = weakref.finalize(self, self.journal.close)
+
+    def _recover(self) -> int:
+        """Load the snapshot and replay newer journals; returns the snapshot's generation."""
+        generation = 0
+        snapshot = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot):
+            loaded = read_snapshot(snapshot)
+            self._load(loaded)
+            generation = loaded.generation
+        for journal_generation in _journal_generations(self.directory):
+            if journal_generation < generation:
+                continue
+            path = os.path.join(self.directory, _journal_name(journal_generation))
+            entries, valid = read_journal(path)
+            for entry in entries:
+                self._replay(entry)
+            if valid < os.path.getsize(path):
+                # Drop a torn tail left by a crash mid-write
+                with open(path, "r+b") as file:
+                    file.truncate(valid)
+        return generation
+
+    def _load(self, snapshot: Snapshot) -> None:
+        """
+        Fill an empty store from a snapshot.
+
+        A date's slot and date index entries are built from its runs of
+        records the first time the date is used, so startup only pays for the
+        phone -> record dict.
+        """
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.data = dict(zip(snapshot.phones, snapshot.records))
+            self._snapshot_phones = snapshot.phones
+            position = 0
+            for start, length in snapshot.runs:
+                date, time = split_start(start)
+                self._unindexed.setdefault(date, []).append((time, position, length))
+                position += length
+            # Runs are sorted by start, so the dates come out in order
+            self._date_order = list(self._unindexed)
+            self._writes += 1
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def _index_day(self, date: str) -> None:
+        if date not in self._unindexed:
+            return
+        with self._lock:
+            runs = self._unindexed.get(date)
+            if runs is None:
+                return
+            phones = self._snapshot_phones
+            day: Set[str] = set()
+            for time, position, length in runs:
+                holders = phones[position:position + length]
+                self._slots[(date, time)] = set(holders)
+                day.update(holders)
+            self._dates[date] = day
+            # Only now, so a reader that found the date unindexed waits on the lock instead of seeing it empty
+            del self._unindexed[date]
+            if not self._unindexed:
+                self._snapshot_phones = []
+
+    def _replay(self, entry: dict) -> None:
+        op = entry["op"]
+        if op == "put":
+            super().__setitem__(entry["phone"], Reservation(entry["name"], entry["party_size"], entry["start"],
+                                                            entry.get("table")))
+        elif op == "delete":
+            if entry["phone"] in self.data:
+                super().__delitem__(entry["phone"])
+        elif op == "clear":
+            self._unindexed.clear()
+            super().clear()
+
+    def _record(self, entry: dict) -> None:
+        self._local.sequence = self.journal.append(entry)
+
+    def _check_journal(self, *phone_numbers: str) -> None:
+        """
+        Raise the journal's error before a write, so memory never gets ahead of what can be made durable.
+
+        Inside a transaction, also note what phone_numbers hold now, so the
+        write can be undone if the transaction's entries never reach the disk.
+        """
+        if self.journal.error is not None:
+            raise self.journal.error
+        undo = getattr(self._local, "undo", None)
+        if undo is not None:
+            for phone_number in phone_numbers:
+                if phone_number not in undo:
+                    undo[phone_number] = self.data.get(phone_number)
+
+    def __setitem__(self, phone_number: str, reservation: Mapping) -> None:
+        reservation = Reservation.from_dict(reservation)
+        with self._lock:
+            self._check_journal(phone_number)
+            super().__setitem__(phone_number, reservation)
+            self._record({"op": "put", "phone": phone_number, "name": reservation.name,
+                          "party_size": reservation.party_size, "start": reservation.start,
+                          "table": reservation.table})
+        self._maybe_compact()
+
+    def __delitem__(self, phone_number: str) -> None:
+        with self._lock:
+            self._check_journal(phone_number)
+            super().__delitem__(phone_number)
+            self._record({"op": "delete", "phone": phone_number})
+        self._maybe_compact()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._check_journal(*self.data)
+            self._unindexed.clear()
+            super().clear()
+            self._record({"op": "clear"})
+
+    def _undo(self, undo: Dict[str, Optional[Reservation]]) -> None:
+        """Put back the records a transaction changed, without journaling it."""
+        with self._lock:
+            for phone_number, previous in undo.items():
+                if previous is not None:
+                    super().__setitem__(phone_number, previous)
+                elif phone_number in self.data:
+                    super().__delitem__(phone_number)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Outermost exit waits until the transaction's journal entries are durable (sync='always').
+
+        If they cannot be made durable, the transaction's changes are undone in
+        memory before the journal's error is raised.
+        """
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        if depth == 0 and self.sync == "always":
+            self._local.undo = {}
+            self._local.sequence = 0
+        try:
+            yield self
+        finally:
+            self._local.depth = depth
+            if depth == 0 and self.sync == "always":
+                undo, self._local.undo = self._local.undo, None
+                if self._local.sequence:
+                    try:
+                        self.journal.wait(self._local.sequence)
+                    except OSError:
+                        self._undo(undo)
+                        raise
+
+    def _maybe_compact(self) -> None:
+        if self.journal.size >= self.compact_bytes and self._compacting.acquire(blocking=False):
+            threading.Thread(target=self._compact_and_release, name="reservation-compact", daemon=True).start()
+
+    def _compact_and_release(self) -> None:
+        try:
+            self.compact()
+        finally:
+            self._compacting.release()
+
+    def compact(self) -> int:
+        """Write a snapshot of the current reservations and delete the journals it covers."""
+        with self._lock:
+            # After a failed write, memory may hold changes whose callers were told they failed
+            if self.journal.error is not None:
+                raise self.journal.error
+            # Records are immutable, so a shallow copy taken with writes paused is consistent
+            self.generation += 1
+            self.journal.rotate(os.path.join(self.directory, _journal_name(self.generation)))
+            items = list(self.data.items())
+            generation = self.generation
+        count = write_snapshot(os.path.join(self.directory, SNAPSHOT_FILE), items, generation)
+        for old in _journal_generations(self.directory):
+            if old < generation:
+                os.remove(os.path.join(self.directory, _journal_name(old)))
+        return count
+
+    def close(self) -> None:
+        # Closes the journal once and takes it off the exit hooks
+        self._finalizer()
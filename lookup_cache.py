@@ -0,0 +1,86 @@
+"""
+Read-through cache of get_reservation replies.
+
+Callers check the same booking several times in one conversation, so the
+formatted reply is kept per phone number in a small LRU. A hit skips
+validation, the store read and formatting. The cache listens to the store and
+drops a number's entry on every write to it, and drops everything on clear.
+That covers create, update, move, cancel and atomic() rollbacks alike.
+
+Other processes' writes to a shared store (SQLite) are not seen by listeners,
+so for those stores each entry also records the store revision it was read
+at and is used only while the revision is unchanged.
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import metrics
+from storage import ReservationStore
+
+DEFAULT_CAPACITY = 10000
+
+# (generation, store revision or None) taken before a read; see LookupCache.stamp
+Stamp = Tuple[int, Optional[str]]
+
+class LookupCache:
+    """LRU of phone number -> reply text, kept consistent with one store."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._store: Optional[ReservationStore] = None
+        self._lock = threading.Lock()
+        # phone number -> (reply, store revision for shared stores)
+        self._entries: "OrderedDict[str, Tuple[str, Optional[str]]]" = OrderedDict()
+        # Bumped by every invalidation, so a reply read before a write is never stored after it
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def attach(self, store: ReservationStore) -> None:
+        """Follow store's writes from now on (and stop following the previous store)."""
+        if self._store is not None:
+            self._store.remove_listener(self.invalidate)
+        self._store = store
+        store.add_listener(self.invalidate)
+        self.invalidate(None)
+
+    def invalidate(self, phone_number: Optional[str]) -> None:
+        """Drop the entry for phone_number, or every entry for None."""
+        with self._lock:
+            self._generation += 1
+            if phone_number is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(phone_number, None)
+
+    def get(self, phone_number: str) -> Optional[str]:
+        entry = self._entries.get(phone_number)
+        if entry is not None and (entry[1] is None or entry[1] == self._store.revision()):
+            with self._lock:
+                if phone_number in self._entries:
+                    self._entries.move_to_end(phone_number)
+            self.hits += 1
+            metrics.lookup_cache.inc("hit")
+            return entry[0]
+        self.misses += 1
+        metrics.lookup_cache.inc("miss")
+        return None
+
+    def stamp(self) -> Stamp:
+        """Take before reading the store; pass to put() with the reply built from that read."""
+        return self._generation, self._store.revision() if self._store.shared else None
+
+    def put(self, phone_number: str, reply: str, stamp: Stamp) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            if stamp[0] != self._generation:
+                return
+            self._entries[phone_number] = (reply, stamp[1])
+            self._entries.move_to_end(phone_number)
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
@@ -0,0 +1,92 @@
+"""
+Compact reservation records.
+
+A Reservation keeps its start as one integer (minutes since 1970-01-01, local
+time) instead of separate date and time strings, interns the guest name and
+table id, and uses __slots__, so a stored booking costs a fraction of a dict.
+It still reads like the dicts it replaces: reservation["date"] and
+reservation.get("table") work, and the date and time strings come from shared
+lookup tables rather than being built per access.
+"""
+import sys
+from collections.abc import Mapping
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import validation
+
+MINUTES_PER_DAY = 24 * 60
+_EPOCH = date(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+# "HH:MM" for every minute of the day, and "YYYY-MM-DD" for each day number seen so far
+_TIMES = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in range(MINUTES_PER_DAY))
+_DATES: Dict[int, str] = {}
+# Start values are shared too: most bookings fall on a few thousand distinct minutes
+_STARTS: Dict[int, int] = {}
+
+_FIELDS = ("name", "party_size", "date", "time", "table")
+
+def _date_string(day: int) -> str:
+    text = _DATES.get(day)
+    if text is None:
+        text = _DATES.setdefault(day, (_EPOCH + timedelta(days=day)).isoformat())
+    return text
+
+def split_start(start: int) -> Tuple[str, str]:
+    """('YYYY-MM-DD', 'HH:MM') for minutes since the epoch, from the shared string tables."""
+    return _date_string(start // MINUTES_PER_DAY), _TIMES[start % MINUTES_PER_DAY]
+
+def start_minute(date_str: str, time_str: str) -> int:
+    """Minutes since the epoch for 'YYYY-MM-DD' and 'HH:MM'; ValueError if either is malformed."""
+    slot = validation.parse_slot(date_str, time_str)
+    if slot is None:
+        raise ValueError(f"Invalid date or time: {date_str!r} {time_str!r}")
+    start = (slot.toordinal() - _EPOCH_ORDINAL) * MINUTES_PER_DAY + slot.hour * 60 + slot.minute
+    return _STARTS.setdefault(start, start)
+
+class Reservation(Mapping):
+    """One booking, readable both as attributes and as the legacy reservation dict."""
+
+    __slots__ = ("name", "party_size", "start", "table")
+
+    def __init__(self, name: str, party_size: int, start: int, table: Optional[str] = None):
+        self.name = sys.intern(name)
+        self.party_size = party_size
+        self.start = start
+        self.table = sys.intern(table) if table is not None else None
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Reservation":
+        if isinstance(data, Reservation):
+            return data
+        return cls(data["name"], int(data["party_size"]), start_minute(data["date"], data["time"]), data.get("table"))
+
+    @property
+    def date(self) -> str:
+        return _date_string(self.start // MINUTES_PER_DAY)
+
+    @property
+    def time(self) -> str:
+        return _TIMES[self.start % MINUTES_PER_DAY]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "party_size": self.party_size, "date": self.date, "time": self.time,
+                "table": self.table}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in _FIELDS else default
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_FIELDS)
+
+    def __len__(self) -> int:
+        return len(_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Reservation({self.name!r}, {self.party_size}, {self.date} {self.time}, table={self.table!r})"
@@ -1,38 +1,311 @@
+import base64
+import binascii
+import os
+import threading
 import uuid
-from datetime import datetime
-from typing import Dict, Optional
-import re
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
-# Mock reservation data storage
-reservations: Dict[str, dict] = {}
+import metrics
+import validation
+from changefeed import CANCELED, CREATED, MOVED, UPDATED, ChangeFeed
+from inventory import Table, TableInventory, default_tables, DEFAULT_TURN_TIERS
+from lookup_cache import DEFAULT_CAPACITY, LookupCache
+from standing import StandingBook, StandingReservation
+from storage import ReservationStore, store_from_url
+from waitlist import BOOKED, DROPPED, FULL, Waitlist, WaitlistEntry
+
+# Reservation storage: in memory unless RESERVATION_DB points at a SQLite database
+reservations: ReservationStore = store_from_url(os.getenv("RESERVATION_DB"))
+
+# get_reservation replies, dropped whenever the store writes the phone number
+lookups = LookupCache(int(os.getenv("GET_CACHE_SIZE", DEFAULT_CAPACITY)))
+lookups.attach(reservations)
+
+# Weekly standing reservations, whose tables are claimed on each date as it is loaded (see standing.py)
+standing = StandingBook(os.getenv("STANDING_RESERVATIONS_FILE"))
+
+# Parties waiting for a full slot, offered tables as they are freed (see waitlist.py)
+waitlist = Waitlist()
+
+# Committed creates, updates, moves and cancels, for GET /changes subscribers (see changefeed.py)
+changes = ChangeFeed(int(os.getenv("CHANGE_FEED_HISTORY", 1000)), int(os.getenv("CHANGE_FEED_BUFFER", 256)))
+
+def _minute_of_day(time_str: str) -> int:
+    hours, minutes = time_str.split(":")
+    return int(hours) * 60 + int(minutes)
+
+def _load_day(day_inventory: TableInventory, date: str) -> None:
+    """Claim tables for a day's stored bookings, re-seating any whose table no longer fits."""
+    for phone_number, reservation in reservations.on_date(date):
+        minute = _minute_of_day(reservation["time"])
+        table_id = reservation.get("table")
+        if table_id is None or not day_inventory.claim(date, table_id, minute, reservation["party_size"]):
+            table_id = day_inventory.allocate(date, minute, reservation["party_size"])
+            reservations[phone_number] = dict(reservation, table=table_id)
+    # Standing reservations are seated after the day's bookings, which were made first
+    for rule in standing.on_date(date):
+        rule.tables[date] = day_inventory.allocate(date, _minute_of_day(rule.time), rule.party_size)
+
+# Table inventory used for all capacity checks
+inventory = TableInventory(default_tables(), loader=_load_day)
+
+def is_slot_booked(date: str, time: str) -> bool:
+    """Return True if any reservation starts at the given date/time slot."""
+    return bool(reservations.phones_at(date, time))
+
+def _release_table(reservation: dict) -> None:
+    table_id = reservation.get("table")
+    if table_id is not None:
+        inventory.release(reservation["date"], table_id, _minute_of_day(reservation["time"]), reservation["party_size"])
+
+def _reallocate_table(current: dict, date: str, time: str, party_size: int) -> Optional[str]:
+    """Move a reservation's table claim to a new slot; on failure the old claim is kept."""
+    with metrics.stage("conflict_check"):
+        _release_table(current)
+        table_id = inventory.allocate(date, _minute_of_day(time), party_size)
+        if table_id is None and current.get("table") is not None:
+            inventory.claim(current["date"], current["table"], _minute_of_day(current["time"]), current["party_size"])
+        return table_id
+
+# Spacing of the start times offered by find_available_slots, in minutes
+SLOT_STEP_MINUTES = 15
+# Defaults for find_available_slots and the alternatives offered when a slot is taken
+SUGGESTION_WINDOW_MINUTES = 120
+DEFAULT_SUGGESTIONS = 3
+
+def _format_minute(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def _open_slots(date: str, party_size: int, preferred_minute: Optional[int], window_minutes: int,
+                count: int, step: int = SLOT_STEP_MINUTES) -> List[str]:
+    """Bookable start times nearest to preferred_minute, nearest first; the caller holds the date's lock."""
+    free = inventory.free_starts(date, party_size)
+    if not free:
+        return []
+    starts = range(validation.OPENING_HOUR * 60, validation.CLOSING_HOUR * 60, step)
+    if preferred_minute is None:
+        preferred_minute = starts[0]
+    candidates = sorted((m for m in starts if abs(m - preferred_minute) <= window_minutes),
+                        key=lambda m: (abs(m - preferred_minute), m))
+    found = []
+    for minute in candidates:
+        if free >> minute & 1 and validation.is_bookable_slot(date, _format_minute(minute)):
+            found.append(_format_minute(minute))
+            if len(found) == count:
+                break
+    return found
+
+# Striped locks serialise mutations per phone number and per date without one global lock.
+# Lock order is always phone stripes, then date stripes, then the store transaction.
+_LOCK_STRIPES = 256
+_phone_locks = [threading.RLock() for _ in range(_LOCK_STRIPES)]
+_date_locks = [threading.RLock() for _ in range(_LOCK_STRIPES)]
+
+@contextmanager
+def _striped(locks: List[threading.RLock], keys: Iterable[str]):
+    stripes = sorted({hash(key) % len(locks) for key in keys})
+    for i in stripes:
+        locks[i].acquire()
+    try:
+        yield
+    finally:
+        for i in reversed(stripes):
+            locks[i].release()
+
+def _phone_lock(phone_number: str):
+    """Hold while reading a reservation that is about to be changed."""
+    return _striped(_phone_locks, (phone_number,))
+
+@contextmanager
+def _all_locks():
+    """Hold every phone and date stripe, in the same order single mutations use."""
+    held = []
+    try:
+        for lock in _phone_locks + _date_locks:
+            lock.acquire()
+            held.append(lock)
+        yield
+    finally:
+        for lock in reversed(held):
+            lock.release()
+
+# Per-thread undo log of an open atomic() block: phone number -> record before the block
+_undo = threading.local()
+
+def _save_undo(phone_number: str) -> None:
+    log = getattr(_undo, "log", None)
+    if log is not None and phone_number not in log:
+        log[phone_number] = reservations.get(phone_number)
+
+class AtomicBlock:
+    """Handle for an atomic() block; rollback() restores every record it changed."""
+
+    def __init__(self):
+        self.rolled_back = False
+
+    def rollback(self) -> None:
+        try:
+            for phone_number, previous in _undo.log.items():
+                if previous is None:
+                    if phone_number in reservations:
+                        del reservations[phone_number]
+                else:
+                    reservations[phone_number] = previous
+        finally:
+            _undo.log.clear()
+            # Nothing the block did is reported
+            del _undo.changes[:]
+            # Table claims are re-derived from the restored records, even if restoring one failed
+            inventory.clear()
+            self.rolled_back = True
+
+@contextmanager
+def atomic():
+    """
+    Run several reservation calls all-or-nothing.
+
+    Other mutations wait until the block ends; reads are not blocked. Changes are
+    rolled back if the block raises or calls rollback() on the yielded handle.
+    """
+    if getattr(_undo, "log", None) is not None:
+        raise RuntimeError("atomic() blocks cannot be nested")
+    block = AtomicBlock()
+    with _all_locks(), _deferred_changes(), _committing():
+        _undo.log = {}
+        _undo.freed = set()
+        try:
+            yield block
+        except BaseException:
+            block.rollback()
+            raise
+        finally:
+            _undo.log = None
+            freed, _undo.freed = _undo.freed, None
+    # Tables freed in the block are offered to waiting parties once it has committed and let go of the locks
+    if not block.rolled_back:
+        for date in sorted(freed):
+            _offer_freed_table(date)
+
+def _publish(kind: str, phone_number: str, reservation: Mapping) -> None:
+    """Report a change to the feed once the store transaction it was made in commits."""
+    pending = getattr(_undo, "changes", None)
+    if pending is not None:
+        pending.append((kind, phone_number, reservation))
+    else:
+        changes.publish(kind, phone_number, reservation)
+
+@contextmanager
+def _deferred_changes():
+    """Hold back changes published in the block until it ends without raising, then publish them in order."""
+    if getattr(_undo, "changes", None) is not None:
+        # An enclosing block publishes them
+        yield
+        return
+    _undo.changes = []
+    try:
+        yield
+        pending = _undo.changes
+    finally:
+        _undo.changes = None
+    for change in pending:
+        changes.publish(*change)
+
+@contextmanager
+def _committing():
+    """A store transaction spanning every date; cached table claims are dropped if it fails, commit included."""
+    try:
+        with reservations.transaction():
+            yield
+    except BaseException:
+        # Claims for rows that were not stored would otherwise stay in the bitmaps
+        inventory.clear()
+        raise
+
+@contextmanager
+def _store_transaction(*dates: str):
+    """Lock the dates whose tables change, then run the check-and-write atomically in the store."""
+    # Changes are published after the commit but while the locks are held, so they arrive in order
+    with _striped(_date_locks, dates), _deferred_changes():
+        try:
+            with reservations.transaction():
+                # Another worker sharing the store may have booked tables we have cached
+                if reservations.changed_externally():
+                    inventory.clear()
+                yield
+        except BaseException:
+            # Claims made before the failure may not match the store any more
+            for date in dates:
+                inventory.forget(date)
+            raise
+
+def configure_inventory(tables: List[Table], turn_tiers: Sequence[Tuple[int, int]] = DEFAULT_TURN_TIERS) -> None:
+    """Replace the table layout; stored reservations are re-seated on it as each day is used."""
+    global inventory
+    inventory = TableInventory(tables, turn_tiers, loader=_load_day)
+
+def rebuild_inventory() -> None:
+    """Drop cached table occupancy, e.g. after loading reservations in bulk."""
+    inventory.clear()
+
+def configure_store(store: ReservationStore) -> None:
+    """Switch the storage backend used by all reservation functions."""
+    global reservations
+    reservations = store
+    lookups.attach(store)
+    inventory.clear()
+
+def data_version() -> str:
+    """Token that changes after every create, update, cancel or move, in any worker sharing the store."""
+    return reservations.revision()
 
 def validate_phone_number(phone: str) -> bool:
     """Validate phone number in E.164 format."""
-    pattern = r'^\+[1-9]\d{1,14}$'
-    return bool(re.match(pattern, phone))
+    return validation.is_valid_phone(phone)
 
 def validate_date_time(date_str: str, time_str: str) -> bool:
-    try:
-        # Parse the date and time
-        dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-        
-        # Check if date is in the past
-        if dt < datetime.now():
-            return False
-            
-        # Check if time is within business hours (14:00-22:00)
-        hour = dt.hour
-        if hour < 14 or hour >= 22:
-            return False
-            
-        return True
-    except ValueError:
-        return False
+    """Require YYYY-MM-DD and HH:MM, in the future and within business hours (14:00-22:00)."""
+    return validation.is_bookable_slot(date_str, time_str)
 
 def validate_party_size(party_size: int) -> bool:
     """Validate party size is within reasonable limits."""
     return 1 <= party_size <= 20  # Maximum party size of 20
 
+# Message prefixes of the *_response functions, by outcome
+_RESPONSE_CATEGORIES = (
+    ("ok", ("Reservation successfully created.", "Reservation found:", "Reservation updated:",
+            "Reservation canceled successfully.", "Reservation moved successfully.", "Reservations found:",
+            "Available times", "Added to the waitlist", "Removed from the waitlist", "Standing reservation")),
+    ("not_found", ("No reservation found", "No reservations found", "No available times", "No waitlist entry",
+                   "No standing reservation")),
+    ("conflict", ("This time slot is already booked", "A reservation already exists", "We have no table",
+                  "This time slot still has a table", "A standing reservation already exists")),
+    ("validation", ("Invalid", "Party size", "Missing required field", "Phone number is required"))
+)
+
+def response_category(message: str) -> str:
+    """Classify a *_response message as ok, not_found, conflict, validation or error."""
+    for category, prefixes in _RESPONSE_CATEGORIES:
+        if message.startswith(prefixes):
+            return category
+    return "error"
+
+def _new_reservation_error(phone_number: str, party_size: int, date: str, time: str) -> Optional[str]:
+    """Why a new booking with these details cannot be made, or None if it passes every check but capacity."""
+    if not validate_phone_number(phone_number):
+        return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
+
+    if not validate_party_size(party_size):
+        return "Party size must be between 1 and 20 people."
+
+    if not validate_date_time(date, time):
+        return "Invalid date or time. Reservations must be for future dates during business hours (14:00-22:00)."
+
+    if party_size > inventory.max_seats:
+        return f"We have no table that can seat a party of {party_size}."
+    return None
+
 def create_reservation_response(data: dict) -> str:
     try:
         name = data["name"]
@@ -41,29 +314,38 @@ def create_reservation_response(data: dict) -> str:
         time = data["time"]
         phone_number = data["phone_number"]
 
-        if not validate_phone_number(phone_number):
-            return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
-
-        if not validate_party_size(party_size):
-            return "Party size must be between 1 and 20 people."
-
-        if not validate_date_time(date, time):
-            return "Invalid date or time. Reservations must be for future dates during business hours (14:00-22:00)."
+        with metrics.stage("validation"):
+            error = _new_reservation_error(phone_number, party_size, date, time)
+        if error is not None:
+            return error
 
-        if phone_number in reservations:
-            return "A reservation already exists for this phone number."
+        with _phone_lock(phone_number), _store_transaction(date):
+            with metrics.stage("conflict_check"):
+                if phone_number in reservations:
+                    return "A reservation already exists for this phone number."
 
-        # Check for overlapping reservations
-        for existing_res in reservations.values():
-            if existing_res["date"] == date and existing_res["time"] == time:
+                # Check for a free table of the right size for the whole turn
+                table_id = inventory.allocate(date, _minute_of_day(time), party_size)
+            if table_id is None:
+                # Offer alternatives in the same reply so the caller need not guess
+                nearby = _open_slots(date, party_size, _minute_of_day(time), SUGGESTION_WINDOW_MINUTES,
+                                     DEFAULT_SUGGESTIONS)
+                if nearby:
+                    return ("This time slot is already booked. Please choose a different time. "
+                            f"The nearest open times are {', '.join(nearby)}.")
                 return "This time slot is already booked. Please choose a different time."
 
-        reservations[phone_number] = {
-            "name": name,
-            "party_size": party_size,
-            "date": date,
-            "time": time
-        }
+            _save_undo(phone_number)
+            record = {
+                "name": name,
+                "party_size": party_size,
+                "date": date,
+                "time": time,
+                "table": table_id
+            }
+            with metrics.stage("storage"):
+                reservations[phone_number] = record
+            _publish(CREATED, phone_number, record)
 
         return "Reservation successfully created."
 
@@ -75,14 +357,24 @@ def create_reservation_response(data: dict) -> str:
 def get_reservation_response(data: dict) -> str:
     try:
         phone_number = data["phone_number"]
-        
-        if not validate_phone_number(phone_number):
-            return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
+        # Only valid numbers are cached, so a hit needs no validation
+        reply = lookups.get(phone_number)
+        if reply is not None:
+            return reply
 
-        reservation = reservations.get(phone_number)
+        with metrics.stage("validation"):
+            if not validate_phone_number(phone_number):
+                return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
+
+        stamp = lookups.stamp()
+        with metrics.stage("storage"):
+            reservation = reservations.get(phone_number)
         if reservation:
-            return f"Reservation found: {reservation['name']} for {reservation['party_size']} people on {reservation['date']} at {reservation['time']}. Contact: {phone_number}"
-        return "No reservation found for this phone number."
+            reply = f"Reservation found: {reservation['name']} for {reservation['party_size']} people on {reservation['date']} at {reservation['time']}. Contact: {phone_number}"
+        else:
+            reply = "No reservation found for this phone number."
+        lookups.put(phone_number, reply, stamp)
+        return reply
 
     except KeyError:
         return "Phone number is required."
@@ -93,29 +385,60 @@ def update_reservation_response(data: dict) -> str:
     try:
         phone_number = data["phone_number"]
         
-        if not validate_phone_number(phone_number):
-            return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
+        with metrics.stage("validation"):
+            if not validate_phone_number(phone_number):
+                return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
 
         if phone_number not in reservations:
             return "No reservation found for this phone number."
 
-        current_reservation = reservations[phone_number]
-        
-        if "date" in data and "time" in data:
-            if not validate_date_time(data["date"], data["time"]):
-                return "Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time."
+        with metrics.stage("validation"):
+            if "date" in data and "time" in data:
+                if not validate_date_time(data["date"], data["time"]):
+                    return "Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time."
+
+            if "party_size" in data and int(data["party_size"]) < 1:
+                return "Party size must be at least 1 person."
 
-        if "party_size" in data and int(data["party_size"]) < 1:
-            return "Party size must be at least 1 person."
+            if "party_size" in data and int(data["party_size"]) > inventory.max_seats:
+                return f"We have no table that can seat a party of {int(data['party_size'])}."
 
-        updated_reservation = {
-            "name": data.get("name", current_reservation["name"]),
-            "party_size": int(data.get("party_size", current_reservation["party_size"])),
-            "date": data.get("date", current_reservation["date"]),
-            "time": data.get("time", current_reservation["time"])
-        }
+        # Date of the table given up, if the booking changes slot or size
+        freed_date = None
+        with _phone_lock(phone_number):
+            current_reservation = reservations.get(phone_number)
+            if current_reservation is None:
+                return "No reservation found for this phone number."
 
-        reservations[phone_number] = updated_reservation
+            with _store_transaction(current_reservation["date"], data.get("date", current_reservation["date"])):
+                # Re-read inside the transaction in case another process changed it
+                current_reservation = reservations.get(phone_number)
+                if current_reservation is None:
+                    return "No reservation found for this phone number."
+
+                updated_reservation = {
+                    "name": data.get("name", current_reservation["name"]),
+                    "party_size": int(data.get("party_size", current_reservation["party_size"])),
+                    "date": data.get("date", current_reservation["date"]),
+                    "time": data.get("time", current_reservation["time"]),
+                    "table": current_reservation.get("table")
+                }
+
+                if (updated_reservation["date"], updated_reservation["time"], updated_reservation["party_size"]) != \
+                        (current_reservation["date"], current_reservation["time"], current_reservation["party_size"]):
+                    table_id = _reallocate_table(current_reservation, updated_reservation["date"],
+                                                 updated_reservation["time"], updated_reservation["party_size"])
+                    if table_id is None:
+                        return "This time slot is already booked. Please choose a different time."
+                    updated_reservation["table"] = table_id
+                    freed_date = current_reservation["date"]
+
+                _save_undo(phone_number)
+                with metrics.stage("storage"):
+                    reservations[phone_number] = updated_reservation
+                _publish(UPDATED, phone_number, updated_reservation)
+        if freed_date is not None:
+            _offer_freed_table(freed_date)
         return f"Reservation updated: {updated_reservation['name']} for {updated_reservation['party_size']} people on {updated_reservation['date']} at {updated_reservation['time']}. Contact: {phone_number}"
 
     except KeyError:
@@ -123,16 +446,37 @@ def update_reservation_response(data: dict) -> str:
     except Exception as e:
         return f"Error updating reservation: {str(e)}"
 
+def fill_update(data: dict) -> dict:
+    """update_reservation arguments with omitted fields taken from the stored booking, so date and time are checked together."""
+    current = reservations.get(data.get("phone_number", "")) or {}
+    filled = {key: data.get(key) or current.get(key) for key in ("name", "party_size", "date", "time")}
+    if "phone_number" in data:
+        filled["phone_number"] = data["phone_number"]
+    return filled
+
 def cancel_reservation_response(data: dict) -> str:
     try:
         phone_number = data["phone_number"]
         
-        if not validate_phone_number(phone_number):
-            return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
+        with metrics.stage("validation"):
+            if not validate_phone_number(phone_number):
+                return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
 
-        if phone_number in reservations:
-            reservation = reservations[phone_number]
-            del reservations[phone_number]
+        canceled = False
+        with _phone_lock(phone_number):
+            reservation = reservations.get(phone_number)
+            if reservation is not None:
+                with _store_transaction(reservation["date"]):
+                    reservation = reservations.get(phone_number)
+                    if reservation is not None:
+                        _save_undo(phone_number)
+                        with metrics.stage("storage"):
+                            del reservations[phone_number]
+                        _release_table(reservation)
+                        _publish(CANCELED, phone_number, reservation)
+                        canceled = True
+        if canceled:
+            _offer_freed_table(reservation["date"])
             return "Reservation canceled successfully."
         return "No reservation found for this phone number."
 
@@ -147,24 +491,448 @@ def move_reservation_response(data: dict) -> str:
         new_date = data["new_date"]
         new_time = data["new_time"]
         
-        if not validate_phone_number(phone_number):
-            return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
+        with metrics.stage("validation"):
+            if not validate_phone_number(phone_number):
+                return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
+
+            if not validate_date_time(new_date, new_time):
+                return "Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time."
 
-        if not validate_date_time(new_date, new_time):
-            return "Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time."
+        moved = False
+        with _phone_lock(phone_number):
+            reservation = reservations.get(phone_number)
+            if reservation is not None:
+                with _store_transaction(reservation["date"], new_date):
+                    reservation = reservations.get(phone_number)
+                    if reservation is not None:
+                        table_id = _reallocate_table(reservation, new_date, new_time, reservation["party_size"])
+                        if table_id is None:
+                            return "This time slot is already booked. Please choose a different time."
 
-        if phone_number in reservations:
-            reservation = reservations[phone_number]
-            old_date = reservation["date"]
-            old_time = reservation["time"]
-            
-            reservation["date"] = new_date
-            reservation["time"] = new_time
-            
+                        # Store a new record rather than editing the stored one in place
+                        _save_undo(phone_number)
+                        moved_reservation = dict(reservation, date=new_date, time=new_time, table=table_id)
+                        with metrics.stage("storage"):
+                            reservations[phone_number] = moved_reservation
+                        _publish(MOVED, phone_number, moved_reservation)
+                        moved = True
+        if moved:
+            _offer_freed_table(reservation["date"])
             return "Reservation moved successfully."
         return "No reservation found for this phone number."
 
     except KeyError as e:
         return f"Missing required field: {str(e)}"
     except Exception as e:
-        return f"Error moving reservation: {str(e)}" 
\ No newline at end of file
+        return f"Error moving reservation: {str(e)}" 
+
+def _waiting_party_fits(date: str, time: str, party_size: int) -> bool:
+    if not validation.is_bookable_slot(date, time):
+        return False
+    with _striped(_date_locks, (date,)):
+        return inventory.find_table(date, _minute_of_day(time), party_size) is not None
+
+def _book_waiting(entry: WaitlistEntry) -> str:
+    reply = create_reservation_response({"name": entry.name, "party_size": entry.party_size, "date": entry.date,
+                                         "time": entry.time, "phone_number": entry.phone_number})
+    if response_category(reply) == "ok":
+        metrics.waitlist_promotions.inc()
+        return BOOKED
+    # Otherwise the number has booked something else meanwhile, or the slot is no longer bookable
+    return FULL if reply.startswith("This time slot is already booked") else DROPPED
+
+def _offer_freed_table(date: str) -> None:
+    """Book waiting parties into tables just freed on date; called with no locks held."""
+    if not len(waitlist):
+        return
+    freed = getattr(_undo, "freed", None)
+    if freed is not None:
+        # Inside atomic(), which offers them when it ends
+        freed.add(date)
+        return
+    waitlist.promote(date, waitlist.times_on(date), partial(_waiting_party_fits, date), _book_waiting)
+
+def join_waitlist_response(data: dict) -> str:
+    try:
+        name = data["name"]
+        party_size = int(data["party_size"])
+        date = data["date"]
+        time = data["time"]
+        phone_number = data["phone_number"]
+
+        with metrics.stage("validation"):
+            error = _new_reservation_error(phone_number, party_size, date, time)
+        if error is not None:
+            return error
+        if phone_number in reservations:
+            return "A reservation already exists for this phone number."
+        if _waiting_party_fits(date, time, party_size):
+            return "This time slot still has a table. Please book it with create_reservation."
+
+        ahead = waitlist.join(phone_number, name, party_size, date, time)
+        # A table freed since the check above is offered now rather than at the next cancellation
+        _offer_freed_table(date)
+        if phone_number in reservations:
+            return "Reservation successfully created."
+        return f"Added to the waitlist for {date} at {time}. Parties ahead: {ahead}."
+
+    except KeyError as e:
+        return f"Missing required field: {str(e)}"
+    except Exception as e:
+        return f"Error joining the waitlist: {str(e)}"
+
+def leave_waitlist_response(data: dict) -> str:
+    try:
+        phone_number = data["phone_number"]
+        if not validate_phone_number(phone_number):
+            return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
+        if waitlist.leave(phone_number) is None:
+            return "No waitlist entry found for this phone number."
+        return "Removed from the waitlist."
+
+    except KeyError:
+        return "Phone number is required."
+    except Exception as e:
+        return f"Error leaving the waitlist: {str(e)}"
+
+def _booked_dates(from_date: str) -> Iterator[str]:
+    """Each date from from_date on that has bookings, in order, one store lookup per date."""
+    after = (from_date, "", "")
+    while True:
+        rows = reservations.scan(after, limit=1)
+        if not rows:
+            return
+        date = rows[0][1]["date"]
+        yield date
+        # "\uffff" sorts after every time, so the next lookup starts on the following date
+        after = (date, "\uffff", "")
+
+def _release_standing(rule: StandingReservation, date: str) -> None:
+    table_id = rule.tables.pop(date, None)
+    # A day dropped from memory since holds no claim any more
+    if table_id is not None and inventory.loaded(date):
+        inventory.release(date, table_id, _minute_of_day(rule.time), rule.party_size)
+
+def create_standing_reservation_response(data: dict) -> str:
+    try:
+        name = data["name"]
+        party_size = int(data["party_size"])
+        date = data["date"]
+        time = data["time"]
+        phone_number = data["phone_number"]
+
+        with metrics.stage("validation"):
+            error = _new_reservation_error(phone_number, party_size, date, time)
+        if error is not None:
+            return error
+
+        minute = _minute_of_day(time)
+        with _all_locks(), reservations.transaction():
+            if reservations.changed_externally():
+                inventory.clear()
+            if standing.get(phone_number) is not None:
+                return "A standing reservation already exists for this phone number."
+            rule = StandingReservation(phone_number, name, party_size, date, time)
+            # Other dates' tables are all free: nothing is booked there and no day is loaded
+            with metrics.stage("conflict_check"):
+                dates = sorted(day for day in set(_booked_dates(date)) | set(inventory.loaded_dates())
+                               if rule.occurs_on(day))
+                for day in dates:
+                    if inventory.find_table(day, minute, party_size) is None:
+                        return f"This time slot is already booked on {day}. Please choose a different time."
+            standing.add(rule)
+            for day in dates:
+                rule.tables[day] = inventory.allocate(day, minute, party_size)
+        weekday = validation.parse_slot(date, time).strftime("%A")
+        return f"Standing reservation created: {name} for {party_size} people every {weekday} at {time}, " \
+               f"starting {date}. Contact: {phone_number}"
+
+    except KeyError as e:
+        return f"Missing required field: {str(e)}"
+    except Exception as e:
+        return f"Error creating standing reservation: {str(e)}"
+
+def cancel_standing_reservation_response(data: dict) -> str:
+    """Call off one occurrence (with date) or the whole standing reservation."""
+    try:
+        phone_number = data["phone_number"]
+        date = data.get("date")
+        if not validate_phone_number(phone_number):
+            return "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."
+        rule = standing.get(phone_number)
+        if rule is None:
+            return "No standing reservation found for this phone number."
+
+        if date:
+            if not validation.is_valid_date(date) or not rule.occurs_on(date):
+                return f"No standing reservation occurs on {date}."
+            with _store_transaction(date):
+                standing.skip(rule, date)
+                _release_standing(rule, date)
+            _offer_freed_table(date)
+            return f"Standing reservation skipped on {date}."
+
+        # Every lock, so no day is loaded with the rule while it is being removed
+        with _all_locks():
+            standing.remove(phone_number)
+            dates = sorted(rule.tables)
+            for day in dates:
+                _release_standing(rule, day)
+        for day in dates:
+            _offer_freed_table(day)
+        return "Standing reservation canceled successfully."
+
+    except KeyError:
+        return "Phone number is required."
+    except Exception as e:
+        return f"Error canceling standing reservation: {str(e)}"
+
+def create_reservations(rows: Sequence[Mapping]) -> List[Optional[str]]:
+    """
+    Create many reservations at once; for each row, None if it was booked or the reason it was not.
+
+    Rows carry create_reservation's fields and pass the same checks. The batch
+    holds every lock and one store transaction, so each row's table search runs
+    straight against the slot bitmaps with no per-row locking and a SQLite
+    store commits once. Rows are independent: one failing does not undo others.
+    """
+    results: List[Optional[str]] = [None] * len(rows)
+    accepted = []
+    for i, data in enumerate(rows):
+        try:
+            phone_number, name, date, time = data["phone_number"], data["name"], data["date"], data["time"]
+            party_size = int(data["party_size"])
+        except KeyError as e:
+            results[i] = f"Missing required field: {str(e)}"
+            continue
+        except (TypeError, ValueError):
+            results[i] = "Party size must be between 1 and 20 people."
+            continue
+        if not all(isinstance(value, str) for value in (phone_number, name, date, time)):
+            results[i] = "Name, phone number, date and time must be text."
+            continue
+        error = _new_reservation_error(phone_number, party_size, date, time)
+        if error is not None:
+            results[i] = error
+            continue
+        accepted.append((i, phone_number, name, party_size, date, time))
+    if not accepted:
+        return results
+
+    with _all_locks(), _deferred_changes(), _committing():
+        if reservations.changed_externally():
+            inventory.clear()
+        seen = set()
+        writes = []
+        with metrics.stage("conflict_check"):
+            for i, phone_number, name, party_size, date, time in accepted:
+                if phone_number in seen or phone_number in reservations:
+                    results[i] = "A reservation already exists for this phone number."
+                    continue
+                table_id = inventory.allocate(date, _minute_of_day(time), party_size)
+                if table_id is None:
+                    results[i] = "This time slot is already booked. Please choose a different time."
+                    continue
+                seen.add(phone_number)
+                _save_undo(phone_number)
+                writes.append((phone_number, {"name": name, "party_size": party_size, "date": date,
+                                              "time": time, "table": table_id}))
+        with metrics.stage("storage"):
+            reservations.update(writes)
+        for phone_number, record in writes:
+            _publish(CREATED, phone_number, record)
+    return results
+
+def remove_past(before: Tuple[str, str], limit: int, archive: Callable[[List[dict]], None]) -> int:
+    """
+    Remove up to limit reservations starting before (date, time), oldest first, and return how many.
+
+    They are found through the store's date-ordered scan and passed to archive as
+    rows (with phone_number) before being deleted, so if archive raises nothing
+    is removed. Only their phone numbers and dates are locked, so other calls
+    wait for one batch at most.
+    """
+    found = [(phone_number, reservation)
+             for phone_number, reservation in reservations.scan(("", "", ""), before[0], limit)
+             if (reservation["date"], reservation["time"]) < before]
+    if not found:
+        return 0
+    dates = {reservation["date"] for _, reservation in found}
+    with _striped(_phone_locks, [phone_number for phone_number, _ in found]), _store_transaction(*dates):
+        rows = []
+        for phone_number, seen in found:
+            current = reservations.get(phone_number)
+            # Skip bookings cancelled, moved or archived by another worker since the scan
+            if current is not None and (current["date"], current["time"]) == (seen["date"], seen["time"]):
+                rows.append({"phone_number": phone_number, **current})
+        if rows:
+            archive(rows)
+            for row in rows:
+                del reservations[row["phone_number"]]
+        # Past days are not booked again; their tables are reloaded from the store if a day is used
+        for date in dates:
+            inventory.forget(date)
+    return len(rows)
+
+# Page sizes for list_reservations
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+ListingKey = Tuple[str, str, str]
+
+def _encode_cursor(key: ListingKey) -> str:
+    return base64.urlsafe_b64encode("|".join(key).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> ListingKey:
+    try:
+        date, time, phone_number = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split("|")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor.") from None
+    return date, time, phone_number
+
+def _listing_query(from_date: Optional[str], to_date: Optional[str], min_party_size: Optional[int],
+                   max_party_size: Optional[int], cursor: Optional[str]) -> Tuple[ListingKey, Optional[str], int, Optional[int]]:
+    for date in (from_date, to_date):
+        if date is not None and not validation.is_valid_date(date):
+            raise ValueError("Invalid date filter. Use YYYY-MM-DD.")
+    low = 1 if min_party_size is None else int(min_party_size)
+    high = None if max_party_size is None else int(max_party_size)
+    if low < 1 or (high is not None and high < low):
+        raise ValueError("Invalid party size filter.")
+    after = (from_date or "", "", "")
+    if cursor:
+        # Resume after the cursor, but never before the requested start date
+        after = max(after, _decode_cursor(cursor))
+    return after, to_date, low, high
+
+def _listing(phone_number: str, reservation) -> dict:
+    return {"phone_number": phone_number, **reservation.to_dict()}
+
+def list_reservations(from_date: Optional[str] = None, to_date: Optional[str] = None,
+                      min_party_size: Optional[int] = None, max_party_size: Optional[int] = None,
+                      cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of reservations in date and time order, and the cursor of the next page (None on the last).
+
+    Dates are inclusive. Raises ValueError with a user-facing message for bad filters or cursors.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Invalid limit. Use 1 to {MAX_PAGE_SIZE}.")
+    after, until, low, high = _listing_query(from_date, to_date, min_party_size, max_party_size, cursor)
+    # One extra row tells us whether there is a next page
+    rows = reservations.scan(after, until, limit + 1, low, high)
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        phone_number, last = page[-1]
+        next_cursor = _encode_cursor((last["date"], last["time"], phone_number))
+    return [_listing(phone_number, reservation) for phone_number, reservation in page], next_cursor
+
+def iter_reservations(from_date: Optional[str] = None, to_date: Optional[str] = None,
+                      min_party_size: Optional[int] = None, max_party_size: Optional[int] = None,
+                      cursor: Optional[str] = None, chunk_size: int = MAX_PAGE_SIZE) -> Iterator[dict]:
+    """
+    Every matching reservation, read from the store chunk_size rows at a time.
+
+    Filters are checked before this returns, so a ValueError is raised here rather
+    than from the first next().
+    """
+    after, until, low, high = _listing_query(from_date, to_date, min_party_size, max_party_size, cursor)
+
+    def generate(after: ListingKey) -> Iterator[dict]:
+        while True:
+            rows = reservations.scan(after, until, chunk_size, low, high)
+            for phone_number, reservation in rows:
+                yield _listing(phone_number, reservation)
+            if len(rows) < chunk_size:
+                return
+            phone_number, last = rows[-1]
+            after = (last["date"], last["time"], phone_number)
+
+    return generate(after)
+
+def listing_cursor(row: Mapping) -> str:
+    """Cursor that resumes a listing after row, one of list_reservations' dicts."""
+    return _encode_cursor((row["date"], row["time"], row["phone_number"]))
+
+def _whole_number(data: dict, name: str, default: int) -> int:
+    """data[name] as an int, or default when it is absent; ValueError unless it is a whole number."""
+    value = data.get(name)
+    if value is None:
+        return default
+    # An explicit 0 is kept, so the callee can refuse it rather than it quietly becoming the default
+    if isinstance(value, bool) or not str(value).isdecimal():
+        raise ValueError(f"Invalid {name.replace('_', ' ')}. Use a whole number.")
+    return int(value)
+
+def list_reservations_response(data: dict,
+                               lister: Optional[Callable[..., Tuple[List[dict], Optional[str]]]] = None) -> str:
+    """Spoken listing of one page; lister stands in for list_reservations, e.g. to gather from several stores."""
+    try:
+        from_date = data.get("date") or data.get("from_date")
+        to_date = data.get("date") or data.get("to_date")
+        party_size = data.get("party_size")
+        page, next_cursor = (lister or list_reservations)(
+            from_date, to_date,
+            min_party_size=party_size if party_size is not None else data.get("min_party_size"),
+            max_party_size=party_size if party_size is not None else data.get("max_party_size"),
+            cursor=data.get("cursor"),
+            limit=_whole_number(data, "limit", 10)
+        )
+        if not page:
+            return "No reservations found for those filters."
+        # Phone numbers stay out of spoken listings
+        entries = "; ".join(f"{r['name']} for {r['party_size']} people on {r['date']} at {r['time']}" for r in page)
+        message = f"Reservations found: {entries}."
+        if next_cursor:
+            message += f" More reservations are available; pass cursor {next_cursor} to continue."
+        return message
+
+    except ValueError as e:
+        return str(e)
+    except Exception as e:
+        return f"Error listing reservations: {str(e)}"
+
+def find_available_slots(date: str, party_size: int, preferred_time: Optional[str] = None,
+                         window_minutes: int = SUGGESTION_WINDOW_MINUTES, count: int = DEFAULT_SUGGESTIONS) -> List[str]:
+    """
+    Up to count open start times ("HH:MM") on date for the party, nearest to preferred_time first.
+
+    Only times within window_minutes of preferred_time (or of opening, if not
+    given) that create_reservation would accept are returned. Raises ValueError
+    with a user-facing message for bad input.
+    """
+    if not validation.is_valid_date(date):
+        raise ValueError("Invalid date. Use YYYY-MM-DD.")
+    if preferred_time is not None and validation.parse_slot(date, preferred_time) is None:
+        raise ValueError("Invalid time. Use HH:MM.")
+    if not validate_party_size(party_size):
+        raise ValueError("Party size must be between 1 and 20 people.")
+    if window_minutes < 0 or count < 1:
+        raise ValueError("Invalid search window or count.")
+    if party_size > inventory.max_seats:
+        return []
+    preferred_minute = _minute_of_day(preferred_time) if preferred_time is not None else None
+    # The date lock keeps allocations out while the day's bitmap is read
+    with _store_transaction(date):
+        return _open_slots(date, party_size, preferred_minute, window_minutes, count)
+
+def find_available_slots_response(data: dict) -> str:
+    try:
+        date = data["date"]
+        party_size = int(data["party_size"])
+        preferred_time = data.get("preferred_time")
+        window_minutes = _whole_number(data, "window_minutes", SUGGESTION_WINDOW_MINUTES)
+        slots = find_available_slots(date, party_size, preferred_time, window_minutes,
+                                     _whole_number(data, "count", DEFAULT_SUGGESTIONS))
+        if not slots:
+            near = f" within {window_minutes} minutes of {preferred_time}" if preferred_time else ""
+            return f"No available times on {date} for a party of {party_size}{near}."
+        return f"Available times on {date} for a party of {party_size}: {', '.join(slots)}."
+
+    except KeyError as e:
+        return f"Missing required field: {str(e)}"
+    except ValueError as e:
+        return str(e)
+    except Exception as e:
+        return f"Error finding available times: {str(e)}"
@@ -71,7 +71,7 @@ export SIGNALWIRE_SPACE="test_space"
 
 # Run tests, generate standard html report, and capture output to log file
 echo "Running tests..."
-"$VENV_PYTHON" -m pytest -v tests/test_reservation_system.py tests/test_swaig_simulation.py --html=test_report.html --self-contained-html > test_run.log 2>&1
+"$VENV_PYTHON" -m pytest -v tests/test_reservation_system.py tests/test_swaig_simulation.py tests/test_reservation_core.py tests/test_swaig_logging.py tests/test_validation.py tests/test_dashboard.py tests/test_records.py tests/test_journal.py tests/test_async_server.py tests/test_metrics.py tests/test_swaig_handler.py tests/test_idempotency.py tests/test_bulk.py tests/test_sharding.py tests/test_app_factory.py tests/test_archive.py tests/test_waitlist.py tests/test_changefeed.py --html=test_report.html --self-contained-html > test_run.log 2>&1
 
 # Capture the exit code of the pytest command
 TEST_EXIT_CODE=$?
@@ -0,0 +1,318 @@
+"""
+Reservations partitioned by location and date across worker processes.
+
+Each location gets `shards` worker processes. Every (location, date) pair
+belongs to one of them, picked by a stable hash. A worker runs the ordinary
+reservation_system over its own store and table inventory, so a day's
+conflict checks never leave the process that owns it, and workers never
+contend with each other. The router in the calling process sends each call to
+the owning worker over a pipe and waits for the reply. Throughput therefore
+grows with cores as long as callers are concurrent (threads in the web
+server or the async server's pool).
+
+Calls name their location with a 'location' argument; without one, they go to
+the first configured location. Each phone number still has at most one
+booking per location. The router keeps a directory of which worker holds each
+number, so get, update, cancel and move go straight to it. An update or move
+to a date owned by another worker is carried across: the new worker adopts the
+booking and applies the change, and only then does the old worker cancel its
+copy. The two steps are separate transactions; if the cancel fails, the
+adopted copy is canceled again and the call reports an error, but a crash
+between them can leave the booking on both workers. Listings are gathered
+from every worker of the location and merged.
+
+Only the functions in _HANDLERS and list_reservations run on the workers:
+waitlist and standing-reservation calls are refused, and the router process's
+own reservation_system (its change feed, dashboard and HTTP routes) sees none
+of the sharded bookings.
+
+    pool = ShardedReservations(4, parse_locations("downtown=2:6,4:8;uptown=2:4")).start()
+    pool.call("create_reservation", {..., "location": "uptown"})
+"""
+import heapq
+import multiprocessing
+import os
+import threading
+import zlib
+from functools import partial
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import archive
+import reservation_system
+from inventory import default_tables, tables_from_spec
+from storage import store_from_url
+from swaig_registry import RegisteredFunction
+
+DEFAULT_LOCATION = "default"
+# Seconds a worker gets to exit after being asked to stop
+STOP_TIMEOUT = 5.0
+_LOCK_STRIPES = 256
+
+# SWAIG function -> handler, as run inside the owning worker
+_HANDLERS: Dict[str, Callable[[dict], str]] = {
+    "create_reservation": reservation_system.create_reservation_response,
+    "get_reservation": reservation_system.get_reservation_response,
+    "update_reservation": lambda data: reservation_system.update_reservation_response(
+        reservation_system.fill_update(data)),
+    "cancel_reservation": reservation_system.cancel_reservation_response,
+    "move_reservation": reservation_system.move_reservation_response,
+    "find_available_slots": reservation_system.find_available_slots_response
+}
+
+def parse_locations(spec: str) -> Dict[str, Optional[str]]:
+    """
+    Locations and their table specs from 'name=seats:count,...;name...'.
+
+    A location without '=spec' uses the default tables (RESTAURANT_TABLES).
+    """
+    locations: Dict[str, Optional[str]] = {}
+    for part in spec.split(";"):
+        name, _, tables = part.strip().partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        if not all(c.isalnum() or c in "-_" for c in name):
+            raise ValueError(f"Invalid location name: '{name}'")
+        locations[name] = tables.strip() or None
+    if not locations:
+        raise ValueError("No locations given")
+    return locations
+
+def _ok(reply: str) -> bool:
+    return reservation_system.response_category(reply) == "ok"
+
+# Operations a worker runs on request; each worker handles one request at a time
+
+def _call(function: str, data: dict) -> str:
+    return _HANDLERS[function](data)
+
+def _adopt(phone_number: str, record: dict, function: str, data: dict) -> str:
+    """Take over a booking from another worker and apply function to it; nothing is kept unless it succeeds."""
+    # Its table belongs to the other worker's floor, so only the new slot is allocated here
+    reservation_system.reservations[phone_number] = dict(record, table=None)
+    reply = _HANDLERS[function](data)
+    if not _ok(reply):
+        del reservation_system.reservations[phone_number]
+    return reply
+
+def _record(phone_number: str) -> Optional[dict]:
+    reservation = reservation_system.reservations.get(phone_number)
+    return reservation.to_dict() if reservation is not None else None
+
+def _phones() -> List[Tuple[str, str]]:
+    return [(row["phone_number"], row["date"]) for row in reservation_system.iter_reservations()]
+
+def _clear() -> None:
+    reservation_system.reservations.clear()
+    reservation_system.rebuild_inventory()
+
+_OPERATIONS: Dict[str, Callable[..., Any]] = {
+    "call": _call,
+    "adopt": _adopt,
+    "record": _record,
+    "list": reservation_system.list_reservations,
+    "phones": _phones,
+    "clear": _clear
+}
+
+def _serve(conn, table_spec: Optional[str], store_url: Optional[str]) -> None:
+    """Worker process main loop: run requests from conn until it closes or sends None."""
+    reservation_system.configure_store(store_from_url(store_url))
+    reservation_system.configure_inventory(tables_from_spec(table_spec) if table_spec else default_tables())
+    archiver = archive.start_from_env()
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            operation, args, kwargs = message
+            try:
+                conn.send((True, _OPERATIONS[operation](*args, **kwargs)))
+            except Exception as e:
+                conn.send((False, e))
+    finally:
+        if archiver is not None:
+            archiver.stop()
+        reservation_system.reservations.close()
+
+class _Worker:
+    """Router-side handle of one worker process; one request is in flight on its pipe at a time."""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def request(self, operation: str, *args, **kwargs) -> Any:
+        with self.lock:
+            self.conn.send((operation, args, kwargs))
+            ok, result = self.conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def stop(self) -> None:
+        with self.lock:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+class ShardedReservations:
+    """Routes reservation calls to the worker process owning each (location, date)."""
+
+    def __init__(self, shards: int = 1, locations: Optional[Mapping[str, Optional[str]]] = None,
+                 store_dir: Optional[str] = None, start_method: Optional[str] = None):
+        """
+        shards worker processes per location; locations maps names to table specs.
+
+        With store_dir, worker i of a location keeps its bookings in
+        store_dir/<location>-<i>.db and they are reloaded on start; the shard
+        count must then stay the same between runs. Without it, workers keep
+        bookings in memory.
+        """
+        if shards < 1:
+            raise ValueError("Need at least one shard")
+        self.shards = shards
+        self.locations = dict(locations) if locations else {DEFAULT_LOCATION: None}
+        self.default_location = next(iter(self.locations))
+        self.store_dir = store_dir
+        self._context = multiprocessing.get_context(start_method)
+        self._workers: Dict[str, List[_Worker]] = {}
+        # (location, phone number) -> index of the worker holding its booking
+        self._directory: Dict[Tuple[str, str], int] = {}
+        self._phone_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+    def __enter__(self) -> "ShardedReservations":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def shard_for(self, location: str, date: str) -> int:
+        """Index of the worker that owns a location's date."""
+        return zlib.crc32(f"{location}|{date}".encode()) % self.shards
+
+    def start(self) -> "ShardedReservations":
+        for location, table_spec in self.locations.items():
+            workers = self._workers[location] = []
+            for index in range(self.shards):
+                store_url = os.path.join(self.store_dir, f"{location}-{index}.db") if self.store_dir else None
+                parent, child = self._context.Pipe()
+                process = self._context.Process(target=_serve, args=(child, table_spec, store_url),
+                                                name=f"shard-{location}-{index}", daemon=True)
+                process.start()
+                child.close()
+                workers.append(_Worker(process, parent))
+        # Rebuild the directory from bookings the workers loaded from disk
+        for location, workers in self._workers.items():
+            for index, worker in enumerate(workers):
+                for phone_number, date in worker.request("phones"):
+                    if self.shard_for(location, date) != index:
+                        self.close()
+                        raise ValueError(f"Store {location}-{index} holds bookings for {date}, which another shard "
+                                         f"owns; it was written with a different shard count")
+                    self._directory[(location, phone_number)] = index
+        return self
+
+    def close(self) -> None:
+        for workers in self._workers.values():
+            for worker in workers:
+                worker.stop()
+        self._workers.clear()
+        self._directory.clear()
+
+    def clear(self) -> None:
+        """Delete every booking in every worker."""
+        for workers in self._workers.values():
+            for worker in workers:
+                worker.request("clear")
+        self._directory.clear()
+
+    def registry(self, declared: Mapping[str, RegisteredFunction]) -> Dict[str, RegisteredFunction]:
+        """A SWAIG dispatch table with declared's argument checks whose functions run on the workers."""
+        return {name: RegisteredFunction(name, partial(self._run, name), entry.validate)
+                for name, entry in declared.items()}
+
+    def _run(self, function: str, **arguments) -> str:
+        return self.call(function, arguments)
+
+    def call(self, function: str, data: Mapping[str, Any]) -> str:
+        """Run a SWAIG function (create_reservation, list_reservations, ...) and return its reply."""
+        data = dict(data)
+        location = data.pop("location", None) or self.default_location
+        workers = self._workers.get(location)
+        if workers is None:
+            return f"Unknown location '{location}'."
+        if function == "list_reservations":
+            return reservation_system.list_reservations_response(data, lister=partial(self.list_reservations,
+                                                                                      location))
+        if function not in _HANDLERS:
+            raise ValueError(f"Function '{function}' is not available on sharded reservations")
+        if function == "find_available_slots":
+            return workers[self.shard_for(location, str(data.get("date")))].request("call", function, data)
+
+        phone_number = data.get("phone_number")
+        key = (location, phone_number)
+        with self._phone_locks[hash(key) % _LOCK_STRIPES]:
+            owner = self._directory.get(key) if isinstance(phone_number, str) else None
+            if function == "create_reservation":
+                # A number that already has a booking goes to its worker, which turns it away
+                index = owner if owner is not None else self.shard_for(location, str(data.get("date")))
+                reply = workers[index].request("call", function, data)
+                if owner is None and _ok(reply):
+                    self._directory[key] = index
+                return reply
+            if owner is None:
+                # Any worker gives the same validation or "No reservation found" reply
+                return workers[0].request("call", function, data)
+
+            new_date = data.get("new_date" if function == "move_reservation" else "date")
+            target = owner
+            if function in ("update_reservation", "move_reservation") and new_date:
+                target = self.shard_for(location, str(new_date))
+            if target == owner:
+                reply = workers[owner].request("call", function, data)
+                if function == "cancel_reservation" and _ok(reply):
+                    del self._directory[key]
+                return reply
+
+            record = workers[owner].request("record", phone_number)
+            reply = workers[target].request("adopt", phone_number, record, function, data)
+            if not _ok(reply):
+                return reply
+            try:
+                released = workers[owner].request("call", "cancel_reservation", {"phone_number": phone_number})
+            except Exception as e:
+                released = str(e)
+            if not _ok(released):
+                # The two workers commit separately, so undo the adoption and keep the booking where it was
+                workers[target].request("call", "cancel_reservation", {"phone_number": phone_number})
+                action = "moving" if function == "move_reservation" else "updating"
+                return f"Error {action} reservation: {released}"
+            self._directory[key] = target
+            return reply
+
+    def list_reservations(self, location: str, from_date: Optional[str] = None, to_date: Optional[str] = None,
+                          min_party_size: Optional[int] = None, max_party_size: Optional[int] = None,
+                          cursor: Optional[str] = None,
+                          limit: int = reservation_system.DEFAULT_PAGE_SIZE) -> Tuple[List[dict], Optional[str]]:
+        """reservation_system.list_reservations over every worker of a location, merged in date and time order."""
+        workers = self._workers[location]
+        if from_date is not None and from_date == to_date:
+            workers = [workers[self.shard_for(location, from_date)]]
+        pages = [worker.request("list", from_date, to_date, min_party_size=min_party_size,
+                                max_party_size=max_party_size, cursor=cursor, limit=limit) for worker in workers]
+        rows = list(heapq.merge(*(page for page, _ in pages),
+                                key=lambda row: (row["date"], row["time"], row["phone_number"])))
+        page = rows[:limit]
+        more = len(rows) > limit or any(next_cursor for _, next_cursor in pages)
+        return page, reservation_system.listing_cursor(page[-1]) if more and page else None
@@ -0,0 +1,115 @@
+"""
+Standing weekly reservations.
+
+A standing reservation holds a table for the same party every week, on the
+weekday of its first date and at the same time. Its occurrences are never
+stored. The first time the table inventory loads a date, the rules for that
+weekday claim their tables on it, after the date's ordinary bookings (see
+reservation_system._load_day). A rule therefore costs nothing on dates nobody
+asks about, yet no booking can take its table on a date it covers.
+
+Rules are kept in memory and, with STANDING_RESERVATIONS_FILE set, saved to
+that JSON file after every change and loaded at start-up.
+"""
+import json
+import os
+import threading
+from datetime import date as Date
+from typing import Dict, List, Optional, Set
+
+class StandingReservation:
+    """One weekly rule, plus the tables it holds on the dates loaded so far."""
+
+    __slots__ = ("phone_number", "name", "party_size", "first_date", "time", "weekday", "skipped", "tables")
+
+    def __init__(self, phone_number: str, name: str, party_size: int, first_date: str, time: str,
+                 skipped: Optional[Set[str]] = None):
+        self.phone_number = phone_number
+        self.name = name
+        self.party_size = party_size
+        self.first_date = first_date
+        self.time = time
+        self.weekday = Date.fromisoformat(first_date).weekday()
+        # Occurrences called off one by one
+        self.skipped: Set[str] = set(skipped or ())
+        # date -> table held on it (None if a booking already had the last table); only for loaded dates
+        self.tables: Dict[str, Optional[str]] = {}
+
+    def occurs_on(self, date: str) -> bool:
+        return date >= self.first_date and date not in self.skipped and \
+            Date.fromisoformat(date).weekday() == self.weekday
+
+    def to_dict(self) -> dict:
+        return {"phone_number": self.phone_number, "name": self.name, "party_size": self.party_size,
+                "first_date": self.first_date, "time": self.time, "skipped": sorted(self.skipped)}
+
+class StandingBook:
+    """The standing reservations, one per phone number, indexed by weekday."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._rules: Dict[str, StandingReservation] = {}
+        self._by_weekday: List[Dict[str, StandingReservation]] = [{} for _ in range(7)]
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for row in json.load(f):
+                    self._index(StandingReservation(**row))
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def get(self, phone_number: str) -> Optional[StandingReservation]:
+        return self._rules.get(phone_number)
+
+    def _index(self, rule: StandingReservation) -> None:
+        self._rules[rule.phone_number] = rule
+        self._by_weekday[rule.weekday][rule.phone_number] = rule
+
+    def on_date(self, date: str) -> List[StandingReservation]:
+        """Rules with an occurrence on date."""
+        rules = self._by_weekday[Date.fromisoformat(date).weekday()]
+        return [rule for rule in list(rules.values()) if rule.occurs_on(date)]
+
+    def add(self, rule: StandingReservation) -> None:
+        with self._lock:
+            self._index(rule)
+            self._save()
+
+    def remove(self, phone_number: str) -> Optional[StandingReservation]:
+        with self._lock:
+            rule = self._rules.pop(phone_number, None)
+            if rule is not None:
+                del self._by_weekday[rule.weekday][phone_number]
+                self._save()
+            return rule
+
+    def skip(self, rule: StandingReservation, date: str) -> None:
+        with self._lock:
+            rule.skipped.add(date)
+            self._save()
+
+    def drop_before(self, date: str) -> None:
+        """Forget tables held and occurrences skipped on dates before date."""
+        with self._lock:
+            for rule in self._rules.values():
+                rule.tables = {day: table for day, table in rule.tables.items() if day >= date}
+                rule.skipped = {day for day in rule.skipped if day >= date}
+            self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rules.clear()
+            for rules in self._by_weekday:
+                rules.clear()
+            self._save()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump([rule.to_dict() for rule in self._rules.values()], f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
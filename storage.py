@@ -0,0 +1,385 @@
+"""
+Storage backends for reservations.
+
+A store behaves like a mapping of phone number -> reservation, plus a couple
+of indexed queries the reservation logic needs. Reservations may be written
+as dicts; they are read back as records.Reservation, which supports the same
+key lookups. MemoryStore keeps everything in-process; SQLiteStore persists to
+a WAL-mode database that can be shared by several gunicorn workers.
+"""
+import os
+import sqlite3
+import threading
+import uuid
+from bisect import bisect_left, insort
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+from records import Reservation, start_minute
+
+Listener = Callable[[Optional[str]], None]
+
+class ReservationStore(MutableMapping, ABC):
+    """Mapping of phone number -> Reservation with date/time lookups."""
+
+    # True if other processes can write the same data, so listeners do not see every change
+    shared = False
+    _listeners: Tuple[Listener, ...] = ()
+
+    def add_listener(self, listener: Listener) -> None:
+        """Call listener(phone_number) after each write made in this process, and listener(None) after clear()."""
+        self._listeners = self._listeners + (listener,)
+
+    def remove_listener(self, listener: Listener) -> None:
+        self._listeners = tuple(known for known in self._listeners if known is not listener)
+
+    def _notify(self, phone_number: Optional[str]) -> None:
+        for listener in self._listeners:
+            listener(phone_number)
+
+    @abstractmethod
+    def phones_at(self, date: str, time: str) -> List[str]:
+        """Phone numbers holding a reservation at exactly this date and time."""
+
+    @abstractmethod
+    def on_date(self, date: str) -> List[Tuple[str, Reservation]]:
+        """All (phone number, reservation) pairs for one date."""
+
+    def transaction(self):
+        """Context manager making a read-check-write sequence atomic in the store."""
+        return nullcontext()
+
+    def changed_externally(self) -> bool:
+        """True if another process or connection wrote since the last call."""
+        return False
+
+    @abstractmethod
+    def scan(self, after: Tuple[str, str, str], until_date: Optional[str] = None, limit: int = 100,
+             min_party_size: int = 1, max_party_size: Optional[int] = None) -> List[Tuple[str, Reservation]]:
+        """
+        Up to limit (phone number, reservation) pairs in (date, time, phone number) order.
+
+        Only keys strictly greater than after, on or before until_date, and with a
+        party size in [min_party_size, max_party_size] are returned.
+        """
+
+    @abstractmethod
+    def revision(self) -> str:
+        """Opaque token that changes whenever any reservation is written or deleted."""
+
+    def close(self) -> None:
+        pass
+
+class MemoryStore(ReservationStore):
+    """In-process store: a dict plus (date, time) and per-date indexes, with the dates kept sorted."""
+
+    def __init__(self):
+        self.data: Dict[str, Reservation] = {}
+        self._slots: Dict[Tuple[str, str], Set[str]] = {}
+        self._dates: Dict[str, Set[str]] = {}
+        # Dates that have bookings, sorted, so a date range is found by bisection
+        self._date_order: List[str] = []
+        # Unique per instance so revisions of two stores never compare equal
+        self._token = uuid.uuid4().hex[:12]
+        self._writes = 0
+
+    def _index_day(self, date: str) -> None:
+        """Called before a date's index entries are read or changed; for stores that build them lazily."""
+
+    def _index_add(self, phone_number: str, reservation: Reservation) -> None:
+        # Each lookup formats the date from the record's start, so it is done once
+        date = reservation["date"]
+        self._index_day(date)
+        if date not in self._dates:
+            insort(self._date_order, date)
+        self._slots.setdefault((date, reservation["time"]), set()).add(phone_number)
+        self._dates.setdefault(date, set()).add(phone_number)
+
+    def _index_remove(self, phone_number: str, reservation: Reservation) -> None:
+        date = reservation["date"]
+        self._index_day(date)
+        for index, key in ((self._slots, (date, reservation["time"])), (self._dates, date)):
+            holders = index.get(key)
+            if holders is not None:
+                holders.discard(phone_number)
+                if not holders:
+                    del index[key]
+                    if index is self._dates:
+                        del self._date_order[bisect_left(self._date_order, key)]
+
+    def __getitem__(self, phone_number: str) -> Reservation:
+        return self.data[phone_number]
+
+    def __setitem__(self, phone_number: str, reservation: Mapping) -> None:
+        reservation = Reservation.from_dict(reservation)
+        previous = self.data.get(phone_number)
+        if previous is not None:
+            self._index_remove(phone_number, previous)
+        self.data[phone_number] = reservation
+        self._index_add(phone_number, reservation)
+        self._writes += 1
+        self._notify(phone_number)
+
+    def __delitem__(self, phone_number: str) -> None:
+        reservation = self.data.pop(phone_number)
+        self._index_remove(phone_number, reservation)
+        self._writes += 1
+        self._notify(phone_number)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __contains__(self, phone_number) -> bool:
+        return phone_number in self.data
+
+    def get(self, phone_number, default=None):
+        return self.data.get(phone_number, default)
+
+    # Snapshots, so callers can iterate while other threads write
+    def items(self):
+        return list(self.data.items())
+
+    def values(self):
+        return list(self.data.values())
+
+    def clear(self) -> None:
+        self.data.clear()
+        self._slots.clear()
+        self._dates.clear()
+        self._date_order.clear()
+        self._writes += 1
+        self._notify(None)
+
+    def revision(self) -> str:
+        return f"{self._token}.{self._writes}"
+
+    def phones_at(self, date: str, time: str) -> List[str]:
+        self._index_day(date)
+        return list(self._slots.get((date, time), ()))
+
+    def on_date(self, date: str) -> List[Tuple[str, Reservation]]:
+        self._index_day(date)
+        return [(phone, self.data[phone]) for phone in self._dates.get(date, ())]
+
+    def scan(self, after: Tuple[str, str, str], until_date: Optional[str] = None, limit: int = 100,
+             min_party_size: int = 1, max_party_size: Optional[int] = None) -> List[Tuple[str, Reservation]]:
+        found: List[Tuple[str, Reservation]] = []
+        # Copy the dates from the start date on, since writers may insert into the list meanwhile
+        dates = self._date_order[bisect_left(self._date_order, after[0]):]
+        for date in dates:
+            if (until_date is not None and date > until_date) or len(found) >= limit:
+                break
+            day = []
+            self._index_day(date)
+            for phone in list(self._dates.get(date, ())):
+                reservation = self.data.get(phone)
+                if reservation is not None and reservation["date"] == date:
+                    day.append((reservation["time"], phone, reservation))
+            day.sort(key=lambda entry: entry[:2])
+            for time, phone, reservation in day:
+                if (date, time, phone) <= after:
+                    continue
+                if reservation["party_size"] < min_party_size or \
+                        (max_party_size is not None and reservation["party_size"] > max_party_size):
+                    continue
+                found.append((phone, reservation))
+                if len(found) >= limit:
+                    break
+        return found
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservations (
+    phone_number TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    party_size INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    table_id TEXT
+);
+CREATE INDEX IF NOT EXISTS reservations_order ON reservations (date, time, phone_number);
+CREATE TABLE IF NOT EXISTS reservations_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    token TEXT NOT NULL,
+    revision INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS reservations_insert AFTER INSERT ON reservations
+BEGIN UPDATE reservations_meta SET revision = revision + 1; END;
+CREATE TRIGGER IF NOT EXISTS reservations_update AFTER UPDATE ON reservations
+BEGIN UPDATE reservations_meta SET revision = revision + 1; END;
+CREATE TRIGGER IF NOT EXISTS reservations_delete AFTER DELETE ON reservations
+BEGIN UPDATE reservations_meta SET revision = revision + 1; END;
+"""
+
+# Fixed statement texts so sqlite3's per-connection statement cache reuses the prepared form
+_SELECT_ONE = "SELECT name, party_size, date, time, table_id FROM reservations WHERE phone_number = ?"
+_SELECT_ALL = "SELECT phone_number, name, party_size, date, time, table_id FROM reservations"
+_SELECT_DATE = _SELECT_ALL + " WHERE date = ?"
+_SELECT_SLOT = "SELECT phone_number FROM reservations WHERE date = ? AND time = ?"
+_UPSERT = ("INSERT OR REPLACE INTO reservations (phone_number, name, party_size, date, time, table_id) "
+           "VALUES (?, ?, ?, ?, ?, ?)")
+_DELETE = "DELETE FROM reservations WHERE phone_number = ?"
+_COUNT = "SELECT COUNT(*) FROM reservations"
+_EXISTS = "SELECT 1 FROM reservations WHERE phone_number = ?"
+# Keyset pagination over the (date, time, phone_number) index
+_SCAN = _SELECT_ALL + (" WHERE (date, time, phone_number) > (?, ?, ?) AND date <= ?"
+                       " AND party_size BETWEEN ? AND ? ORDER BY date, time, phone_number LIMIT ?")
+_INIT_META = "INSERT OR IGNORE INTO reservations_meta (id, token, revision) VALUES (1, ?, 0)"
+_REVISION = "SELECT token, revision FROM reservations_meta WHERE id = 1"
+
+def _row_to_reservation(row) -> Reservation:
+    name, party_size, date, time, table_id = row
+    return Reservation(name, party_size, start_minute(date, time), table_id)
+
+class SQLiteStore(ReservationStore):
+    """SQLite store in WAL mode with one connection per thread."""
+
+    shared = True
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        # The revision counter is kept by triggers, so writes from every process count
+        conn.execute(_INIT_META, (uuid.uuid4().hex[:12],))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transaction() issues BEGIN IMMEDIATE explicitly
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                   cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._connection()
+        if self._local.depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            try:
+                conn.execute("COMMIT")
+            except BaseException:
+                # A failed COMMIT (busy, disk error) leaves the transaction open and the write lock held
+                if conn.in_transaction:
+                    try:
+                        conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+                raise
+
+    def changed_externally(self) -> bool:
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = version != self._local.data_version
+        self._local.data_version = version
+        return changed
+
+    def __getitem__(self, phone_number: str) -> Reservation:
+        row = self._connection().execute(_SELECT_ONE, (phone_number,)).fetchone()
+        if row is None:
+            raise KeyError(phone_number)
+        return _row_to_reservation(row)
+
+    def __setitem__(self, phone_number: str, reservation: Mapping) -> None:
+        self._connection().execute(_UPSERT, (phone_number, reservation["name"], reservation["party_size"],
+                                             reservation["date"], reservation["time"], reservation.get("table")))
+        self._notify(phone_number)
+
+    def __delitem__(self, phone_number: str) -> None:
+        if self._connection().execute(_DELETE, (phone_number,)).rowcount == 0:
+            raise KeyError(phone_number)
+        self._notify(phone_number)
+
+    def __iter__(self) -> Iterator[str]:
+        return (row[0] for row in self._connection().execute("SELECT phone_number FROM reservations"))
+
+    def __len__(self) -> int:
+        return self._connection().execute(_COUNT).fetchone()[0]
+
+    def __contains__(self, phone_number) -> bool:
+        return self._connection().execute(_EXISTS, (phone_number,)).fetchone() is not None
+
+    def items(self) -> List[Tuple[str, Reservation]]:
+        return [(row[0], _row_to_reservation(row[1:])) for row in self._connection().execute(_SELECT_ALL)]
+
+    def values(self) -> List[Reservation]:
+        return [reservation for _, reservation in self.items()]
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM reservations")
+        self._notify(None)
+
+    def update(self, other=(), **kwargs) -> None:
+        """Write many reservations with one executemany in one transaction."""
+        items = list(other.items() if isinstance(other, Mapping) else other) + list(kwargs.items())
+        with self.transaction():
+            self._connection().executemany(_UPSERT, [
+                (phone_number, reservation["name"], reservation["party_size"], reservation["date"],
+                 reservation["time"], reservation.get("table")) for phone_number, reservation in items])
+        for phone_number, _ in items:
+            self._notify(phone_number)
+
+    def scan(self, after: Tuple[str, str, str], until_date: Optional[str] = None, limit: int = 100,
+             min_party_size: int = 1, max_party_size: Optional[int] = None) -> List[Tuple[str, Reservation]]:
+        # "\uffff" sorts after every date string, standing in for "no upper bound"
+        params = (*after, until_date or "\uffff", min_party_size,
+                  max_party_size if max_party_size is not None else 2 ** 31, limit)
+        return [(row[0], _row_to_reservation(row[1:])) for row in self._connection().execute(_SCAN, params)]
+
+    def revision(self) -> str:
+        token, revision = self._connection().execute(_REVISION).fetchone()
+        return f"{token}.{revision}"
+
+    def phones_at(self, date: str, time: str) -> List[str]:
+        return [row[0] for row in self._connection().execute(_SELECT_SLOT, (date, time))]
+
+    def on_date(self, date: str) -> List[Tuple[str, Reservation]]:
+        return [(row[0], _row_to_reservation(row[1:])) for row in self._connection().execute(_SELECT_DATE, (date,))]
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+def store_from_url(url: Optional[str]) -> ReservationStore:
+    """
+    Build a store from a RESERVATION_DB setting: empty for memory, journal:///dir for a
+    journaled in-memory store, otherwise a SQLite path.
+    """
+    if not url or url == ":memory:":
+        return MemoryStore()
+    if url.startswith("journal://"):
+        # Imported here because journal builds on MemoryStore
+        from journal import JournaledStore
+        return JournaledStore(url[len("journal://"):], sync=os.getenv("RESERVATION_JOURNAL_SYNC", "always"))
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteStore(url)
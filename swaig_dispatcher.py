@@ -0,0 +1,154 @@
+"""
+Framework-independent execution of SWAIG calls.
+
+Takes already-parsed request data and a registry from swaig_registry, and
+returns (response body, HTTP status) pairs that the web layer serialises.
+"""
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from signalwire_swaig.swaig import remove_none
+
+import idempotency
+import metrics
+import reservation_system
+import validation
+from swaig_handler import normalize_call
+from swaig_logging import debug_enabled, log_event
+from swaig_registry import RegisteredFunction
+
+# Upper bound on calls in one batch request
+MAX_BATCH_SIZE = 50
+
+Registry = Mapping[str, RegisteredFunction]
+
+def call_function(registry: Registry, function_name: str,
+                  arguments: Optional[Mapping[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    """Run one SWAIG function and return its response body and status."""
+    debug = debug_enabled()
+    if debug:
+        log_event(logging.DEBUG, "dispatch", function=function_name, arguments=arguments)
+    func = registry.get(function_name)
+    if not func:
+        log_event(logging.WARNING, "dispatch_function_not_found", function=function_name,
+                  available=sorted(registry))
+        metrics.swaig_unknown.inc()
+        return {"error": f"Function '{function_name}' not found"}, 404
+    start = time.perf_counter()
+    try:
+        with validation.request_clock():
+            result = func(arguments)
+        if debug:
+            log_event(logging.DEBUG, "dispatch_result", function=function_name, result=result)
+        body = result if isinstance(result, dict) else {"response": result}
+    except Exception as e:
+        log_event(logging.WARNING, "dispatch_exception", function=function_name, error=str(e))
+        body = {"response": f"Invalid arguments for function '{function_name}': {e}"}
+    if metrics.enabled:
+        _record_call(function_name, body, time.perf_counter() - start)
+    return body, 200
+
+def _record_call(function_name: str, body: Mapping[str, Any], elapsed: float) -> None:
+    metrics.swaig_calls.inc(function_name)
+    metrics.swaig_latency.observe(elapsed, function_name)
+    response = body.get("response")
+    if isinstance(response, str):
+        category = reservation_system.response_category(response)
+        if category != "ok":
+            metrics.swaig_errors.inc(function_name, category)
+
+def _succeeded(body: Mapping[str, Any], status: int) -> bool:
+    if status != 200 or "error" in body:
+        return False
+    response = body.get("response")
+    return not isinstance(response, str) or reservation_system.response_category(response) == "ok"
+
+def _cacheable(result: Tuple[Dict[str, Any], int]) -> bool:
+    """Only successful replies are replayed: a refused change may go through when retried after the slot frees."""
+    body, status = result
+    return _succeeded(body, status) and all(_succeeded(response, 200) for response in body.get("responses", ()))
+
+def _run_calls(registry: Registry, calls: List[Mapping[str, Any]], stop_on_failure: bool):
+    responses = []
+    for call in calls:
+        normalized = normalize_call(call) if isinstance(call, Mapping) else None
+        if normalized is None:
+            body, status = {"error": "Missing or invalid 'function' in batch entry"}, 400
+        else:
+            body, status = call_function(registry, normalized.function, normalized.arguments)
+        responses.append(body)
+        if stop_on_failure and not _succeeded(body, status):
+            return responses, False
+    return responses, True
+
+def run_batch(registry: Registry, calls: Any, transactional: bool = False) -> Tuple[Dict[str, Any], int]:
+    """
+    Run an ordered list of {function, arguments} calls in one request.
+
+    Without transactional, every call runs and reports its own result. With it,
+    the calls run all-or-nothing: the first failure rolls back the changes made
+    by earlier calls and the remaining calls are skipped.
+    """
+    if not isinstance(calls, list) or not calls:
+        return {"error": "'batch' must be a non-empty list"}, 400
+    if len(calls) > MAX_BATCH_SIZE:
+        return {"error": f"A batch can hold at most {MAX_BATCH_SIZE} calls"}, 400
+    # One clock sample for the whole batch
+    with validation.request_clock():
+        if not transactional:
+            responses, _ = _run_calls(registry, calls, stop_on_failure=False)
+            return {"responses": responses, "committed": True}, 200
+        with reservation_system.atomic() as block:
+            responses, ok = _run_calls(registry, calls, stop_on_failure=True)
+            if not ok:
+                block.rollback()
+        return {"responses": responses, "committed": ok}, 200
+
+def handle_payload(registry: Registry, data: Any, idempotency_key: Optional[str] = None) -> Tuple[Any, int]:
+    """
+    Run the single call or batch in a parsed POST /swaig body ('get_signature' is left to the web layer).
+
+    Requests that change reservations are replayed from idempotency.responses
+    when they repeat; idempotency_key (the Idempotency-Key header) overrides
+    the body's 'idempotency_key' field.
+    """
+    if not isinstance(data, Mapping):
+        return {"error": "Request body must be a JSON object"}, 400
+    transactional = bool(data.get('transactional'))
+    if 'batch' in data:
+        entries = data['batch'] if isinstance(data['batch'], list) else []
+        calls = [call for call in (normalize_call(entry) for entry in entries if isinstance(entry, Mapping))
+                 if call is not None]
+        compute = lambda: run_batch(registry, data['batch'], transactional)  # noqa: E731
+    else:
+        call = normalize_call(data)
+        if call is None:
+            return {"error": "Missing or invalid 'function' in request"}, 400
+        calls = [call]
+        compute = lambda: call_function(registry, call.function, call.arguments)  # noqa: E731
+
+    key = idempotency_key or data.get('idempotency_key')
+    identity = idempotency.identify(((call.function, call.arguments) for call in calls),
+                                    key if isinstance(key, str) else None, data.get('call_id'), transactional)
+    if identity is None:
+        return compute()
+    try:
+        result, replayed = idempotency.responses.run(identity, compute, cacheable=_cacheable)
+    except idempotency.KeyReuseError as e:
+        return {"error": str(e)}, 422
+    if replayed:
+        log_event(logging.INFO, "dispatch_replayed", key=identity.key)
+        metrics.swaig_replays.inc()
+    return result
+
+def function_signatures(functions: Mapping[str, Mapping[str, Any]], requested: Optional[List[str]],
+                        base_url: str) -> List[Dict[str, Any]]:
+    """SWAIG signatures of the requested functions (all if none are named), with their webhook URL."""
+    signatures = []
+    for name in requested or list(functions):
+        if name in functions:
+            entry = dict(functions[name])
+            entry["web_hook_url"] = f"{base_url}/swaig"
+            signatures.append(remove_none(entry))
+    return signatures
@@ -1,39 +1,72 @@
-from flask import request
+"""
+Normalization of POST /swaig bodies into call objects.
+
+The body is decoded once, with orjson when it is installed, and each call
+becomes a read-only SWAIGCall whose arguments and meta_data are views over
+the decoded dicts rather than copies. Dispatch takes the call as it is, so
+nothing is re-serialised and large meta_data blobs are never walked.
+"""
 import json
-import io
+import logging
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from swaig_logging import debug_enabled, log_event
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the standard library decoder is used without it
+    orjson = None
 
-def transform_swaig_request(request):
+# SWAIG_JSON_DECODER=json forces the standard library decoder
+_fast_loads = orjson.loads if orjson is not None and os.getenv("SWAIG_JSON_DECODER", "") != "json" else None
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+def decode_json(body: bytes) -> Any:
+    """Parse a request body; ValueError if it is not valid JSON."""
+    if _fast_loads is not None:
+        try:
+            return _fast_loads(body)
+        except ValueError:
+            # orjson rejects a few inputs json accepts (NaN, Infinity, lone surrogates); let json decide
+            pass
+    return json.loads(body)
+
+@dataclass(frozen=True)
+class SWAIGCall:
+    """One function call from a SWAIG request."""
+    function: str
+    # Read-only view of the call's arguments, or the raw value if it is not an object
+    arguments: Any
+    meta_data: Optional[Mapping[str, Any]] = None
+
+def _readonly(value: Any) -> Any:
+    return MappingProxyType(value) if isinstance(value, dict) else value
+
+def normalize_call(data: Mapping[str, Any]) -> Optional[SWAIGCall]:
     """
-    Transform incoming SWAIG requests to ensure proper argument structure for endpoint dispatch.
+    The call in a decoded request or batch entry, or None if it names no function
+    or names it with something other than a string.
+
+    Arguments come from 'arguments' or, in the shape SignalWire sends, from
+    'argument.parsed[0]'.
     """
-    if request.method == 'POST' and request.path == '/swaig':
-        try:
-            if request.is_json:
-                data = request.get_json(silent=True)
-                if data and 'function' in data:
-                    function_name = data['function']
-                    # Normalize to always have an 'arguments' key
-                    if 'arguments' in data:
-                        args = dict(data['arguments'])
-                    else:
-                        args = {k: v for k, v in data.items() if k not in ('function', 'argument', 'meta_data', 'meta_data_token')}
-                    new_data = {
-                        'function': function_name,
-                        'arguments': args
-                    }
-                    # Log the transformed payload
-                    with open('swaig_debug_payload.json', 'a') as f:
-                        f.write('NORMALIZED: ' + json.dumps(new_data) + '\n')
-                    # Update the request
-                    request._cached_json = {True: None, False: None}
-                    json_data = json.dumps(new_data)
-                    request.environ['wsgi.input'] = io.BytesIO(json_data.encode('utf-8'))
-                    request.environ['CONTENT_LENGTH'] = str(len(json_data))
-                    request.environ['CONTENT_TYPE'] = 'application/json'
-                    request._cached_json[True] = new_data
-                    request._cached_json[False] = new_data
-                    return True
-        except Exception as e:
-            with open('swaig_debug_payload.json', 'a') as f:
-                f.write(f'ERROR: {str(e)}\n')
-    return False 
\ No newline at end of file
+    function_name = data.get('function')
+    if not function_name or not isinstance(function_name, str):
+        return None
+    arguments = data.get('arguments')
+    if arguments is None:
+        argument = data.get('argument')
+        if isinstance(argument, Mapping) and argument.get('parsed'):
+            parsed = argument['parsed']
+            # 'parsed' is a list of argument objects; anything else stays wrapped so the registry
+            # rejects it rather than mistaking it for the arguments
+            arguments = parsed[0] if isinstance(parsed, (list, tuple)) else (parsed,)
+    call = SWAIGCall(function_name, _EMPTY if arguments is None else _readonly(arguments),
+                     _readonly(data.get('meta_data')))
+    if debug_enabled():
+        log_event(logging.DEBUG, "normalized", function=function_name, arguments=arguments)
+    return call
@@ -0,0 +1,196 @@
+"""
+Structured, level-gated logging for the SWAIG request path.
+
+Request threads only put records on a bounded in-memory queue. A background
+thread drains the queue in batches and appends them as JSON lines to a
+size-rotated file, so no request ever waits on disk. When the level is above
+DEBUG, debug calls return before building anything.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List, Optional
+
+# Relative to the working directory; set SWAIG_LOG_FILE to put it elsewhere
+DEFAULT_LOG_FILE = "swaig_debug_payload.jsonl"
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+DEFAULT_QUEUE_SIZE = 10000
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 0.5
+
+logger = logging.getLogger("swaig")
+# Keep request payloads out of the root logger that signalwire_swaig configures
+logger.propagate = False
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "event": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+class RotatingBatchWriter:
+    """Appends batches of lines to a file, rotating it once it passes max_bytes."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._stream = None
+
+    def _open(self):
+        if self._stream is None:
+            self._stream = open(self.path, "a", encoding="utf-8")
+        return self._stream
+
+    def _rotate(self) -> None:
+        self.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write(self, lines: List[str]) -> None:
+        """Write lines with one flush per file, rotating between lines when the size limit is hit."""
+        stream = self._open()
+        size = stream.tell()
+        pending: List[str] = []
+        for line in lines:
+            line += "\n"
+            if self.max_bytes and size and size + len(line) > self.max_bytes:
+                stream.write("".join(pending))
+                pending = []
+                self._rotate()
+                stream = self._open()
+                size = 0
+            pending.append(line)
+            size += len(line)
+        stream.write("".join(pending))
+        stream.flush()
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+class BatchingQueueHandler(logging.Handler):
+    """Queues records without blocking and writes them from a background thread."""
+
+    def __init__(self, writer: RotatingBatchWriter, maxsize: int = DEFAULT_QUEUE_SIZE):
+        super().__init__()
+        self.writer = writer
+        self.queue: "queue.Queue[Optional[logging.LogRecord]]" = queue.Queue(maxsize)
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.setFormatter(JsonLineFormatter())
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="swaig-log-writer", daemon=True)
+                    self._thread.start()
+
+    def _after_fork(self) -> None:
+        """In a forked child the writer thread is gone and the queue's locks may be held: start over."""
+        self.queue = queue.Queue(self.queue.maxsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging; count what we had to drop
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            try:
+                record = self.queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            batch = [record]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            lines = [self.format(r) for r in batch if r is not None]
+            if lines:
+                try:
+                    self.writer.write(lines)
+                except OSError:
+                    self.dropped += len(lines)
+            if stop:
+                return
+
+    def close(self) -> None:
+        """Flush everything queued so far and stop the writer thread."""
+        if self._thread is not None:
+            deadline = time.monotonic() + 5
+            while self._thread.is_alive() and time.monotonic() < deadline:
+                try:
+                    self.queue.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.writer.close()
+        super().close()
+
+_handler: Optional[BatchingQueueHandler] = None
+
+def configure_logging(level: Optional[str] = None, path: Optional[str] = None,
+                      max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT) -> None:
+    """Set the SWAIG log level and destination. Defaults come from SWAIG_LOG_LEVEL / SWAIG_LOG_FILE."""
+    global _handler
+    if level is None:
+        level = os.getenv("SWAIG_LOG_LEVEL") or ("DEBUG" if os.getenv("DEBUG") else "WARNING")
+    logger.setLevel(getattr(logging, level.upper(), logging.WARNING))
+    if _handler is not None:
+        logger.removeHandler(_handler)
+        _handler.close()
+    writer = RotatingBatchWriter(path or os.getenv("SWAIG_LOG_FILE", DEFAULT_LOG_FILE), max_bytes, backup_count)
+    _handler = BatchingQueueHandler(writer)
+    logger.addHandler(_handler)
+
+def shutdown_logging() -> None:
+    global _handler
+    if _handler is not None:
+        logger.removeHandler(_handler)
+        _handler.close()
+        _handler = None
+
+def debug_enabled() -> bool:
+    return logger.isEnabledFor(logging.DEBUG)
+
+def log_event(level: int, event: str, **fields) -> None:
+    """Log a structured event; fields become keys of the JSON line."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+def _after_fork() -> None:
+    if _handler is not None:
+        _handler._after_fork()
+
+atexit.register(shutdown_logging)
+# gunicorn --preload builds the app, and so configures logging, before forking its workers
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
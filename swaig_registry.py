@@ -0,0 +1,79 @@
+"""
+Dispatch table for SWAIG functions.
+
+Built once at startup from the functions declared with @swaig.endpoint. Each
+entry holds the undecorated callable and an argument validator compiled from
+its SWAIGArgument schema, so dispatching a call is a dict lookup plus argument
+coercion, and only declared functions can be called.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Mapping, Optional
+
+class ArgumentError(ValueError):
+    """Raised when call arguments do not match the function's declared schema."""
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError("booleans are not integers")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError("not a whole number")
+    return int(value)
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    raise ValueError("not a boolean")
+
+_COERCERS: Dict[str, Callable[[Any], Any]] = {
+    "integer": _to_int,
+    "number": float,
+    "boolean": _to_bool,
+    "string": str
+}
+
+def compile_validator(parameters: Mapping[str, Any]) -> Callable[[Mapping[str, Any]], Dict[str, Any]]:
+    """Turn a JSON-schema 'parameters' block into a function that checks and coerces arguments."""
+    required = tuple(parameters.get("required", ()))
+    coercions = tuple(
+        (name, schema["type"], _COERCERS[schema["type"]])
+        for name, schema in parameters.get("properties", {}).items()
+        if schema.get("type") in _COERCERS
+    )
+
+    def validate(arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        if not isinstance(arguments, Mapping):
+            raise ArgumentError("arguments must be an object")
+        missing = [name for name in required if name not in arguments]
+        if missing:
+            raise ArgumentError(f"missing required argument(s): {', '.join(missing)}")
+        # Undeclared arguments pass through to the function's **kwargs
+        coerced = dict(arguments)
+        for name, type_name, coerce in coercions:
+            value = coerced.get(name)
+            if value is not None:
+                try:
+                    coerced[name] = coerce(value)
+                except (TypeError, ValueError):
+                    raise ArgumentError(f"argument '{name}' must be of type {type_name}") from None
+        return coerced
+
+    return validate
+
+@dataclass(frozen=True)
+class RegisteredFunction:
+    name: str
+    func: Callable[..., Any]
+    validate: Callable[[Mapping[str, Any]], Dict[str, Any]]
+
+    def __call__(self, arguments: Optional[Mapping[str, Any]] = None) -> Any:
+        return self.func(**self.validate(arguments or {}))
+
+def build_registry(swaig) -> Dict[str, RegisteredFunction]:
+    """Map every function declared on a SWAIG instance to a prebound callable and validator."""
+    registry = {}
+    for name, func in swaig.function_objects.items():
+        parameters = swaig.functions[name].get("parameters", {})
+        registry[name] = RegisteredFunction(name, func, compile_validator(parameters))
+    return registry
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+import reservation_system
+import swaig_logging
+from inventory import default_tables, tables_from_spec
+from journal import JournaledStore
+from storage import MemoryStore, SQLiteStore
+
+# Basic auth for admin:secret, the credentials the test runs export
+AUTH = {"Authorization": "Basic YWRtaW46c2VjcmV0"}
+
+STORES = {
+    "memory": lambda tmp_path: MemoryStore(),
+    "sqlite": lambda tmp_path: SQLiteStore(str(tmp_path / "reservations.db")),
+    "journal": lambda tmp_path: JournaledStore(str(tmp_path / "journal"))
+}
+
+@pytest.fixture(scope="session", autouse=True)
+def swaig_log_file(tmp_path_factory):
+    """Keep SWAIG logs, including those of apps started in subprocesses, out of the working directory."""
+    path = str(tmp_path_factory.mktemp("logs") / swaig_logging.DEFAULT_LOG_FILE)
+    saved = os.environ.get("SWAIG_LOG_FILE")
+    os.environ["SWAIG_LOG_FILE"] = path
+    # The app may already have been built while the test modules were collected
+    swaig_logging.configure_logging()
+    yield path
+    swaig_logging.shutdown_logging()
+    if saved is None:
+        del os.environ["SWAIG_LOG_FILE"]
+    else:
+        os.environ["SWAIG_LOG_FILE"] = saved
+
+@pytest.fixture(params=sorted(STORES))
+def clean_store(request, tmp_path):
+    """
+    An empty store of each kind in turn, installed in reservation_system.
+
+    Modules opt in with `pytestmark = pytest.mark.usefixtures("clean_store")`.
+    """
+    saved = reservation_system.reservations
+    store = STORES[request.param](tmp_path)
+    reservation_system.configure_store(store)
+    # One two-top and one four-top keep capacity easy to reason about
+    reservation_system.configure_inventory(tables_from_spec("2:1,4:1"))
+    yield store
+    store.close()
+    reservation_system.configure_store(saved)
+    reservation_system.configure_inventory(default_tables())
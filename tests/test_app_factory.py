@@ -0,0 +1,69 @@
+import base64
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app_new
+from basic_auth import BasicAuth
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def basic(credentials: bytes, scheme: str = "Basic") -> str:
+    return f"{scheme} {base64.b64encode(credentials).decode()}"
+
+def test_basic_auth_accepts_only_the_configured_credentials():
+    auth = BasicAuth("admin", "secret")
+    assert auth.check("Basic YWRtaW46c2VjcmV0")
+    assert auth.check("basic   YWRtaW46c2VjcmV0 ")
+    # Same credentials, encoded without padding
+    assert BasicAuth("ab", "cd").check("Basic YWI6Y2Q")
+    assert BasicAuth("user", "pässword").check(basic("user:pässword".encode()))
+    for header in (None, "", "Basic", "Bearer YWRtaW46c2VjcmV0", basic(b"admin:wrong"), basic(b"root:secret"),
+                   basic(b"adminsecret"), basic(b"admin:secret:"), "Basic not*base64", "Basic ÿÿÿÿ"):
+        assert not auth.check(header), header
+
+def test_swaig_requires_credentials():
+    client = app_new.app.test_client()
+    for headers in ({}, {"Authorization": basic(b"admin:wrong")}):
+        response = client.post("/swaig", json={"function": "get_reservation", "arguments": {}}, headers=headers)
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"].startswith("Basic")
+
+def test_create_app_builds_independent_apps():
+    first, second = app_new.create_app(), app_new.create_app()
+    assert first is not second and first is not app_new.app
+    assert first.extensions["swaig_functions"] is not second.extensions["swaig_functions"]
+    assert sorted(first.extensions["swaig_functions"]) == sorted(app_new.swaig_functions)
+    response = first.test_client().post("/swaig", json={"action": "get_signature"},
+                                        headers={"Authorization": "Basic YWRtaW46c2VjcmV0"})
+    assert response.status_code == 200
+
+def test_create_app_checks_the_environment(monkeypatch):
+    monkeypatch.delenv("HTTP_PASSWORD")
+    with pytest.raises(EnvironmentError):
+        app_new.create_app()
+
+def test_import_has_no_side_effects():
+    env = {key: value for key, value in os.environ.items() if key not in ("HTTP_USERNAME", "HTTP_PASSWORD")}
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, app_new; print(app_new._app is None, 'dotenv' in sys.modules)"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert result.stdout == "True False\n"
+
+def test_building_the_app_leaves_the_reservation_modules_to_the_first_call():
+    code = ("import sys, app_new\n"
+            "loaded = lambda: sorted({'signalwire_swaig', 'reservation_system', 'storage', 'swaig_dispatcher'}"
+            " & set(sys.modules))\n"
+            "print(loaded())\n"
+            "app_new.app\n"
+            "print(loaded())\n"
+            "app_new.app.test_client().post('/swaig', json={'function': 'get_reservation', 'arguments': "
+            "{'phone_number': '+19185550100'}}, headers={'Authorization': 'Basic YWRtaW46c2VjcmV0'})\n"
+            "print(loaded())\n")
+    env = {key: value for key, value in os.environ.items() if key not in ("RESERVATION_DB", "RESERVATION_ARCHIVE")}
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.splitlines() == [
+        "[]", "['signalwire_swaig']", "['reservation_system', 'signalwire_swaig', 'storage', 'swaig_dispatcher']"]
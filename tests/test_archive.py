@@ -0,0 +1,81 @@
+import gzip
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import archive
+import reservation_system
+import validation
+
+pytestmark = pytest.mark.usefixtures("clean_store")
+
+def day(offset):
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+def book(phone_number, date, time="18:00", party_size=2):
+    # Written straight to the store, since past dates cannot be booked
+    reservation_system.reservations[phone_number] = {"name": "Guest", "party_size": party_size, "date": date,
+                                                     "time": time, "table": None}
+
+def test_past_bookings_move_to_the_archive_in_batches(tmp_path):
+    for i in range(5):
+        book(f"+1555000000{i}", day(-40 - i), time=f"{14 + i}:00")
+    future = day(3)
+    assert reservation_system.create_reservation_response({
+        "name": "Ann", "party_size": 4, "date": future, "time": "18:00",
+        "phone_number": "+15550000099"}) == "Reservation successfully created."
+
+    archiver = archive.Archiver(str(tmp_path / "archive"), after=timedelta(0), batch_size=2)
+    assert reservation_system.remove_past(("9999-12-31", "00:00"), 2, lambda rows: None) == 2
+    assert archiver.run_once() == 3
+    assert archiver.run_once() == 0
+    assert list(reservation_system.reservations) == ["+15550000099"]
+
+    rows = list(archive.read_archive(archiver.directory))
+    # The first two were removed by hand above, without archiving
+    assert sorted(row["phone_number"] for row in rows) == ["+15550000000", "+15550000001", "+15550000002"]
+    assert {row["date"] for row in rows} == {day(-40), day(-41), day(-42)}
+    assert all(name.endswith(".jsonl.gz") for name in os.listdir(archiver.directory))
+    assert list(archive.read_archive(archiver.directory, from_date=day(-40))) == \
+        [row for row in rows if row["date"] == day(-40)]
+    # The future day's tables are untouched
+    assert reservation_system.create_reservation_response({
+        "name": "Bo", "party_size": 4, "date": future, "time": "18:00",
+        "phone_number": "+15550000098"}).startswith("This time slot is already booked")
+
+def test_grace_period_keeps_recent_bookings(tmp_path, monkeypatch):
+    now = datetime(2030, 6, 1, 12, 0)
+    monkeypatch.setattr(validation, "clock", lambda: now)
+    book("+15550000001", "2030-05-30", "20:00")
+    book("+15550000002", "2030-05-31", "14:00")
+    book("+15550000003", "2030-05-31", "21:00")
+    archiver = archive.Archiver(str(tmp_path), after=timedelta(hours=18))
+    assert archiver.run_once() == 2
+    assert list(reservation_system.reservations) == ["+15550000003"]
+    assert [row["time"] for row in archive.read_archive(str(tmp_path))] == ["20:00", "14:00"]
+
+def test_failed_archive_write_keeps_the_bookings():
+    book("+15550000001", day(-10))
+
+    def fail(rows):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        reservation_system.remove_past(("9999-12-31", "00:00"), 10, fail)
+    assert "+15550000001" in reservation_system.reservations
+
+def test_background_archiver(tmp_path):
+    book("+15550000001", day(-10))
+    archiver = archive.Archiver(str(tmp_path), after=timedelta(0), interval=0.01).start()
+    try:
+        for _ in range(500):
+            if "+15550000001" not in reservation_system.reservations:
+                break
+            time.sleep(0.01)
+    finally:
+        archiver.stop()
+    assert "+15550000001" not in reservation_system.reservations
+    with gzip.open(archive.archive_path(str(tmp_path), day(-10)[:7]), "rt") as lines:
+        assert '"phone_number":"+15550000001"' in lines.read()
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import app_new
+import reservation_system
+from async_server import MAX_BODY_BYTES, SWAIGServer
+from conftest import AUTH
+
+def _request(method, path, body=None, headers=None):
+    """Raw request bytes; POST /swaig carries the credentials unless headers are given."""
+    if headers is None and method == "POST" and path == "/swaig":
+        headers = AUTH
+    payload = b"" if body is None else json.dumps(body).encode()
+    lines = [f"{method} {path} HTTP/1.1", "Host: test.local", f"Content-Length: {len(payload)}"]
+    if body is not None:
+        lines.append("Content-Type: application/json")
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + payload
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head[:-4].decode().split("\r\n")
+    headers = {name.lower(): value.strip() for name, _, value in (line.partition(":") for line in header_lines)}
+    body = await reader.readexactly(int(headers["content-length"]))
+    return int(status_line.split()[1]), headers, body
+
+def _exchange(*requests, max_concurrency=8):
+    """Send the requests over one keep-alive connection and return their (status, headers, body)."""
+    async def run():
+        server = SWAIGServer(workers=2, max_concurrency=max_concurrency)
+        host, port = await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            responses = []
+            for request in requests:
+                writer.write(request)
+                await writer.drain()
+                responses.append(await _read_response(reader))
+            writer.close()
+            return responses
+        finally:
+            await server.close()
+    return asyncio.run(run())
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    reservation_system.reservations.clear()
+    yield
+    reservation_system.reservations.clear()
+
+def test_function_calls_share_the_flask_contract():
+    date_str = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    args = {"name": "Ada", "party_size": 2, "date": date_str, "time": "19:00", "phone_number": "+19185550100"}
+    created, fetched, missing = _exchange(
+        _request("POST", "/swaig", {"function": "create_reservation", "arguments": args}),
+        _request("POST", "/swaig", {"function": "get_reservation",
+                                    "argument": {"parsed": [{"phone_number": "+19185550100"}]}}),
+        _request("POST", "/swaig", {"function": "no_such_function", "arguments": {}}))
+    assert created[0] == 200 and "successfully created" in json.loads(created[2])["response"]
+    assert fetched[0] == 200 and "Ada" in json.loads(fetched[2])["response"]
+    assert missing[0] == 404
+    assert created[1]["connection"] == "keep-alive"
+
+def test_batch_and_signatures():
+    batch, signatures = _exchange(
+        _request("POST", "/swaig", {"batch": [{"function": "get_reservation",
+                                               "arguments": {"phone_number": "+19185550101"}}]}),
+        _request("POST", "/swaig", {"action": "get_signature", "functions": ["get_reservation"]}))
+    assert batch[0] == 200 and len(json.loads(batch[2])["responses"]) == 1
+    entries = json.loads(signatures[2])
+    assert [entry["function"] for entry in entries] == ["get_reservation"]
+    assert entries[0]["web_hook_url"].startswith("https://") and entries[0]["web_hook_url"].endswith("test.local/swaig")
+
+def test_dashboard_supports_conditional_get(tmp_path, monkeypatch):
+    template = tmp_path / "reservation.html"
+    template.write_text("<html><head></head><body>{{reservations_table}}</body></html>")
+    monkeypatch.setattr(app_new.dashboard, "template_path", str(template))
+    (status, headers, body), = _exchange(_request("GET", "/"))
+    assert status == 200 and headers["content-type"].startswith("text/html") and b"No reservations yet" in body
+    (status, _, body), = _exchange(_request("GET", "/", headers={"If-None-Match": headers["etag"]}))
+    assert status == 304 and body == b""
+
+def test_rejects_bad_requests():
+    not_json, unknown, metrics, anonymous, oversized = _exchange(
+        b"POST /swaig HTTP/1.1\r\nContent-Length: 2\r\nContent-Type: text/plain\r\n"
+        b"Authorization: Basic YWRtaW46c2VjcmV0\r\n\r\n{}",
+        _request("GET", "/nowhere"),
+        _request("GET", "/metrics"),
+        _request("POST", "/swaig", {"function": "get_reservation", "arguments": {}}, headers={}),
+        f"POST /swaig HTTP/1.1\r\nContent-Length: {MAX_BODY_BYTES + 1}\r\n\r\n".encode())
+    assert not_json[0] == 400 and unknown[0] == 404
+    assert metrics[0] == 401 and metrics[1]["www-authenticate"].startswith("Basic")
+    assert anonymous[0] == 401
+    assert oversized[0] == 413 and oversized[1]["connection"] == "close"
@@ -0,0 +1,115 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import bulk
+import reservation_system
+from app_new import app
+from conftest import AUTH
+
+pytestmark = pytest.mark.usefixtures("clean_store")
+
+def future_date(days=1):
+    return (datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d")
+
+def csv_text(*rows):
+    lines = ["phone_number,name,party_size,date,time"]
+    lines.extend(",".join(str(value) for value in row) for row in rows)
+    return "\n".join(lines) + "\n"
+
+def test_csv_import_books_valid_rows_and_reports_the_rest_by_line():
+    date = future_date()
+    text = csv_text(
+        ("+15550000001", "Ann", 2, date, "18:00"),
+        ("+15550000002", "Bob", "two", date, "18:00"),
+        ("555", "Cy", 2, date, "18:00"),
+        ("+15550000001", "Ann again", 2, date, "19:00"),
+        ("+15550000003", "Di", 4, date, "18:00"),
+        ("+15550000004", "Ed", 2, date, "18:00"),
+        ("+15550000005", "Flo", 2, "2000-01-01", "18:00"))
+    report = bulk.import_reservations(io.StringIO(text), "csv", chunk_size=3)
+    assert report.imported == 2 and report.failed == 5
+    errors = dict(report.errors)
+    assert errors[3].startswith("Party size")
+    assert errors[4].startswith("Invalid phone number")
+    assert errors[5] == "A reservation already exists for this phone number."
+    # Both tables are taken at 18:00
+    assert errors[7].startswith("This time slot is already booked")
+    assert errors[8].startswith("Invalid date or time")
+    assert reservation_system.reservations["+15550000003"]["table"] == "T2"
+    assert "+15550000004" not in reservation_system.reservations
+
+def test_jsonl_import_reports_unparseable_lines_and_missing_fields():
+    date = future_date()
+    text = "\n".join([
+        json.dumps({"phone_number": "+15550000001", "name": "Ann", "party_size": 2, "date": date, "time": "18:00"}),
+        "{not json",
+        "",
+        json.dumps(["a", "list"]),
+        json.dumps({"phone_number": "+15550000002", "name": "Bob", "date": date, "time": "18:00"}),
+        json.dumps({"phone_number": "+15550000003", "name": 7, "party_size": 2, "date": date, "time": "19:00"})
+    ])
+    report = bulk.import_reservations(io.StringIO(text), "jsonl")
+    assert report.imported == 1
+    errors = dict(report.errors)
+    assert errors[2].startswith("Invalid JSON")
+    assert errors[4] == "Each line must be a JSON object."
+    assert errors[5] == "Missing required field: 'party_size'"
+    assert errors[6] == "Name, phone number, date and time must be text."
+
+def test_import_skips_numbers_that_already_have_a_booking():
+    date = future_date()
+    reservation_system.create_reservation_response({"phone_number": "+15550000001", "name": "Ann", "party_size": 2,
+                                                     "date": date, "time": "15:00"})
+    report = bulk.import_reservations(io.StringIO(csv_text(("+15550000001", "Ann", 2, date, "18:00"))))
+    assert report.failed == 1
+    assert reservation_system.reservations["+15550000001"]["time"] == "15:00"
+
+def test_export_round_trips_through_import(clean_store):
+    dates = [future_date(1), future_date(2)]
+    for i, date in enumerate(dates):
+        reservation_system.create_reservation_response({"phone_number": f"+1555000000{i}", "name": "Guest, Jr.",
+                                                         "party_size": 2, "date": date, "time": "18:00"})
+    for fmt in bulk.FORMATS:
+        out = io.StringIO()
+        assert bulk.export_reservations(out, fmt) == 2
+        exported = out.getvalue()
+        reservation_system.reservations.clear()
+        reservation_system.rebuild_inventory()
+        report = bulk.import_reservations(io.StringIO(exported), fmt)
+        assert (report.imported, report.failed) == (2, 0)
+        assert reservation_system.reservations["+15550000000"]["name"] == "Guest, Jr."
+
+    out = io.StringIO()
+    assert bulk.export_reservations(out, "jsonl", from_date=dates[1]) == 1
+    assert json.loads(out.getvalue())["date"] == dates[1]
+    with pytest.raises(ValueError):
+        bulk.export_lines("xml")
+
+def test_http_import_and_export():
+    client = app.test_client()
+    date = future_date()
+    assert client.get('/reservations/export').status_code == 401
+    assert client.post('/reservations/import', data="").status_code == 401
+
+    response = client.post('/reservations/import', headers=AUTH, content_type='text/csv',
+                           data=csv_text(("+15550000001", "Ann", 2, date, "18:00"), ("bad", "Bo", 2, date, "18:00")))
+    assert response.status_code == 200
+    assert response.get_json() == {"imported": 1, "failed": 1, "errors": [
+        {"line": 3, "error": "Invalid phone number format. Please use E.164 format (e.g., +19185551234)."}]}
+
+    body = json.dumps({"phone_number": "+15550000002", "name": "Cy", "party_size": 2, "date": date, "time": "19:00"})
+    response = client.post('/reservations/import', headers=AUTH, content_type='application/x-ndjson', data=body)
+    assert response.get_json()["imported"] == 1
+
+    response = client.get('/reservations/export', headers=AUTH)
+    assert response.mimetype == 'text/csv'
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == ",".join(bulk.FIELDS) and len(lines) == 3
+    response = client.get('/reservations/export?format=jsonl', headers=AUTH)
+    assert response.mimetype == 'application/x-ndjson'
+    assert {json.loads(line)["phone_number"] for line in response.get_data(as_text=True).splitlines()} == \
+        {"+15550000001", "+15550000002"}
+    assert client.get('/reservations/export?format=xml', headers=AUTH).status_code == 400
@@ -0,0 +1,120 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import app_new
+import reservation_system
+from async_server import SWAIGServer
+from changefeed import ChangeFeed, Follower
+from conftest import AUTH
+from storage import MemoryStore
+
+@pytest.fixture(autouse=True)
+def fresh_feed(monkeypatch):
+    saved = reservation_system.reservations
+    reservation_system.configure_store(MemoryStore())
+    monkeypatch.setattr(reservation_system, "changes", ChangeFeed(history=10, buffer_size=4))
+    yield reservation_system.changes
+    reservation_system.configure_store(saved)
+
+def booking(phone_number, time="18:00"):
+    date = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
+    return {"name": "Ada", "party_size": 2, "date": date, "time": time, "phone_number": phone_number}
+
+def events(text):
+    """(id, event, data) of each SSE frame in text."""
+    frames = []
+    for frame in text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":"))
+        if "event" in fields:
+            frames.append((fields["id"], fields["event"], json.loads(fields["data"])))
+    return frames
+
+def test_mutations_are_published_in_order_once_committed(fresh_feed):
+    subscription = fresh_feed.subscribe()
+    reservation_system.create_reservation_response(booking("+15550000001"))
+    reservation_system.create_reservation_response(booking("+15550000001"))
+    reservation_system.update_reservation_response({"phone_number": "+15550000001", "party_size": 3})
+    reservation_system.move_reservation_response({"phone_number": "+15550000001", "new_date": booking("")["date"],
+                                                  "new_time": "20:00"})
+    reservation_system.cancel_reservation_response({"phone_number": "+15550000001"})
+    changes = subscription.take()
+    # The duplicate create was refused, so it is not reported
+    assert [(change.sequence, change.kind) for change in changes] == \
+        [(1, "created"), (2, "updated"), (3, "moved"), (4, "canceled")]
+    assert changes[2].reservation["time"] == "20:00" and changes[3].reservation["party_size"] == 3
+    assert events(changes[0].text)[0][2]["phone_number"] == "+15550000001"
+
+    with reservation_system.atomic() as block:
+        reservation_system.create_reservation_response(booking("+15550000002"))
+        block.rollback()
+    with reservation_system.atomic():
+        reservation_system.create_reservation_response(booking("+15550000003"))
+        assert subscription.take() == []
+    reservation_system.create_reservations([booking("+15550000004"), booking("+15550000005", "19:00")])
+    assert [change.phone_number for change in subscription.take()] == ["+15550000003", "+15550000004",
+                                                                         "+15550000005"]
+
+def test_reconnecting_clients_resume_from_history(fresh_feed):
+    for i in range(6):
+        fresh_feed.publish("created", f"+1555000000{i}", None)
+    subscription = fresh_feed.subscribe(f"{fresh_feed.epoch}-3")
+    assert [change.sequence for change in subscription.take()] == [4, 5, 6]
+    for last_event_id in ("stale-3", f"{fresh_feed.epoch}-99"):
+        reset, = fresh_feed.subscribe(last_event_id).take()
+        assert (reset.kind, reset.sequence) == ("reset", 6)
+    for i in range(10):
+        fresh_feed.publish("created", "+15550000000", None)
+    # Sequence 3 has left the ten-change history
+    assert fresh_feed.subscribe(f"{fresh_feed.epoch}-3").take()[0].kind == "reset"
+
+def test_slow_subscribers_are_bounded_and_catch_up(fresh_feed):
+    follower = Follower(fresh_feed)
+    slow = fresh_feed.subscribe()
+    for i in range(7):
+        fresh_feed.publish("created", f"+1555000000{i}", None)
+    # Both buffers filled up, so neither receives more
+    assert slow.overflowed and len(slow.take()) == 4 and len(fresh_feed) == 0
+    # The follower gets its four buffered changes, then the rest from the history
+    first = events(follower.take())
+    assert [frame[2]["sequence"] for frame in first] == [1, 2, 3, 4] and len(fresh_feed) == 1
+    assert [frame[2]["sequence"] for frame in events(follower.take())] == [5, 6, 7]
+    assert follower.last_event_id == f"{fresh_feed.epoch}-7"
+    follower.close()
+    assert len(fresh_feed) == 0
+
+def test_flask_stream_requires_credentials_and_resumes(fresh_feed):
+    client = app_new.app.test_client()
+    assert client.get("/changes").status_code == 401
+    reservation_system.create_reservation_response(booking("+15550000001"))
+    response = client.get("/changes", headers={**AUTH, "Last-Event-ID": f"{fresh_feed.epoch}-0"}, buffered=False)
+    assert response.mimetype == "text/event-stream"
+    chunks = response.response
+    assert next(chunks).startswith(b"retry:")
+    (event_id, kind, data), = events(next(chunks).decode())
+    assert (event_id, kind, data["reservation"]["name"]) == (f"{fresh_feed.epoch}-1", "created", "Ada")
+    response.close()
+    assert len(fresh_feed) == 0
+
+def test_async_server_streams_changes():
+    async def run():
+        server = SWAIGServer(workers=2)
+        host, port = await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"GET /changes HTTP/1.1\r\nHost: test.local\r\nAuthorization: " +
+                         AUTH["Authorization"].encode() + b"\r\n\r\n")
+            head = await reader.readuntil(b"\r\n\r\n")
+            assert head.startswith(b"HTTP/1.1 200") and b"text/event-stream" in head
+            assert await reader.readuntil(b"\n\n") == b"retry: 2000\n\n"
+            await asyncio.get_running_loop().run_in_executor(
+                None, reservation_system.create_reservation_response, booking("+15550000001"))
+            frame = await asyncio.wait_for(reader.readuntil(b"\n\n"), 5)
+            writer.close()
+            return frame.decode()
+        finally:
+            await server.close()
+    (_, kind, data), = events(asyncio.run(run()))
+    assert (kind, data["sequence"], data["phone_number"]) == ("created", 1, "+15550000001")
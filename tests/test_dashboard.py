@@ -0,0 +1,79 @@
+import pytest
+from datetime import datetime, timedelta
+
+import reservation_system
+from app_new import app
+from dashboard import DashboardRenderer
+from storage import MemoryStore, SQLiteStore
+
+TEMPLATE = "<html><head></head><body>{{reservations_table}}</body></html>"
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    saved = reservation_system.reservations
+    store = MemoryStore() if request.param == "memory" else SQLiteStore(str(tmp_path / "reservations.db"))
+    reservation_system.configure_store(store)
+    yield store
+    store.close()
+    reservation_system.configure_store(saved)
+
+@pytest.fixture
+def renderer(tmp_path, monkeypatch):
+    path = tmp_path / "reservation.html"
+    path.write_text(TEMPLATE)
+    renderer = DashboardRenderer(str(path))
+    monkeypatch.setitem(app.extensions, "dashboard", renderer)
+    return renderer
+
+def book(phone, name="Test Guest", time="19:00"):
+    date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    return reservation_system.create_reservation_response({
+        "name": name, "party_size": 2, "date": date, "time": time, "phone_number": phone
+    })
+
+def test_table_is_rebuilt_only_after_mutations(store, renderer):
+    assert renderer.table(store) == "<p>No reservations yet.</p>"
+    book("+19185550001", name="<b>Ann</b>")
+    first = renderer.table(store)
+    assert "&lt;b&gt;Ann&lt;/b&gt;" in first
+    assert renderer.table(store) is first
+    renders = renderer.renders
+
+    book("+19185550002", time="20:00")
+    second = renderer.table(store)
+    assert renderer.renders == renders + 1
+    # The untouched row is reused, scrambled phone number included
+    assert first.split("</tr>")[1] in second
+
+    reservation_system.cancel_reservation_response({"phone_number": "+19185550001"})
+    assert "Ann" not in renderer.table(store)
+
+def test_sqlite_revision_sees_other_connections(tmp_path):
+    path = str(tmp_path / "shared.db")
+    first, second = SQLiteStore(path), SQLiteStore(path)
+    before = first.revision()
+    second["+19185550003"] = {"name": "Bo", "party_size": 2, "date": "2030-01-01", "time": "19:00"}
+    assert first.revision() != before
+    assert first.revision() == second.revision()
+    first.close()
+    second.close()
+
+def test_page_supports_conditional_get(store, renderer):
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        response = client.get('/')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+
+        assert client.get('/', headers={'If-None-Match': etag}).status_code == 304
+
+        book("+19185550004")
+        response = client.get('/swaig', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+def test_missing_template_is_reported(store, renderer, tmp_path):
+    (tmp_path / "reservation.html").unlink()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        assert client.get('/').status_code == 500
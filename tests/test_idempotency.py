@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import idempotency
+import reservation_system
+from app_new import app, swaig_functions
+from idempotency import Identity, ResponseCache
+from inventory import default_tables, tables_from_spec
+from swaig_dispatcher import handle_payload
+
+DATE = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+BOOKING = {"name": "Ada", "party_size": 2, "date": DATE, "time": "19:00", "phone_number": "+19185550142"}
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    reservation_system.reservations.clear()
+    idempotency.responses.clear()
+    yield
+    reservation_system.reservations.clear()
+    idempotency.responses.clear()
+
+def call(function, arguments, **extra):
+    return handle_payload(swaig_functions, {"function": function, "arguments": arguments, **extra})
+
+def test_retried_create_replays_the_original_response():
+    first = call("create_reservation", BOOKING, call_id="call-1")
+    revision = reservation_system.data_version()
+    retry = call("create_reservation", BOOKING, call_id="call-1")
+    assert first == retry == ({"response": "Reservation successfully created."}, 200)
+    assert reservation_system.data_version() == revision
+    # Another call with the same details is not a retry
+    assert call("create_reservation", BOOKING, call_id="call-2")[0]["response"].startswith("A reservation already")
+
+def test_new_change_to_the_phone_ends_replay_of_older_ones():
+    call("create_reservation", BOOKING)
+    assert call("cancel_reservation", {"phone_number": BOOKING["phone_number"]})[0]["response"] == \
+        "Reservation canceled successfully."
+    # Not a replay: the booking was canceled since, so this books again
+    assert call("create_reservation", BOOKING)[0]["response"] == "Reservation successfully created."
+    assert BOOKING["phone_number"] in reservation_system.reservations
+    # Reads are never cached
+    assert "Ada" in call("get_reservation", {"phone_number": BOOKING["phone_number"]})[0]["response"]
+
+def test_refused_change_runs_again_when_retried():
+    reservation_system.configure_inventory(tables_from_spec("4:1"))
+    try:
+        call("create_reservation", BOOKING, call_id="call-a")
+        other = dict(BOOKING, name="Bo", phone_number="+19185550143")
+        assert call("create_reservation", other, call_id="call-b")[0]["response"].startswith(
+            "This time slot is already booked")
+        call("cancel_reservation", {"phone_number": BOOKING["phone_number"]}, call_id="call-a")
+        # The refusal was not stored, so the retry books the freed table
+        assert call("create_reservation", other, call_id="call-b")[0]["response"] == \
+            "Reservation successfully created."
+        assert "Bo" in call("get_reservation", {"phone_number": other["phone_number"]})[0]["response"]
+    finally:
+        reservation_system.configure_inventory(default_tables())
+
+def test_explicit_keys_replay_and_reject_reuse():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        auth = {"Authorization": "Basic YWRtaW46c2VjcmV0"}
+        headers = {"Idempotency-Key": "move-7", **auth}
+        client.post('/swaig', json={"function": "create_reservation", "arguments": BOOKING}, headers=auth)
+        move = {"function": "move_reservation", "arguments": {
+            "phone_number": BOOKING["phone_number"], "new_date": DATE, "new_time": "20:00"}}
+        assert client.post('/swaig', json=move, headers=headers).get_json()["response"] == \
+            "Reservation moved successfully."
+        revision = reservation_system.data_version()
+        assert client.post('/swaig', json=move, headers=headers).get_json()["response"] == \
+            "Reservation moved successfully."
+        assert reservation_system.data_version() == revision
+        move["arguments"]["new_time"] = "21:00"
+        response = client.post('/swaig', json=move, headers=headers)
+        assert response.status_code == 422
+        assert reservation_system.reservations[BOOKING["phone_number"]]["time"] == "20:00"
+
+def test_cache_expires_and_stays_bounded():
+    now = [0.0]
+    cache = ResponseCache(ttl=10, max_entries=2, clock=lambda: now[0])
+    identity = lambda n: Identity(f"key:{n}", str(n), (), False)  # noqa: E731
+    for n in range(3):
+        assert cache.run(identity(n), lambda: n) == (n, False)
+    assert len(cache) == 2 and cache.run(identity(2), lambda: "again") == (2, True)
+    assert cache.run(identity(0), lambda: "again") == ("again", False)
+    now[0] = 11
+    assert cache.run(identity(0), lambda: "later") == ("later", False)
+
+def test_concurrent_retries_wait_for_the_first_request():
+    cache = ResponseCache()
+    identity = Identity("key:slow", "f", (), False)
+    started, release, runs, results = threading.Event(), threading.Event(), [], []
+
+    def slow():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        return "done"
+
+    first = threading.Thread(target=lambda: results.append(cache.run(identity, slow)))
+    first.start()
+    started.wait(5)
+    retry = threading.Thread(target=lambda: results.append(cache.run(identity, slow)))
+    retry.start()
+    release.set()
+    first.join()
+    retry.join()
+    assert len(runs) == 1 and sorted(results) == [("done", False), ("done", True)]
@@ -0,0 +1,195 @@
+import gc
+import os
+import subprocess
+import sys
+import threading
+import weakref
+from datetime import datetime, timedelta
+
+import pytest
+
+import reservation_system
+from journal import Journal, JournaledStore, read_snapshot, write_snapshot
+from records import Reservation, start_minute
+from storage import MemoryStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def day(offset):
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+def booking(i, day="2030-05-01"):
+    return {"name": f"Guest {i % 7}", "party_size": 1 + i % 6, "date": day, "time": f"{14 + i % 8}:{(i % 4) * 15:02d}",
+            "table": f"T{i % 5}" if i % 3 else None}
+
+def test_reopen_replays_the_journal(tmp_path):
+    store = JournaledStore(str(tmp_path))
+    for i in range(20):
+        store[f"+1918555{i:04d}"] = booking(i)
+    del store["+19185550003"]
+    store["+19185550004"] = booking(4, day="2030-05-02")
+    expected = {phone: r.to_dict() for phone, r in store.items()}
+    store.close()
+
+    reopened = JournaledStore(str(tmp_path))
+    assert {phone: r.to_dict() for phone, r in reopened.items()} == expected
+    assert reopened.phones_at("2030-05-02", booking(4)["time"]) == ["+19185550004"]
+    reopened.close()
+
+def test_compaction_writes_a_snapshot_and_drops_old_journals(tmp_path):
+    store = JournaledStore(str(tmp_path))
+    for i in range(50):
+        store[f"+1918555{i:04d}"] = booking(i)
+    store.compact()
+    store["+19185559999"] = booking(99)
+    store.close()
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith("journal.")) == ["journal.00000002.log"]
+
+    reopened = JournaledStore(str(tmp_path))
+    assert len(reopened) == 51
+    assert reopened["+19185550010"].to_dict() == Reservation.from_dict(booking(10)).to_dict()
+    assert reopened.on_date("2030-05-01")
+    reopened.close()
+
+def test_snapshot_dates_are_indexed_on_first_use(tmp_path):
+    store = JournaledStore(str(tmp_path))
+    for i in range(40):
+        store[f"+1918555{i:04d}"] = booking(i, "2030-05-0" + str(1 + i % 4))
+    store.compact()
+    store.close()
+    expected = MemoryStore()
+    for i in range(40):
+        expected[f"+1918555{i:04d}"] = booking(i, "2030-05-0" + str(1 + i % 4))
+
+    reopened = JournaledStore(str(tmp_path))
+    assert sorted(reopened._unindexed) == ["2030-05-01", "2030-05-02", "2030-05-03", "2030-05-04"]
+    # Moving a booking between two unindexed dates, and deleting from a third, index each as it goes
+    for target in (reopened, expected):
+        target["+19185550000"] = booking(0, "2030-05-02")
+        del target["+19185550002"]
+    assert sorted(reopened._unindexed) == ["2030-05-04"]
+    assert sorted(reopened.phones_at("2030-05-02", "14:00")) == sorted(expected.phones_at("2030-05-02", "14:00"))
+    assert sorted(reopened.on_date("2030-05-01")) == sorted(expected.on_date("2030-05-01"))
+    assert reopened.scan(("", "", ""), limit=100) == expected.scan(("", "", ""), limit=100)
+    assert reopened._unindexed == {} and reopened._snapshot_phones == []
+    reopened.clear()
+    assert reopened.scan(("", "", ""), limit=100) == []
+    reopened.close()
+
+def test_torn_journal_tail_is_ignored(tmp_path):
+    store = JournaledStore(str(tmp_path))
+    store["+19185550001"] = booking(1)
+    path = store.journal.path
+    store.close()
+    valid_size = os.path.getsize(path)
+    with open(path, "ab") as file:
+        file.write(b"\x40\x00\x00\x00garbage")
+
+    reopened = JournaledStore(str(tmp_path))
+    assert list(reopened) == ["+19185550001"]
+    reopened.close()
+    assert os.path.getsize(path) == valid_size
+
+def test_transactions_wait_for_a_shared_fsync(tmp_path, monkeypatch):
+    fsyncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsyncs.append(fd), real_fsync(fd)))
+    store = JournaledStore(str(tmp_path))
+    barrier = threading.Barrier(16)
+
+    def write(i):
+        barrier.wait()
+        with store.transaction():
+            store[f"+1918555{i:04d}"] = booking(i)
+        # Durable once the transaction returns
+        assert store.journal._durable >= store._local.sequence
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.close()
+    assert 1 <= len(fsyncs) <= 16
+    assert len(JournaledStore(str(tmp_path))) == 16
+
+def test_failed_fsync_fails_every_later_wait(tmp_path, monkeypatch):
+    journal = Journal(str(tmp_path / "journal-1.log"))
+    real_fsync = os.fsync
+    failures = [OSError(28, "No space left on device")]
+
+    def fsync(fd):
+        if failures:
+            raise failures.pop()
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", fsync)
+    lost = journal.append({"op": "clear"})
+    journal.flush()
+    # The disk recovers, but the lost batch must not be reported durable by a later one
+    later = journal.append({"op": "clear"})
+    journal.flush()
+    for sequence in (lost, later):
+        with pytest.raises(OSError, match="No space left"):
+            journal.wait(sequence)
+    journal.close()
+
+def test_failed_commit_leaves_the_store_unchanged(tmp_path, monkeypatch):
+    saved = reservation_system.reservations
+    store = JournaledStore(str(tmp_path))
+    reservation_system.configure_store(store)
+    try:
+        kept = {"name": "Ada", "party_size": 2, "date": day(2), "time": "19:00", "phone_number": "+19185550001"}
+        assert reservation_system.create_reservation_response(kept) == "Reservation successfully created."
+        real_fsync = os.fsync
+        failures = [OSError(5, "Input/output error")]
+
+        def fsync(fd):
+            if failures:
+                raise failures.pop()
+            real_fsync(fd)
+
+        monkeypatch.setattr(os, "fsync", fsync)
+        # The cancel's own commit fails, so it is undone in memory
+        assert reservation_system.cancel_reservation_response({"phone_number": "+19185550001"}).startswith(
+            "Error canceling reservation")
+        assert reservation_system.get_reservation_response({"phone_number": "+19185550001"}).startswith(
+            "Reservation found: Ada")
+        # The journal stays failed, so later writes are refused before they touch memory
+        refused = dict(kept, phone_number="+19185550002", time="20:00")
+        assert reservation_system.create_reservation_response(refused).startswith("Error creating reservation")
+        assert "+19185550002" not in store and list(store) == ["+19185550001"]
+        with pytest.raises(OSError):
+            store.compact()
+    finally:
+        store.close()
+        reservation_system.configure_store(saved)
+    assert list(JournaledStore(str(tmp_path))) == ["+19185550001"]
+
+def test_closed_stores_are_freed_and_open_ones_flushed_at_exit(tmp_path):
+    store = JournaledStore(str(tmp_path / "closed"))
+    store["+19185550001"] = booking(1)
+    ref = weakref.ref(store)
+    store.close()
+    del store
+    gc.collect()
+    assert ref() is None
+
+    # A batch-mode write still queued when the interpreter exits is written by the exit hook
+    code = ("import sys; from journal import JournaledStore; "
+            "store = JournaledStore(sys.argv[1], sync='batch'); "
+            "store['+19185550002'] = {'name': 'Bo', 'party_size': 2, 'date': '2030-05-01', 'time': '19:00'}")
+    subprocess.run([sys.executable, "-c", code, str(tmp_path / "open")], cwd=ROOT, check=True)
+    assert list(JournaledStore(str(tmp_path / "open"))) == ["+19185550002"]
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    items = [(f"+1918555{i:04d}", Reservation.from_dict(booking(i))) for i in range(10)]
+    assert write_snapshot(path, items, generation=3) == 10
+    snapshot = read_snapshot(path)
+    assert snapshot.generation == 3
+    loaded = list(zip(snapshot.phones, snapshot.records))
+    assert dict((p, r.to_dict()) for p, r in loaded) == dict((p, r.to_dict()) for p, r in items)
+    assert [r.start for _, r in loaded] == sorted(r.start for _, r in items)
+    assert loaded[0][1].start == min(start_minute(b["date"], b["time"]) for b in map(booking, range(10)))
+    assert sum(length for _, length in snapshot.runs) == 10
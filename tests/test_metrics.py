@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import metrics
+import reservation_system
+from app_new import app
+from conftest import AUTH
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    reservation_system.reservations.clear()
+    with app.test_client() as client:
+        yield client
+    reservation_system.reservations.clear()
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.histogram("demo_seconds", "Demo.", ["op"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "read")
+    counter = registry.counter("demo_total", "Demo count.", ["op"])
+    counter.inc('say "hi"')
+    text = registry.render()
+    assert 'demo_seconds_bucket{op="read",le="0.1"} 2' in text
+    assert 'demo_seconds_bucket{op="read",le="1.0"} 3' in text
+    assert 'demo_seconds_bucket{op="read",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{op="read"} 4' in text and 'demo_seconds_sum{op="read"} 3.65' in text
+    assert 'demo_total{op="say \\"hi\\""} 1' in text
+    assert "# TYPE demo_seconds histogram" in text
+    with pytest.raises(ValueError):
+        registry.counter("demo_total", "Again.")
+
+def test_swaig_calls_are_counted_by_function_and_category(client):
+    date_str = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    calls = metrics.swaig_calls.value("get_reservation")
+    not_found = metrics.swaig_errors.value("get_reservation", "not_found")
+    invalid = metrics.swaig_errors.value("create_reservation", "validation")
+    validated = metrics.stage_latency.count("validation")
+    stored = metrics.stage_latency.count("storage")
+
+    client.post('/swaig', json={"function": "get_reservation", "arguments": {"phone_number": "+19185550199"}},
+                headers=AUTH)
+    client.post('/swaig', json={"function": "create_reservation", "arguments": {
+        "name": "Ada", "party_size": 2, "date": date_str, "time": "19:00", "phone_number": "not-a-phone"}}, headers=AUTH)
+    client.post('/swaig', json={"function": "create_reservation", "arguments": {
+        "name": "Ada", "party_size": 2, "date": date_str, "time": "19:00", "phone_number": "+19185550199"}}, headers=AUTH)
+
+    assert metrics.swaig_calls.value("get_reservation") == calls + 1
+    assert metrics.swaig_errors.value("get_reservation", "not_found") == not_found + 1
+    assert metrics.swaig_errors.value("create_reservation", "validation") == invalid + 1
+    assert metrics.stage_latency.count("validation") == validated + 3
+    # The failed lookup and the one successful create both touch the store
+    assert metrics.stage_latency.count("storage") == stored + 2
+    assert metrics.swaig_latency.count("create_reservation") >= 2
+
+def test_metrics_endpoint_requires_auth(client):
+    assert client.get('/metrics').status_code == 401
+    response = client.get('/metrics', headers=AUTH)
+    assert response.status_code == 200 and response.content_type.startswith("text/plain")
+    assert b"# TYPE swaig_call_duration_seconds histogram" in response.data
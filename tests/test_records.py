@@ -0,0 +1,25 @@
+import pytest
+
+from records import Reservation, start_minute
+
+def test_record_reads_like_the_legacy_dict():
+    record = Reservation.from_dict({"name": "Ann Lee", "party_size": "4", "date": "2030-03-09", "time": "19:45"})
+    assert record["date"] == "2030-03-09" and record["time"] == "19:45"
+    assert record.get("table") is None and record.get("missing", 1) == 1
+    assert record.to_dict() == {"name": "Ann Lee", "party_size": 4, "date": "2030-03-09", "time": "19:45",
+                                "table": None}
+    assert dict(record, table="T2")["table"] == "T2"
+    assert Reservation.from_dict(record) is record
+    with pytest.raises(KeyError):
+        record["start"]
+
+def test_start_is_ordered_and_shared():
+    assert start_minute("2030-03-09", "19:45") < start_minute("2030-03-09", "20:00") < start_minute("2030-03-10", "14:00")
+    assert start_minute("1970-01-02", "00:01") == 24 * 60 + 1
+    with pytest.raises(ValueError):
+        start_minute("2030-3-9", "19:45")
+
+def test_record_has_no_instance_dict():
+    record = Reservation("Bo", 2, 0)
+    assert not hasattr(record, "__dict__")
+    assert Reservation("".join(["B", "o"]), 2, 0).name is record.name
@@ -0,0 +1,296 @@
+import sqlite3
+import sys
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+
+import reservation_system
+from inventory import tables_from_spec
+from lookup_cache import LookupCache
+from storage import MemoryStore, SQLiteStore
+from reservation_system import (
+    create_reservation_response,
+    update_reservation_response,
+    cancel_reservation_response,
+    move_reservation_response,
+    is_slot_booked
+)
+
+pytestmark = pytest.mark.usefixtures("clean_store")
+
+def future_date(days=1):
+    return (datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d")
+
+def make_reservation(phone, date, time, name="Test Guest", party_size=2):
+    return create_reservation_response({
+        "name": name,
+        "party_size": party_size,
+        "date": date,
+        "time": time,
+        "phone_number": phone
+    })
+
+def test_slot_capacity_follows_tables():
+    date = future_date()
+    assert make_reservation("+19185550001", date, "19:00") == "Reservation successfully created."
+    assert is_slot_booked(date, "19:00")
+    # The four-top still takes a couple at the same time, then the slot is full
+    assert make_reservation("+19185550002", date, "19:00") == "Reservation successfully created."
+    assert "already booked" in make_reservation("+19185550003", date, "19:00")
+    # Turns overlap until the two-top's 75 minutes are up
+    assert "already booked" in make_reservation("+19185550003", date, "20:00")
+    assert make_reservation("+19185550003", date, "20:15") == "Reservation successfully created."
+
+def test_party_larger_than_any_table():
+    assert "no table" in make_reservation("+19185550001", future_date(), "19:00", party_size=6)
+
+def test_move_checks_capacity():
+    date = future_date()
+    make_reservation("+19185550001", date, "19:00", party_size=4)
+    make_reservation("+19185550002", date, "20:30", party_size=3)
+    result = move_reservation_response({"phone_number": "+19185550001", "new_date": date, "new_time": "20:00"})
+    assert "already booked" in result
+    # The failed move keeps the original table
+    assert reservation_system.reservations["+19185550001"]["time"] == "19:00"
+    assert "already booked" in make_reservation("+19185550003", date, "19:30", party_size=3)
+
+def test_slot_index_follows_mutations():
+    date = future_date()
+    make_reservation("+19185550001", date, "19:00")
+
+    move_reservation_response({"phone_number": "+19185550001", "new_date": date, "new_time": "20:00"})
+    assert not is_slot_booked(date, "19:00")
+    assert is_slot_booked(date, "20:00")
+
+    update_reservation_response({"phone_number": "+19185550001", "date": date, "time": "21:00"})
+    assert not is_slot_booked(date, "20:00")
+    assert is_slot_booked(date, "21:00")
+
+    cancel_reservation_response({"phone_number": "+19185550001"})
+    assert not is_slot_booked(date, "21:00")
+    assert make_reservation("+19185550002", date, "21:00") == "Reservation successfully created."
+
+def test_sqlite_store_is_shared_between_connections(clean_store, tmp_path):
+    if not isinstance(clean_store, SQLiteStore):
+        pytest.skip("only meaningful for a shared database")
+    date = future_date()
+    make_reservation("+19185550001", date, "19:00", party_size=4)
+    # A second handle on the same file stands in for another gunicorn worker
+    other_worker = SQLiteStore(clean_store.path)
+    other_worker["+19185550002"] = {"name": "Other", "party_size": 2, "date": date, "time": "19:00", "table": "T1"}
+    other_worker.close()
+    assert "already booked" in make_reservation("+19185550003", date, "19:30")
+    assert reservation_system.reservations["+19185550001"]["table"] == "T2"
+
+class FailingCommit:
+    """Wraps a connection so that its next COMMIT fails the way a busy or full disk would."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, *args):
+        if sql == "COMMIT":
+            raise sqlite3.OperationalError("disk I/O error")
+        return self.conn.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+def test_sqlite_failed_commit_releases_the_write_lock(clean_store):
+    if not isinstance(clean_store, SQLiteStore):
+        pytest.skip("only meaningful for a shared database")
+    date = future_date()
+    booking = {"name": "Lost", "party_size": 2, "date": date, "time": "19:00", "table": "T1"}
+    conn = clean_store._connection()
+    clean_store._local.conn = FailingCommit(conn)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            with clean_store.transaction():
+                clean_store["+19185550001"] = booking
+    finally:
+        clean_store._local.conn = conn
+    assert not conn.in_transaction
+    assert "+19185550001" not in clean_store
+    # Another worker can still take the write lock, and so can this thread
+    other_worker = SQLiteStore(clean_store.path, busy_timeout_ms=100)
+    other_worker["+19185550002"] = dict(booking, name="Other")
+    other_worker.close()
+    assert make_reservation("+19185550003", date, "20:00") == "Reservation successfully created."
+
+def run_concurrently(target, count):
+    """Start `count` threads together and collect each one's result."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(i):
+        barrier.wait()
+        results[i] = target(i)
+
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads often to shake out races
+    try:
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(old_interval)
+    return results
+
+def test_same_slot_from_64_threads_has_one_winner():
+    reservation_system.configure_inventory(tables_from_spec("4:1"))
+    date = future_date()
+    results = run_concurrently(lambda i: make_reservation(f"+1918556{i:04d}", date, "19:00"), 64)
+    assert results.count("Reservation successfully created.") == 1
+    assert all("already booked" in r for r in results if r != "Reservation successfully created.")
+    assert len(reservation_system.reservations) == 1
+
+class SlowMemoryStore(MemoryStore):
+    """Widens the window between a check and the write that depends on it."""
+
+    def __contains__(self, phone_number):
+        found = super().__contains__(phone_number)
+        time.sleep(0.0005)
+        return found
+
+def test_same_phone_from_many_threads_has_one_winner():
+    reservation_system.configure_store(SlowMemoryStore())
+    reservation_system.configure_inventory(tables_from_spec("4:32"))
+    date = future_date()
+    results = run_concurrently(lambda i: make_reservation("+19185550001", date, f"{14 + i % 8}:{i // 8 * 15:02d}"), 32)
+    assert results.count("Reservation successfully created.") == 1
+    # Only the winner's table is held, so 31 other parties still fit at once
+    for i in range(31):
+        assert make_reservation(f"+1918558{i:04d}", date, "19:00") == "Reservation successfully created."
+
+def test_concurrent_moves_into_one_slot_have_one_winner():
+    reservation_system.configure_inventory(tables_from_spec("4:1"))
+    date = future_date()
+    for i in range(16):
+        assert make_reservation(f"+1918557{i:04d}", future_date(2 + i), "19:00") == "Reservation successfully created."
+    results = run_concurrently(lambda i: move_reservation_response(
+        {"phone_number": f"+1918557{i:04d}", "new_date": date, "new_time": "19:00"}), 16)
+    assert results.count("Reservation moved successfully.") == 1
+    assert len(reservation_system.reservations.on_date(date)) == 1
+
+def test_atomic_rollback_restores_records_and_tables():
+    date = future_date()
+    make_reservation("+19185550001", date, "19:00")
+    with reservation_system.atomic() as block:
+        cancel_reservation_response({"phone_number": "+19185550001"})
+        make_reservation("+19185550002", date, "19:00", party_size=4)
+        block.rollback()
+    assert reservation_system.reservations["+19185550001"]["time"] == "19:00"
+    assert "+19185550002" not in reservation_system.reservations
+    # The four-top is free again and the two-top is still taken
+    assert make_reservation("+19185550003", date, "19:00", party_size=4) == "Reservation successfully created."
+    assert "already booked" in make_reservation("+19185550004", date, "19:00")
+
+def test_listing_pages_in_date_and_time_order(clean_store):
+    # Bypass capacity: listing only reads the store
+    for i in range(7):
+        clean_store[f"+1918555{i:04d}"] = {"name": f"Guest {i}", "party_size": 2 + i % 3,
+                                           "date": f"2030-01-0{1 + i % 3}", "time": f"{19 - i % 2}:00"}
+    seen, cursor = [], None
+    while True:
+        page, cursor = reservation_system.list_reservations(limit=3, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+    keys = [(r["date"], r["time"], r["phone_number"]) for r in seen]
+    assert keys == sorted(keys) and len(keys) == 7
+
+    one_day, _ = reservation_system.list_reservations(from_date="2030-01-02", to_date="2030-01-02")
+    assert {r["date"] for r in one_day} == {"2030-01-02"}
+    threes, _ = reservation_system.list_reservations(min_party_size=3, max_party_size=3)
+    assert threes and all(r["party_size"] == 3 for r in threes)
+    assert list(reservation_system.iter_reservations(from_date="2030-01-02", chunk_size=2)) == \
+        [r for r in seen if r["date"] >= "2030-01-02"]
+
+    for phone in list(clean_store):
+        del clean_store[phone]
+    assert reservation_system.list_reservations() == ([], None)
+
+def test_listing_rejects_bad_filters():
+    with pytest.raises(ValueError, match="Invalid date filter"):
+        reservation_system.list_reservations(from_date="2030-1-1")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        reservation_system.list_reservations(cursor="not a cursor")
+    with pytest.raises(ValueError, match="Invalid party size"):
+        reservation_system.iter_reservations(min_party_size=4, max_party_size=2)
+    assert reservation_system.list_reservations_response({"date": "tomorrow"}).startswith("Invalid")
+
+def test_find_available_slots_nearest_first():
+    date = future_date()
+    assert make_reservation("+19185550001", date, "19:00") == "Reservation successfully created."
+    assert make_reservation("+19185550002", date, "19:00") == "Reservation successfully created."
+    # Both tables are held 19:00-20:15, so a two-top can start at 17:45 at the latest or 20:15 at the earliest
+    assert reservation_system.find_available_slots(date, 2, "19:00") == ["17:45", "20:15", "17:30"]
+    assert reservation_system.find_available_slots(date, 2, "19:00", window_minutes=60) == []
+    assert reservation_system.find_available_slots(date, 2, count=2) == ["14:00", "14:15"]
+    assert reservation_system.find_available_slots(date, 5) == []
+    assert "nearest open times are 17:45, 20:15, 17:30" in make_reservation("+19185550003", date, "19:00")
+
+    cancel_reservation_response({"phone_number": "+19185550001"})
+    assert reservation_system.find_available_slots(date, 2, "19:00", count=1) == ["19:00"]
+    with pytest.raises(ValueError):
+        reservation_system.find_available_slots(date, 2, "7pm")
+
+def test_slot_and_listing_counts_are_validated_not_defaulted():
+    date = future_date()
+    assert make_reservation("+19185550001", date, "19:00") == "Reservation successfully created."
+    find = lambda **extra: reservation_system.find_available_slots_response(  # noqa: E731
+        {"date": date, "party_size": 2, "preferred_time": "19:00", **extra})
+    # A zero window is only the preferred time itself, not the default two hours
+    assert find(window_minutes=0) == "Available times on " + date + " for a party of 2: 19:00."
+    assert find(window_minutes="30", count=1) == "Available times on " + date + " for a party of 2: 19:00."
+    assert find(count=0) == "Invalid search window or count."
+    for bad in (-15, "soon", 1.5, True):
+        assert find(window_minutes=bad) == "Invalid window minutes. Use a whole number."
+    assert find(count=-1) == "Invalid count. Use a whole number."
+    listing = reservation_system.list_reservations_response
+    assert listing({"date": date, "limit": 0}).startswith("Invalid limit. Use 1 to")
+    assert listing({"date": date, "limit": "x"}) == "Invalid limit. Use a whole number."
+    assert listing({"date": date, "limit": None}).startswith("Reservations found: Test Guest")
+
+def test_get_reservation_cache_follows_every_write(clean_store):
+    date = future_date()
+    lookups = reservation_system.lookups
+    get = lambda: reservation_system.get_reservation_response({"phone_number": "+19185550001"})  # noqa: E731
+    assert get() == "No reservation found for this phone number."
+    make_reservation("+19185550001", date, "19:00", name="Ada")
+    hits = lookups.hits
+    assert "Ada for 2 people" in get() and "Ada for 2 people" in get()
+    assert lookups.hits == hits + 1
+    update_reservation_response({"phone_number": "+19185550001", "party_size": 3})
+    assert "for 3 people" in get()
+    move_reservation_response({"phone_number": "+19185550001", "new_date": date, "new_time": "20:00"})
+    assert "at 20:00" in get()
+    with reservation_system.atomic() as block:
+        cancel_reservation_response({"phone_number": "+19185550001"})
+        assert get() == "No reservation found for this phone number."
+        block.rollback()
+    assert "at 20:00" in get()
+    if isinstance(clean_store, SQLiteStore):
+        # A write by another worker is seen through the store revision
+        other_worker = SQLiteStore(clean_store.path)
+        del other_worker["+19185550001"]
+        other_worker.close()
+        assert get() == "No reservation found for this phone number."
+
+def test_get_reservation_cache_is_bounded_and_never_stores_stale_reads(clean_store):
+    lookups = LookupCache(capacity=2)
+    lookups.attach(clean_store)
+    try:
+        for n in range(3):
+            lookups.put(f"+1918555000{n}", f"reply {n}", lookups.stamp())
+        assert len(lookups) == 2 and lookups.get("+19185550000") is None
+        # A write between the read and put() keeps the older reply out
+        stamp = lookups.stamp()
+        make_reservation("+19185550009", future_date(), "19:00")
+        lookups.put("+19185550009", "No reservation found for this phone number.", stamp)
+        assert lookups.get("+19185550009") is None
+    finally:
+        clean_store.remove_listener(lookups.invalidate)
@@ -1,5 +1,6 @@
 import pytest
 from app_new import app
+from conftest import AUTH
 from datetime import datetime, timedelta
 
 @pytest.fixture
@@ -13,7 +14,7 @@ def send_swaig_payload(client, function_name, args, use_parsed=False):
         payload = {"function": function_name, "argument": {"parsed": [args]}}
     else:
         payload = {"function": function_name, "arguments": args}
-    return client.post('/swaig', json=payload)
+    return client.post('/swaig', json=payload, headers=AUTH)
 
 def test_create_reservation(client):
     """Test creating a new reservation"""
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app_new
+from sharding import ShardedReservations, parse_locations
+from swaig_dispatcher import handle_payload
+
+@pytest.fixture
+def pool():
+    with ShardedReservations(3, {"downtown": "2:1,4:1", "uptown": "2:1"}) as pool:
+        yield pool
+
+def dates_on_shards(pool, location="downtown"):
+    """A future date owned by each shard, in shard order."""
+    found = {}
+    day = 1
+    while len(found) < pool.shards:
+        date = (datetime.now() + timedelta(days=day)).strftime("%Y-%m-%d")
+        found.setdefault(pool.shard_for(location, date), date)
+        day += 1
+    return [found[i] for i in range(pool.shards)]
+
+def create(pool, phone, date, time="18:00", party_size=2, location="downtown", name="Guest"):
+    return pool.call("create_reservation", {"name": name, "party_size": party_size, "date": date, "time": time,
+                                            "phone_number": phone, "location": location})
+
+def test_calls_are_routed_to_the_owning_shard(pool):
+    first, second, third = dates_on_shards(pool)
+    assert create(pool, "+15550000001", first) == "Reservation successfully created."
+    assert create(pool, "+15550000002", second) == "Reservation successfully created."
+    # One booking per number, even when the new one would land on another shard
+    assert create(pool, "+15550000001", third) == "A reservation already exists for this phone number."
+    assert pool.call("get_reservation", {"phone_number": "+15550000002", "location": "downtown"}).startswith(
+        f"Reservation found: Guest for 2 people on {second}")
+    assert pool.call("get_reservation", {"phone_number": "+15550000009"}) == \
+        "No reservation found for this phone number."
+    assert pool.call("cancel_reservation", {"phone_number": "+15550000002", "location": "downtown"}) == \
+        "Reservation canceled successfully."
+    assert pool.call("get_reservation", {"phone_number": "+15550000002", "location": "downtown"}) == \
+        "No reservation found for this phone number."
+    assert pool.call("get_reservation", {"phone_number": "555"}).startswith("Invalid phone number")
+
+def test_moves_and_updates_cross_shards(pool):
+    first, second, third = dates_on_shards(pool)
+    create(pool, "+15550000001", first)
+    assert pool.call("move_reservation", {"phone_number": "+15550000001", "new_date": second, "new_time": "19:00",
+                                          "location": "downtown"}) == "Reservation moved successfully."
+    assert pool.call("update_reservation", {"phone_number": "+15550000001", "date": third, "party_size": 4,
+                                            "location": "downtown"}).startswith(
+        f"Reservation updated: Guest for 4 people on {third} at 19:00")
+    # The freed slots on the first two shards can be booked again
+    assert create(pool, "+15550000002", second, "19:00", 4) == "Reservation successfully created."
+
+    # A move into a full slot on another shard leaves the booking where it was
+    create(pool, "+15550000003", first, "20:00", 4)
+    create(pool, "+15550000004", first, "20:00", 2)
+    assert pool.call("move_reservation", {"phone_number": "+15550000001", "new_date": first, "new_time": "20:00",
+                                          "location": "downtown"}).startswith("This time slot is already booked")
+    assert pool.call("get_reservation", {"phone_number": "+15550000001", "location": "downtown"}).startswith(
+        f"Reservation found: Guest for 4 people on {third} at 19:00")
+    assert pool.call("list_reservations", {"date": first, "location": "downtown"}).count(" on ") == 2
+
+def test_failed_release_on_the_old_shard_rolls_the_move_back(pool, monkeypatch):
+    first, second, _ = dates_on_shards(pool)
+    create(pool, "+15550000001", first, "19:00", 4)
+    old = pool._workers["downtown"][pool.shard_for("downtown", first)]
+    request = old.request
+
+    def failing_cancel(operation, *args, **kwargs):
+        if operation == "call" and args[0] == "cancel_reservation":
+            raise OSError("disk full")
+        return request(operation, *args, **kwargs)
+
+    monkeypatch.setattr(old, "request", failing_cancel)
+    assert pool.call("move_reservation", {"phone_number": "+15550000001", "new_date": second, "new_time": "19:00",
+                                          "location": "downtown"}) == "Error moving reservation: disk full"
+    monkeypatch.undo()
+    assert pool.call("get_reservation", {"phone_number": "+15550000001", "location": "downtown"}).startswith(
+        f"Reservation found: Guest for 4 people on {first} at 19:00")
+    # The copy adopted by the new shard was canceled, so its four-top is free again
+    assert create(pool, "+15550000002", second, "19:00", 4) == "Reservation successfully created."
+    assert "Guest for 4 people on " + first in pool.call("list_reservations", {"location": "downtown"})
+
+def test_listing_merges_shards_in_order(pool):
+    dates = dates_on_shards(pool)
+    for i, date in enumerate(dates):
+        for j, time in enumerate(("18:00", "19:00")):
+            create(pool, f"+1555000{i}{j}00", date, time, name=f"G{i}{j}")
+    page, cursor = pool.list_reservations("downtown", limit=4)
+    rest, end = pool.list_reservations("downtown", cursor=cursor, limit=4)
+    assert end is None
+    listed = [(row["date"], row["time"]) for row in page + rest]
+    assert listed == sorted((date, time) for date in dates for time in ("18:00", "19:00"))
+    reply = pool.call("list_reservations", {"from_date": min(dates), "limit": 2, "location": "downtown"})
+    assert reply.startswith("Reservations found:") and "pass cursor" in reply
+    assert pool.call("list_reservations", {"date": "bad"}) == "Invalid date filter. Use YYYY-MM-DD."
+
+def test_locations_are_independent(pool):
+    date = dates_on_shards(pool)[0]
+    assert create(pool, "+15550000001", date, party_size=4) == "Reservation successfully created."
+    # Same number and slot at another location; uptown has only a two-top
+    assert create(pool, "+15550000001", date, location="uptown") == "Reservation successfully created."
+    assert create(pool, "+15550000002", date, location="uptown").startswith("This time slot is already booked")
+    assert create(pool, "+15550000003", date, party_size=4, location="uptown") == \
+        "We have no table that can seat a party of 4."
+    assert pool.call("get_reservation", {"phone_number": "+15550000001", "location": "moon"}) == \
+        "Unknown location 'moon'."
+
+def test_stores_reload_with_the_same_shard_count(tmp_path):
+    with ShardedReservations(2, store_dir=str(tmp_path)) as pool:
+        dates = dates_on_shards(pool, "default")
+        for i, date in enumerate(dates):
+            create(pool, f"+1555000000{i}", date, location=None)
+    with ShardedReservations(2, store_dir=str(tmp_path)) as pool:
+        assert create(pool, "+15550000000", dates[1], location=None) == \
+            "A reservation already exists for this phone number."
+        assert pool.call("get_reservation", {"phone_number": "+15550000001"}).startswith("Reservation found")
+    with pytest.raises(ValueError):
+        ShardedReservations(3, store_dir=str(tmp_path)).start()
+
+def test_swaig_registry_runs_on_shards(pool):
+    registry = pool.registry(app_new.swaig_functions)
+    date = dates_on_shards(pool)[1]
+    body, status = handle_payload(registry, {"function": "create_reservation", "argument": {"parsed": [{
+        "name": "Ann", "party_size": "2", "date": date, "time": "18:00", "phone_number": "+15550000001",
+        "location": "uptown"}]}})
+    assert status == 200 and body["response"] == "Reservation successfully created."
+    body, _ = handle_payload(registry, {"function": "get_reservation", "argument": {"parsed": [{
+        "phone_number": "+15550000001", "location": "uptown"}]}})
+    assert body["response"].startswith("Reservation found: Ann")
+
+def test_parse_locations():
+    assert parse_locations("downtown=2:6,4:8; uptown ;") == {"downtown": "2:6,4:8", "uptown": None}
+    with pytest.raises(ValueError):
+        parse_locations("../etc=2:1")
+    with pytest.raises(ValueError):
+        parse_locations(";")
@@ -0,0 +1,73 @@
+import dataclasses
+import json
+import math
+
+import pytest
+
+import swaig_handler
+from app_new import app
+from conftest import AUTH
+from swaig_handler import SWAIGCall, decode_json, normalize_call
+
+def test_both_payload_shapes_normalize_to_the_same_call():
+    arguments = {"phone_number": "+19185551234"}
+    plain = normalize_call({"function": "get_reservation", "arguments": arguments})
+    parsed = normalize_call({"function": "get_reservation", "argument": {"parsed": [arguments], "raw": "{}"},
+                             "meta_data": {"blob": "x" * 100}})
+    assert plain.function == parsed.function == "get_reservation"
+    assert dict(plain.arguments) == dict(parsed.arguments) == arguments
+    assert parsed.meta_data["blob"] == "x" * 100 and plain.meta_data is None
+    assert normalize_call({"function": "get_reservation"}).arguments == {}
+    assert normalize_call({"arguments": arguments}) is None
+
+def test_calls_are_read_only_views():
+    arguments = {"phone_number": "+19185551234"}
+    call = normalize_call({"function": "get_reservation", "arguments": arguments})
+    with pytest.raises(TypeError):
+        call.arguments["phone_number"] = "+10000000000"
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        call.function = "cancel_reservation"
+    # A view, not a copy
+    arguments["name"] = "Ada"
+    assert call.arguments["name"] == "Ada"
+    # Non-object arguments are passed through for the validator to reject
+    assert normalize_call({"function": "get_reservation", "arguments": [1]}) == SWAIGCall("get_reservation", [1])
+
+def test_decode_json_falls_back_to_the_standard_decoder(monkeypatch):
+    assert math.isnan(decode_json(b'{"party_size": NaN}')["party_size"])
+    monkeypatch.setattr(swaig_handler, "_fast_loads", None)
+    assert decode_json(b'{"a": [1, 2]}') == {"a": [1, 2]}
+    with pytest.raises(ValueError):
+        decode_json(b'{"a": ')
+
+def test_invalid_json_body_is_rejected():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        response = client.post('/swaig', data='{"function": ', content_type='application/json', headers=AUTH)
+        assert response.status_code == 400 and response.get_json() == {"error": "Invalid JSON"}
+        payload = {"function": "get_reservation", "argument": {"parsed": [{"phone_number": "+19185559999"}]},
+                   "meta_data": {"history": ["turn"] * 1000}}
+        response = client.post('/swaig', data=json.dumps(payload), content_type='application/json',
+                               headers=AUTH)
+        assert response.get_json()["response"] == "No reservation found for this phone number."
+
+def test_parsed_arguments_must_be_a_list():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        for parsed in ({"phone_number": "+19185550100"}, "+19185550100", 7):
+            response = client.post('/swaig', json={"function": "get_reservation", "argument": {"parsed": parsed}},
+                                   headers=AUTH)
+            assert response.status_code == 200
+            assert response.get_json() == {
+                "response": "Invalid arguments for function 'get_reservation': arguments must be an object"}
+
+def test_function_names_must_be_strings():
+    assert normalize_call({"function": ["create_reservation"]}) is None
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        for function in (["create_reservation"], {"name": "x"}, 7):
+            response = client.post('/swaig', json={"function": function, "arguments": {}}, headers=AUTH)
+            assert response.status_code == 400
+            assert response.get_json() == {"error": "Missing or invalid 'function' in request"}
+        response = client.post('/swaig', json={"batch": [{"function": ["x"]}]}, headers=AUTH)
+        assert response.get_json()["responses"] == [{"error": "Missing or invalid 'function' in batch entry"}]
@@ -0,0 +1,53 @@
+import json
+import logging
+import os
+
+import pytest
+
+import swaig_logging
+from swaig_logging import configure_logging, log_event, shutdown_logging
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_events_are_written_as_json_lines(tmp_path):
+    path = tmp_path / "debug.json"
+    configure_logging("DEBUG", str(path))
+    log_event(logging.DEBUG, "dispatch", function="get_reservation", arguments={"phone_number": "+19185551234"})
+    shutdown_logging()
+    [entry] = read_lines(path)
+    assert entry["event"] == "dispatch"
+    assert entry["arguments"] == {"phone_number": "+19185551234"}
+
+def test_debug_off_writes_nothing(tmp_path):
+    path = tmp_path / "debug.json"
+    configure_logging("WARNING", str(path))
+    assert not swaig_logging.debug_enabled()
+    log_event(logging.DEBUG, "dispatch", function="get_reservation")
+    shutdown_logging()
+    assert not path.exists()
+
+def test_log_file_rotates_by_size(tmp_path):
+    path = tmp_path / "debug.json"
+    configure_logging("DEBUG", str(path), max_bytes=2000, backup_count=2)
+    for i in range(200):
+        log_event(logging.DEBUG, "dispatch", i=i, padding="x" * 50)
+    shutdown_logging()
+    assert (tmp_path / "debug.json.1").exists()
+    assert path.stat().st_size <= 2000
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_workers_write_their_own_records(tmp_path):
+    path = tmp_path / "debug.json"
+    configure_logging("DEBUG", str(path))
+    # The parent's writer thread is running before the fork, as under gunicorn --preload
+    log_event(logging.DEBUG, "parent")
+    pid = os.fork()
+    if pid == 0:
+        log_event(logging.DEBUG, "worker")
+        shutdown_logging()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    shutdown_logging()
+    assert sorted(entry["event"] for entry in read_lines(path)) == ["parent", "worker"]
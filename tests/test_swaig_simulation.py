@@ -1,5 +1,6 @@
 import pytest
 from app_new import app
+from conftest import AUTH
 from datetime import datetime, timedelta
 
 @pytest.fixture
@@ -10,7 +11,7 @@ def client():
 
 def send_swaig_payload(client, function_name, args):
     payload = {"function": function_name, "arguments": args}
-    return client.post('/swaig', json=payload)
+    return client.post('/swaig', json=payload, headers=AUTH)
 
 def test_create_reservation(client):
     date_str = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
@@ -78,4 +79,94 @@ def test_cancel_reservation(client):
     cancel_args = {"phone_number": "+19185551237"}
     response = send_swaig_payload(client, "cancel_reservation", cancel_args)
     data = response.get_json()
-    assert data and (data.get('success') or data.get('response')) 
\ No newline at end of file
+    assert data and (data.get('success') or data.get('response'))
+
+
+def test_module_globals_are_not_callable(client):
+    response = send_swaig_payload(client, "scramble_phone_number", {"phone": "+19185551234"})
+    assert response.status_code == 404
+
+
+def test_arguments_are_coerced_from_declared_types(client):
+    date_str = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
+    args = {
+        "name": "Carol White",
+        "party_size": "3",
+        "date": date_str,
+        "time": "18:00",
+        "phone_number": "+19185551238"
+    }
+    response = send_swaig_payload(client, "create_reservation", args)
+    assert response.get_json()["response"] == "Reservation successfully created."
+    response = send_swaig_payload(client, "get_reservation", {"phone_number": "+19185551238"})
+    assert "for 3 people" in response.get_json()["response"]
+
+def test_missing_required_argument(client):
+    response = send_swaig_payload(client, "move_reservation", {"phone_number": "+19185551238"})
+    data = response.get_json()
+    assert "Invalid arguments for function 'move_reservation'" in data["response"]
+    assert "new_date" in data["response"]
+
+def test_signature_request_lists_declared_functions(client):
+    response = client.post('/swaig', json={"action": "get_signature"}, headers=AUTH)
+    names = {entry["function"] for entry in response.get_json()}
+    assert {"create_reservation", "get_reservation", "update_reservation",
+            "cancel_reservation", "move_reservation"} <= names
+
+def test_batch_runs_calls_in_order(client):
+    date_str = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+    create = {"name": "Dan Green", "party_size": 2, "date": date_str, "time": "17:00", "phone_number": "+19185551239"}
+    payload = {"batch": [
+        {"function": "create_reservation", "arguments": create},
+        {"function": "move_reservation", "arguments": {"phone_number": "+19185551239", "new_date": date_str, "new_time": "18:00"}},
+        {"function": "get_reservation", "argument": {"parsed": [{"phone_number": "+19185551239"}]}}
+    ]}
+    data = client.post('/swaig', json=payload, headers=AUTH).get_json()
+    assert data["committed"]
+    assert [r["response"] for r in data["responses"]][:2] == ["Reservation successfully created.", "Reservation moved successfully."]
+    assert "at 18:00" in data["responses"][2]["response"]
+
+def test_transactional_batch_rolls_back_on_failure(client):
+    date_str = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+    create = {"name": "Eve Black", "party_size": 2, "date": date_str, "time": "17:00", "phone_number": "+19185551240"}
+    payload = {"transactional": True, "batch": [
+        {"function": "create_reservation", "arguments": create},
+        {"function": "move_reservation", "arguments": {"phone_number": "+19185551240", "new_date": date_str, "new_time": "23:00"}},
+        {"function": "get_reservation", "arguments": {"phone_number": "+19185551240"}}
+    ]}
+    data = client.post('/swaig', json=payload, headers=AUTH).get_json()
+    assert data["committed"] is False
+    assert len(data["responses"]) == 2
+    response = send_swaig_payload(client, "get_reservation", {"phone_number": "+19185551240"})
+    assert response.get_json()["response"] == "No reservation found for this phone number."
+
+def test_list_reservations_function_and_endpoint(client):
+    date_str = (datetime.now() + timedelta(days=9)).strftime("%Y-%m-%d")
+    for i, time in enumerate(("18:00", "19:00")):
+        send_swaig_payload(client, "create_reservation", {
+            "name": f"Lister {i}", "party_size": 2, "date": date_str, "time": time,
+            "phone_number": f"+1918555180{i}"
+        })
+    response = send_swaig_payload(client, "list_reservations", {"date": date_str, "limit": 1})
+    text = response.get_json()["response"]
+    assert text.startswith("Reservations found: Lister 0") and "cursor" in text
+
+    assert client.get('/reservations').status_code == 401
+    page = client.get(f'/reservations?date={date_str}&limit=1', headers=AUTH).get_json()
+    assert [r["name"] for r in page["reservations"]] == ["Lister 0"]
+    page = client.get(f'/reservations?date={date_str}&cursor={page["next_cursor"]}', headers=AUTH).get_json()
+    assert [r["name"] for r in page["reservations"]] == ["Lister 1"] and page["next_cursor"] is None
+
+    streamed = client.get(f'/reservations?date={date_str}&stream=1', headers=AUTH)
+    assert streamed.mimetype == 'application/x-ndjson'
+    assert len(streamed.get_data(as_text=True).splitlines()) == 2
+    assert client.get('/reservations?limit=lots', headers=AUTH).status_code == 400
+
+def test_find_available_slots_function(client):
+    date_str = (datetime.now() + timedelta(days=11)).strftime("%Y-%m-%d")
+    response = send_swaig_payload(client, "find_available_slots",
+                                  {"date": date_str, "party_size": "4", "preferred_time": "18:00", "count": 2})
+    assert response.get_json()["response"] == f"Available times on {date_str} for a party of 4: 18:00, 17:45."
+    response = send_swaig_payload(client, "find_available_slots", {"date": date_str, "party_size": 4,
+                                                                   "preferred_time": "8:00"})
+    assert response.get_json()["response"].startswith("Invalid time")
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import validation
+from reservation_system import validate_date_time, validate_phone_number
+
+def test_phone_pattern_unchanged():
+    assert validate_phone_number("+19185551234")
+    assert not validate_phone_number("19185551234")
+    assert not validate_phone_number("+0123")
+    assert not validate_phone_number("+1918555123456789")
+
+def test_date_time_requires_canonical_format():
+    with validation.request_clock(datetime(2030, 1, 1, 12, 0)):
+        assert validate_date_time("2030-01-02", "19:00")
+        assert not validate_date_time("2030-1-2", "19:00")
+        assert not validate_date_time("2030-01-02", "7:00")
+        assert not validate_date_time("2030-02-30", "19:00")
+        assert not validate_date_time("2030-01-02", "24:00")
+        assert not validate_date_time("２０３０-01-02", "19:00")
+
+def test_date_time_uses_pinned_clock():
+    with validation.request_clock(datetime(2030, 1, 2, 18, 0)):
+        assert not validate_date_time("2030-01-02", "17:59")
+        assert validate_date_time("2030-01-02", "18:00")
+        # Nested blocks keep the outer sample
+        with validation.request_clock():
+            assert validation.now() == datetime(2030, 1, 2, 18, 0)
+    assert validate_date_time("2030-01-02", "17:59")
+
+def test_business_hours():
+    with validation.request_clock(datetime(2030, 1, 1, 0, 0)):
+        assert not validate_date_time("2030-01-02", "13:59")
+        assert validate_date_time("2030-01-02", "14:00")
+        assert validate_date_time("2030-01-02", "21:59")
+        assert not validate_date_time("2030-01-02", "22:00")
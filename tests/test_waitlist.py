@@ -0,0 +1,135 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import reservation_system
+from inventory import default_tables, tables_from_spec
+from standing import StandingBook, StandingReservation
+from storage import MemoryStore
+from waitlist import BOOKED, FULL, Waitlist
+
+@pytest.fixture(autouse=True)
+def one_table(monkeypatch):
+    saved = reservation_system.reservations
+    reservation_system.configure_store(MemoryStore())
+    reservation_system.configure_inventory(tables_from_spec("2:1,4:1"))
+    monkeypatch.setattr(reservation_system, "waitlist", Waitlist())
+    monkeypatch.setattr(reservation_system, "standing", StandingBook())
+    yield
+    reservation_system.configure_store(saved)
+    reservation_system.configure_inventory(default_tables())
+
+def day(offset):
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+def party(phone_number, date, time="18:00", party_size=2, name="Guest"):
+    return {"name": name, "party_size": party_size, "date": date, "time": time, "phone_number": phone_number}
+
+def booked(phone_number):
+    return phone_number in reservation_system.reservations
+
+def test_waitlist_offers_tables_in_join_order_to_parties_that_fit():
+    waitlist = Waitlist()
+    assert waitlist.join("+1", "A", 6, "2030-01-01", "18:00") == 0
+    assert waitlist.join("+2", "B", 2, "2030-01-01", "18:00") == 1
+    assert waitlist.join("+3", "C", 2, "2030-01-01", "18:00") == 2
+    assert waitlist.join("+4", "D", 2, "2030-01-01", "18:15") == 0
+    waitlist.leave("+2")
+    offered = []
+
+    def book(entry):
+        offered.append(entry.phone_number)
+        return BOOKED if len(offered) == 1 else FULL
+
+    # Only two-tops are free: A is skipped, B has left, C gets the first table and D keeps its place
+    promoted = waitlist.promote("2030-01-01", ["18:00", "18:15"], lambda time, size: size <= 2, book)
+    assert [entry.phone_number for entry in promoted] == ["+3"]
+    assert offered == ["+3", "+4"]
+    assert waitlist.get("+4").sequence == 4 and waitlist.waiting("2030-01-01", "18:15") == 1
+    assert waitlist.drop_before("2030-01-02") == 2 and len(waitlist) == 0
+
+def test_cancel_and_move_promote_waiting_parties():
+    date = day(3)
+    assert reservation_system.create_reservation_response(party("+15550000001", date)) == \
+        "Reservation successfully created."
+    assert reservation_system.create_reservation_response(party("+15550000002", date, party_size=4)) == \
+        "Reservation successfully created."
+    assert reservation_system.join_waitlist_response(party("+15550000003", date)) == \
+        f"Added to the waitlist for {date} at 18:00. Parties ahead: 0."
+    assert reservation_system.join_waitlist_response(party("+15550000004", date)) == \
+        f"Added to the waitlist for {date} at 18:00. Parties ahead: 1."
+    assert reservation_system.join_waitlist_response(party("+15550000001", date)) == \
+        "A reservation already exists for this phone number."
+    assert reservation_system.join_waitlist_response(party("+15550000005", day(4))).startswith(
+        "This time slot still has a table")
+
+    assert reservation_system.cancel_reservation_response({"phone_number": "+15550000001"}) == \
+        "Reservation canceled successfully."
+    assert booked("+15550000003") and not booked("+15550000004")
+    assert reservation_system.move_reservation_response({"phone_number": "+15550000002", "new_date": date,
+                                                         "new_time": "21:00"}) == "Reservation moved successfully."
+    assert booked("+15550000004")
+    assert reservation_system.leave_waitlist_response({"phone_number": "+15550000004"}) == \
+        "No waitlist entry found for this phone number."
+
+def test_atomic_blocks_promote_only_after_commit():
+    date = day(3)
+    for phone_number, size in (("+15550000001", 2), ("+15550000002", 4)):
+        reservation_system.create_reservation_response(party(phone_number, date, party_size=size))
+    reservation_system.join_waitlist_response(party("+15550000003", date))
+    with reservation_system.atomic() as block:
+        reservation_system.cancel_reservation_response({"phone_number": "+15550000001"})
+        assert not booked("+15550000003")
+        block.rollback()
+    assert booked("+15550000001") and not booked("+15550000003")
+    with reservation_system.atomic():
+        reservation_system.cancel_reservation_response({"phone_number": "+15550000001"})
+    assert booked("+15550000003")
+
+def test_standing_reservations_hold_their_table_every_week():
+    first = day(7)
+    later = day(14)
+    # A booking already on a later occurrence blocks the rule
+    assert reservation_system.create_reservation_response(party("+15550000009", day(21), party_size=4)) == \
+        "Reservation successfully created."
+    assert reservation_system.create_standing_reservation_response(party("+15550000001", first, party_size=4)) == \
+        f"This time slot is already booked on {day(21)}. Please choose a different time."
+    reservation_system.cancel_reservation_response({"phone_number": "+15550000009"})
+
+    reply = reservation_system.create_standing_reservation_response(party("+15550000001", first, party_size=4))
+    assert reply.startswith("Standing reservation created: Guest for 4 people every")
+    assert reservation_system.create_standing_reservation_response(party("+15550000001", later)) == \
+        "A standing reservation already exists for this phone number."
+    # Occurrences far ahead are claimed when their day is first used
+    for offset in (7, 14, 70):
+        assert reservation_system.create_reservation_response(party(f"+1555000010{offset}", day(offset),
+                                                                    party_size=4)).startswith(
+            "This time slot is already booked")
+    assert reservation_system.create_reservation_response(party("+15550000002", day(8), party_size=4)) == \
+        "Reservation successfully created."
+
+    # Calling off one week hands its table to the waitlist
+    reservation_system.join_waitlist_response(party("+15550000003", later, party_size=4))
+    assert reservation_system.cancel_standing_reservation_response({"phone_number": "+15550000001",
+                                                                    "date": later}) == \
+        f"Standing reservation skipped on {later}."
+    assert booked("+15550000003")
+    assert reservation_system.cancel_standing_reservation_response({"phone_number": "+15550000001"}) == \
+        "Standing reservation canceled successfully."
+    assert reservation_system.create_reservation_response(party("+15550000004", first, party_size=4)) == \
+        "Reservation successfully created."
+    assert reservation_system.cancel_standing_reservation_response({"phone_number": "+15550000001"}) == \
+        "No standing reservation found for this phone number."
+
+def test_standing_reservations_are_saved(tmp_path):
+    path = str(tmp_path / "standing.json")
+    book = StandingBook(path)
+    rule = StandingReservation("+15550000001", "Ann", 2, "2030-01-07", "19:00")
+    book.add(rule)
+    book.skip(rule, "2030-01-14")
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)[0]["skipped"] == ["2030-01-14"]
+    loaded = StandingBook(path).get("+15550000001")
+    assert loaded.occurs_on("2030-01-21") and not loaded.occurs_on("2030-01-14")
+    assert not loaded.occurs_on("2030-01-08") and not loaded.occurs_on("2029-12-31")
@@ -0,0 +1,81 @@
+"""
+Fast input validation for reservation requests.
+
+Patterns are compiled once, dates and times are parsed by hand instead of
+through strptime, and parsed slots are kept in an LRU cache since callers ask
+about the same few days over and over. "Now" comes from an injectable clock
+and can be pinned for the duration of a request with request_clock().
+"""
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Optional
+
+PHONE_PATTERN = re.compile(r'^\+[1-9]\d{1,14}$')
+
+# Business hours: bookings may start from OPENING_HOUR up to, not including, CLOSING_HOUR
+OPENING_HOUR = 14
+CLOSING_HOUR = 22
+
+SLOT_CACHE_SIZE = 4096
+
+# Source of the current time; replace to test against a fixed clock
+clock: Callable[[], datetime] = datetime.now
+
+_pinned_now: ContextVar[Optional[datetime]] = ContextVar("pinned_now", default=None)
+
+def now() -> datetime:
+    """The request's pinned time if inside request_clock(), else the clock's current time."""
+    pinned = _pinned_now.get()
+    return pinned if pinned is not None else clock()
+
+@contextmanager
+def request_clock(at: Optional[datetime] = None):
+    """
+    Sample the clock once and use that value for every now() call inside the block.
+
+    Nested blocks keep the outer sample unless given an explicit time.
+    """
+    if at is None:
+        at = _pinned_now.get() or clock()
+    token = _pinned_now.set(at)
+    try:
+        yield
+    finally:
+        _pinned_now.reset(token)
+
+def is_valid_phone(phone: str) -> bool:
+    """Validate phone number in E.164 format."""
+    return PHONE_PATTERN.match(phone) is not None
+
+def _digits(text: str) -> bool:
+    return text.isascii() and text.isdigit()
+
+@lru_cache(maxsize=SLOT_CACHE_SIZE)
+def parse_slot(date_str: str, time_str: str) -> Optional[datetime]:
+    """Parse 'YYYY-MM-DD' and 'HH:MM' into a datetime, or None if either is malformed."""
+    if len(date_str) != 10 or date_str[4] != "-" or date_str[7] != "-":
+        return None
+    if len(time_str) != 5 or time_str[2] != ":":
+        return None
+    year, month, day = date_str[:4], date_str[5:7], date_str[8:]
+    hour, minute = time_str[:2], time_str[3:]
+    if not (_digits(year) and _digits(month) and _digits(day) and _digits(hour) and _digits(minute)):
+        return None
+    try:
+        return datetime(int(year), int(month), int(day), int(hour), int(minute))
+    except ValueError:
+        return None
+
+def is_valid_date(date_str: str) -> bool:
+    """True for a real calendar date written as 'YYYY-MM-DD'."""
+    return isinstance(date_str, str) and parse_slot(date_str, "00:00") is not None
+
+def is_bookable_slot(date_str: str, time_str: str) -> bool:
+    """True for a well-formed date and time in the future and within business hours."""
+    slot = parse_slot(date_str, time_str)
+    if slot is None or slot < now():
+        return False
+    return OPENING_HOUR <= slot.hour < CLOSING_HOUR
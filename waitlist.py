@@ -0,0 +1,171 @@
+"""
+Waitlist of parties hoping for a table at a slot that is full.
+
+Each (date, time, party size) has its own queue, a heap ordered by when the
+party joined. When a table is freed, reservation_system names the slots it
+could serve. promote() looks at the head of each of their queues, takes the
+earliest-joined party that now fits and hands it to a booking callback. There
+are at most 20 queues (one per party size) at a slot, so finding the next
+party means peeking at a few heads, and taking it costs one O(log n) pop.
+
+A phone number waits for one slot at a time. Leaving the list only drops the
+number from the index; its heap entry is discarded when it reaches the head.
+"""
+import heapq
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+class WaitlistEntry(NamedTuple):
+    phone_number: str
+    name: str
+    party_size: int
+    date: str
+    time: str
+    # Join order: lower numbers are offered tables first
+    sequence: int
+
+# Outcomes of offering a freed table to a party, returned by promote()'s book callback
+BOOKED, FULL, DROPPED = "booked", "full", "dropped"
+
+Slot = Tuple[str, str]
+
+class Waitlist:
+    """Parties waiting per slot, offered freed tables in the order they joined."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sequence = 0
+        # phone number -> its current entry
+        self._entries: Dict[str, WaitlistEntry] = {}
+        # (date, time, party size) -> heap of (sequence, phone number); may hold entries that have left
+        self._queues: Dict[Tuple[str, str, int], List[Tuple[int, str]]] = {}
+        # date -> time -> party sizes with a queue, so a freed table finds the queues it could serve
+        self._slots: Dict[str, Dict[str, Set[int]]] = {}
+        # (date, time) -> parties waiting there
+        self._waiting: Dict[Slot, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, phone_number: str) -> Optional[WaitlistEntry]:
+        return self._entries.get(phone_number)
+
+    def waiting(self, date: str, time: str) -> int:
+        """How many parties wait for a slot."""
+        return self._waiting.get((date, time), 0)
+
+    def times_on(self, date: str) -> List[str]:
+        """Times on date that have parties waiting, in order."""
+        return sorted(self._slots.get(date, ()))
+
+    def _add(self, entry: WaitlistEntry) -> None:
+        self._entries[entry.phone_number] = entry
+        heapq.heappush(self._queues.setdefault((entry.date, entry.time, entry.party_size), []),
+                       (entry.sequence, entry.phone_number))
+        self._slots.setdefault(entry.date, {}).setdefault(entry.time, set()).add(entry.party_size)
+        slot = (entry.date, entry.time)
+        self._waiting[slot] = self._waiting.get(slot, 0) + 1
+
+    def _remove(self, phone_number: str) -> Optional[WaitlistEntry]:
+        entry = self._entries.pop(phone_number, None)
+        if entry is not None:
+            slot = (entry.date, entry.time)
+            self._waiting[slot] -= 1
+            if not self._waiting[slot]:
+                del self._waiting[slot]
+        return entry
+
+    def join(self, phone_number: str, name: str, party_size: int, date: str, time: str) -> int:
+        """Queue a party, replacing any earlier entry of the number; returns how many wait ahead of it."""
+        with self._lock:
+            self._remove(phone_number)
+            ahead = self._waiting.get((date, time), 0)
+            self._sequence += 1
+            self._add(WaitlistEntry(phone_number, name, party_size, date, time, self._sequence))
+            return ahead
+
+    def leave(self, phone_number: str) -> Optional[WaitlistEntry]:
+        with self._lock:
+            return self._remove(phone_number)
+
+    def _head(self, date: str, time: str, party_size: int) -> Optional[WaitlistEntry]:
+        """The live entry at the head of a queue, discarding entries that have left or re-joined."""
+        key = (date, time, party_size)
+        queue = self._queues[key]
+        while queue:
+            sequence, phone_number = queue[0]
+            entry = self._entries.get(phone_number)
+            if entry is not None and entry.sequence == sequence:
+                return entry
+            heapq.heappop(queue)
+        del self._queues[key]
+        sizes = self._slots[date][time]
+        sizes.discard(party_size)
+        if not sizes:
+            del self._slots[date][time]
+            if not self._slots[date]:
+                del self._slots[date]
+        return None
+
+    def _take_next(self, date: str, times: Iterable[str],
+                   fits: Callable[[str, int], bool]) -> Optional[WaitlistEntry]:
+        day = self._slots.get(date, {})
+        heads = []
+        for time in times:
+            for party_size in list(day.get(time, ())):
+                entry = self._head(date, time, party_size)
+                if entry is not None:
+                    heads.append(entry)
+        for entry in sorted(heads, key=lambda head: head.sequence):
+            if fits(entry.time, entry.party_size):
+                heapq.heappop(self._queues[(date, entry.time, entry.party_size)])
+                return self._remove(entry.phone_number)
+        return None
+
+    def promote(self, date: str, times: Iterable[str], fits: Callable[[str, int], bool],
+                book: Callable[[WaitlistEntry], str]) -> List[WaitlistEntry]:
+        """
+        Offer freed tables on date to parties waiting at times, earliest joined first.
+
+        fits(time, party_size) says whether a table is free for the party now.
+        book(entry) tries to book it and returns BOOKED, FULL (someone else took
+        the table first, so the party keeps its place) or DROPPED. Stops when no
+        waiting party fits, and returns the parties booked.
+        """
+        times = list(times)
+        booked = []
+        while True:
+            with self._lock:
+                entry = self._take_next(date, times, fits)
+            if entry is None:
+                return booked
+            outcome = book(entry)
+            if outcome == BOOKED:
+                booked.append(entry)
+            elif outcome == FULL:
+                with self._lock:
+                    # Unless the number joined again meanwhile
+                    if entry.phone_number not in self._entries:
+                        self._add(entry)
+                return booked
+
+    def drop_before(self, date: str) -> int:
+        """Forget parties waiting for dates before date; returns how many."""
+        dropped = 0
+        with self._lock:
+            for day in [day for day in self._slots if day < date]:
+                for time, sizes in self._slots.pop(day).items():
+                    for party_size in sizes:
+                        for sequence, phone_number in self._queues.pop((day, time, party_size)):
+                            entry = self._entries.get(phone_number)
+                            if entry is not None and entry.sequence == sequence:
+                                self._remove(phone_number)
+                                dropped += 1
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._queues.clear()
+            self._slots.clear()
+            self._waiting.clear()